@@ -0,0 +1,186 @@
+"""ANF model of a differential trail of Keccak-f[b] for every width b = 25 * w, w in 1, 2, 4, ..., 64
+
+keccak.py(b = 1600) and keccak800.py(b = 800) with the lane size w as a parameter:
+    state: b bits = 5 * 5 * w, index of bit (x, y, z) is w * (5 * y + x) + z
+    rho:   the rotation offsets of Keccak-f[1600] mod w
+    iota:  the lowest w bits of the 64-bit round constants, 12 + 2 l rounds for w = 2^l
+the model is the one of keccak.py: diff[0] is the input of the first chi, every later round is
+chi, the cut into new variables, iota(constant start + r), theta and rhoPi, followed by diff[r].
+the trail file is the one of read_trails.py with lanes of w // 4 hex digits, ROUNDS - 1 rounds of it
+give the ROUNDS states of diff.
+
+Example:
+    sage -python keccakf.py -w 8 -r 4 -f trails_200.txt > 4rkeccak200.anf
+    sage -python keccakf.py -w 64 -r 4 -f trails_1600.txt --solve
+"""
+from __future__ import division
+import os
+import sys
+import argparse
+
+from sage.all import *
+from sage.rings.polynomial.pbori.pbori import *
+from sage.rings.polynomial.pbori import *
+
+from read_trails import read_trails
+
+# the shared model steps
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from anfengine import ImpossibleTrail, add_difference, linearize, write_anf
+from common import get_logger
+
+LANES = [1, 2, 4, 8, 16, 32, 64]
+# Rotation offsets r[x][y] of Keccak-f[1600]
+RHO = [[0,    36,     3,    41,    18],
+       [1,    44,    10,    45,     2],
+       [62,    6,    43,    15,    61],
+       [28,   55,    25,    21,    56],
+       [27,   20,    39,     8,    14]]
+CONSTANTS = [0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+             0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+             0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+             0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+             0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+             0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008]
+
+def max_rounds(w: int) -> int:
+    """number of rounds of Keccak-f[25 w]
+
+    Args:
+        w (int): lane size
+
+    Returns:
+        int: 12 + 2 l with w = 2^l
+    """
+    return 12 + 2 * (w.bit_length() - 1)
+
+def theta(X, w):
+    # column parities P[x][z]
+    P = [sum(X[w * (5 * y + x) + z] for y in range(5)) for x in range(5) for z in range(w)]
+    # E[x][z] = P[x - 1][z] + P[x + 1][z - 1]
+    E = [P[w * ((x - 1) % 5) + z] + P[w * ((x + 1) % 5) + (z - 1) % w] for x in range(5) for z in range(w)]
+    return [X[i] + E[i % (5 * w)] for i in range(25 * w)]
+
+def rhoPi(X, w):
+    Y = list(X)
+    for y in range(5):
+        for x in range(5):
+            dz = RHO[x][y] % w
+            for z in range(w):
+                Y[w * (5 * ((2 * x + 3 * y) % 5) + y) + z] = X[w * (5 * y + x) + (z - dz) % w]
+    return Y
+
+def SingleSbox(x0, x1, x2, x3, x4):
+    y0 = x0 + (1 + x1) * x2
+    y1 = x1 + (1 + x2) * x3
+    y2 = x2 + (1 + x3) * x4
+    y3 = x3 + (1 + x4) * x0
+    y4 = x4 + (1 + x0) * x1
+    return y0, y1, y2, y3, y4
+
+def sbox(A, w):
+    B = list(A)
+    # the 5 bits of a row(x = 0..4 for fixed y, z) go through one sbox
+    for y in range(5):
+        for z in range(w):
+            row = [w * (5 * y + x) + z for x in range(5)]
+            for i, b in zip(row, SingleSbox(*[A[i] for i in row])):
+                B[i] = b
+    return B
+
+def addConst(X, r, w):
+    for z in range(w):
+        if CONSTANTS[r] >> z & 0x1:
+            X[z] += 1
+    return X
+
+def trail_states(active: list, w: int) -> list:
+    """difference states of a trail of read_trails
+
+    Args:
+        active (list): active bits (x, y, z) of every state
+        w (int): lane size
+
+    Returns:
+        list: states of 0/1
+    """
+    diff = []
+    for bits in active:
+        state = [0] * (25 * w)
+        for x, y, z in bits:
+            state[w * (5 * y + x) + z] = 1
+        diff.append(state)
+    return diff
+
+def model(diff: list, rounds: int, w: int, start: int = 0) -> set:
+    """the equations of a trail
+
+    Args:
+        diff (list): rounds states of 0/1, diff[0] is the input of the first chi
+        rounds (int): number of rounds
+        w (int): lane size
+        start (int, optional): offset of the round constants. Defaults to 0.
+
+    Raises:
+        ValueError: the parameters do not fit
+        ImpossibleTrail: the trail contradicts the propagated difference
+
+    Returns:
+        set: Q
+    """
+    if w not in LANES:
+        raise ValueError("the lane size is one of {}, not {}".format(LANES, w))
+    if len(diff) != rounds:
+        raise ValueError("{} rounds need {} states, the trail has {}".format(rounds, rounds, len(diff)))
+    if start < 0 or start + rounds - 1 >= max_rounds(w):
+        raise ValueError("Keccak-f[{}] has {} rounds".format(25 * w, max_rounds(w)))
+    state = 25 * w
+    R = declare_ring([Block('x', (2 * rounds - 1) * state), 'u'], globals())
+    U = R(u)
+    X = [R(x(i)) for i in range(state)]
+    a_vars = [[R(x(state * (2 * r + 1) + i)) for i in range(state)] for r in range(rounds - 1)]
+    b_vars = [[R(x(state * (2 * r + 2) + i)) for i in range(state)] for r in range(rounds - 1)]
+    ######## Initialization ########
+    for i in range(state):
+        X[i] += diff[0][i] * U
+    Q = set()
+    for r in range(1, rounds):
+        X = sbox(X, w)
+        X = linearize(Q, X, U, a_vars[r - 1], b_vars[r - 1])
+        X = addConst(X, start + r, w)
+        X = theta(X, w)
+        X = rhoPi(X, w)
+        add_difference(Q, X, U, diff[r], r)
+    return Q
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="keccakf")
+    arg_parser.description = "Print the ANF model of a differential trail of Keccak-f[25w]."
+    arg_parser.add_argument("-w", "--lane", type=int, default=64, choices=LANES, help="lane size, default 64")
+    arg_parser.add_argument("-r", "--rounds", type=int, default=4, help="number of rounds, default 4")
+    arg_parser.add_argument("-f", "--file", type=str, required=True, help="trail file, see read_trails.py")
+    arg_parser.add_argument("--index", type=int, default=0, help="trail of the file, default the first")
+    arg_parser.add_argument("--start-round", type=int, default=0, help="offset of the round constants, default 0")
+    arg_parser.add_argument("--solve", action="store_true", help="solve with sage instead of printing the anf")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("{}rkeccak_{}".format(args.rounds, 25 * args.lane))
+    trails = read_trails(args.file, args.rounds - 1, args.lane)
+    if args.index >= len(trails):
+        logger.error("{} has {} trails".format(args.file, len(trails)))
+        exit(1)
+    diff = trail_states(trails[args.index], args.lane)
+    try:
+        Q = model(diff, args.rounds, args.lane, args.start_round)
+    except ImpossibleTrail as e:
+        logger.warning("Impossible: {}".format(e))
+        print("Impossible")
+        exit(0)
+    if args.solve:
+        from sage.sat.boolean_polynomials import solve as solve_sat
+        logger.info("start solve")
+        logger.info(solve_sat(list(Q)))
+    else:
+        n = write_anf(Q, sys.stdout)
+        logger.info("{} equations".format(n))
+    logger.info("finished")
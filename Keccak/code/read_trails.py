@@ -17,12 +17,15 @@ def active_hex(h: str) -> list:
             ret.append(i)
     return ret
 
-def read_trails(path: str, ROUNDS: int) -> list:
+def read_trails(path: str, ROUNDS: int, z_len: int = z_len) -> list:
     """
     return the active bits of the trails
 
-    trail starts with "β0"
+    trail starts with "β0", a lane has z_len // 4 hex digits(one digit for z_len < 4),
+    the first digit holds the highest z
     """
+    # hex digits of a lane
+    digits = max(1, z_len // 4)
     f = open(path, "r")
     # read in lines
     lines = f.readlines()
@@ -49,7 +52,7 @@ def read_trails(path: str, ROUNDS: int) -> list:
                     # a line is a plane(5 lanes)
                     # exclude '\n'
                     line = lines[i].rstrip("\n")
-                    if len(line) < z_len/4 * x_len:
+                    if len(line) < digits * x_len:
                         i += 1
                         continue
                     # split by "|"
@@ -60,18 +63,21 @@ def read_trails(path: str, ROUNDS: int) -> list:
                     for x in range(x_len):
                         # read each lane in plane
                         lane = plane[x].replace(" ", "")
-                        if len(lane) != z_len//4:
-                            raise ValueError("a lane at line {} should contains {} bits, not {} bits".\
-                                                format(i+1, z_len, len(lane)*4))
+                        if len(lane) != digits:
+                            raise ValueError("a lane at line {} should contains {} hex digits, not {}".\
+                                                format(i+1, digits, len(lane)))
                         # read lane in hex(4bits)
-                        for h in range(z_len//4):
+                        for h in range(digits):
                             hbits = lane[h]
                             # not zero (i.e. active)
                             if hbits != zero_sign:
                                 # get active bits index
                                 for tmpz in active_hex(hbits):
                                     # transform to z index
-                                    z = tmpz + (15-h)*4
+                                    z = tmpz + (digits-1-h)*4
+                                    if z >= z_len:
+                                        raise ValueError("a lane at line {} has bit {} outside z_len {}".\
+                                                            format(i+1, z, z_len))
                                     state_active_bits.append((x, y, z))
                     # next plane
                     i += 1
@@ -87,8 +93,9 @@ if __name__ == "__main__":
     parse = argparse.ArgumentParser(description="read trails")
     parse.add_argument("-f", "--file", type=str, default='/home/user/lhn/bosphorus/keccak/trails_800.txt', help="file path")
     parse.add_argument("-r", "--rounds", type=int, default=4, help="file path")
+    parse.add_argument("-w", "--lane", type=int, default=z_len, help="lane size z_len, default 64")
     args = parse.parse_args()
     filepath = args.file
     ROUNDS = args.rounds
 
-    # print(read_trails(filepath, ROUNDS))
\ No newline at end of file
+    # print(read_trails(filepath, ROUNDS, args.lane))
\ No newline at end of file
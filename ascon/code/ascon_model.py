@@ -0,0 +1,170 @@
+"""ANF model of an Ascon differential trail for every variant of the scripts in this directory
+
+Ascon128_3rfinal.py, Ascon128_4rfinal.py, 3rascon128iteration.py, 2rtda.py, 2rhash_Zong.py, ... differ only in
+ROUNDS, the first round constant, the trail and which bits of the last state are checked, they are all
+
+    sage -python ascon_model.py -r ROUNDS --trail TRAIL [--start-round S] [--final-matrix] [--mask BITS] [--tda]
+
+the trail file(tools/trail.py, 64-bit words) has the states of diff of the scripts:
+    diff[2r]     input of round r(after the Matrix of round r-1)
+    diff[2r+1]   output of the Sbox of round r
+    diff[2R]     with --final-matrix, after the Matrix of the last round
+a free state or bit(?) adds no equation, e.g. the middle states of 2rtda.py, a free bit of the input has a
+symbolic difference as in ascon_direct.py.
+round r adds the constant of round start + r, --mask keeps only some bits of the last state(rows 192-320
+of Ascon128_4rfinal.py are --mask 192:320), and --tda makes the input difference of the rate symbolic:
+its bits are the variables x(320 + 640 L + i) after the ones of the L linearized rounds, as in 2rtda.py,
+the free input bits follow them. the variant sets the rate, an input difference outside the rate(1 or ?)
+is refused.
+
+Example:
+    sage -python ascon_model.py -r 4 --trail 4rfinal.trail --mask 192:320 > 4rfinal.anf
+    sage -python ascon_model.py --variant hash -r 2 --final-matrix --trail 2rtda.trail --tda > 2rtda.anf
+"""
+from __future__ import division
+import os
+import sys
+import argparse
+
+from sage.all import *
+from sage.rings.polynomial.pbori.pbori import *
+from sage.rings.polynomial.pbori import *
+
+# the shared model steps and the trail files
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from anfengine import ImpossibleTrail, add_difference, linearize, write_anf
+from ascon_direct import CONSTANTS, LANE, MATRIX, STATE, const_bits
+from common import get_logger, parse_range
+from trail import read_trail
+
+# variant -> bits of the rate, the input bits a message can change
+VARIANTS = {"permutation": 320, "ascon128": 64, "ascon128a": 128, "hash": 64}
+
+def SingleMatrix(X, r0, r1):
+    return [X[i] + X[(i + (64 - r0)) % 64] + X[(i + (64 - r1)) % 64] for i in range(64)]
+
+def Matrix(X):
+    # the rotations of every row are MATRIX of ascon_direct.py
+    for row, (r0, r1) in enumerate(MATRIX):
+        X[row * LANE:(row + 1) * LANE] = SingleMatrix(X[row * LANE:(row + 1) * LANE], r0, r1)
+    return X
+
+def SingleSbox(y0, y1, y2, y3, y4):
+    x0 = y4*y1 + y3 + y2*y1 + y2 + y1*y0 + y1 + y0
+    x1 = y4 + y3*y2 + y3*y1 + y3 + y2*y1 + y2 + y1 + y0
+    x2 = y4*y3 + y4 + y2 + y1 + 1
+    x3 = y4*y0 + y4 + y3*y0 + y3 + y2 + y1 + y0
+    x4 = y4*y1 + y4 + y3 + y1*y0 + y1
+    return x0, x1, x2, x3, x4
+
+def Sbox(Y):
+    Z = list(Y)
+    for j in range(64):
+        Z[0 + j], Z[64 + j], Z[128 + j], Z[192 + j], Z[256 + j] = SingleSbox(Y[0 + j], Y[64 + j], Y[128 + j], Y[192 + j], Y[256 + j])
+    return Z
+
+def addConst(X, r):
+    for i in const_bits(r):
+        X[i] += 1
+    return X
+
+def check_trail(diff: list, rounds: int, start: int, final_matrix: bool, variant: str) -> None:
+    """check the shape of a trail
+
+    Args:
+        diff (list): trail states
+        rounds (int): number of rounds
+        start (int): index of the first round constant
+        final_matrix (bool): the trail ends after the last Matrix
+        variant (str): a key of VARIANTS
+
+    Raises:
+        ValueError: the trail does not fit the parameters
+    """
+    if len(diff) != 2 * rounds + final_matrix:
+        raise ValueError("{} rounds need {} states, the trail has {}".format(rounds, 2 * rounds + final_matrix, len(diff)))
+    if start < 0 or start + rounds > len(CONSTANTS):
+        raise ValueError("round constants {}..{} do not exist".format(start, start + rounds - 1))
+    rate = VARIANTS[variant]
+    if any(d is None or d for d in diff[0][rate:]):
+        raise ValueError("{} has a rate of {} bits, the input difference is outside".format(variant, rate))
+
+def model(diff: list, rounds: int, start: int = 0, final_matrix: bool = False, mask: list = None,
+          variant: str = "permutation", tda: bool = False) -> set:
+    """the equations of a trail
+
+    Args:
+        diff (list): trail states, 0, 1 or None per bit
+        rounds (int): number of rounds
+        start (int, optional): index of the first round constant. Defaults to 0.
+        final_matrix (bool, optional): the trail ends after the last Matrix. Defaults to False.
+        mask (list, optional): bits of the last state to check, None for all. Defaults to None.
+        variant (str, optional): a key of VARIANTS. Defaults to "permutation".
+        tda (bool, optional): the input difference of the rate is symbolic. Defaults to False.
+
+    Raises:
+        ValueError: the trail does not fit the parameters
+        ImpossibleTrail: the trail contradicts the propagated difference
+
+    Returns:
+        set: Q
+    """
+    check_trail(diff, rounds, start, final_matrix, variant)
+    rate = VARIANTS[variant]
+    # rounds cut into new variables
+    cuts = rounds - 1 + final_matrix
+    symbolic = STATE + 2 * cuts * STATE + (rate if tda else 0)
+    # free input bits that --tda does not cover
+    free = [i for i in range(STATE) if diff[0][i] is None and not (tda and i < rate)]
+    R = declare_ring([Block('x', symbolic + len(free)), 'u'], globals())
+    U = R(u)
+    X = [R(x(i)) for i in range(STATE)]
+    a_vars = [[R(x(STATE * (2 * r + 1) + i)) for i in range(STATE)] for r in range(cuts)]
+    b_vars = [[R(x(STATE * (2 * r + 2) + i)) for i in range(STATE)] for r in range(cuts)]
+    diff = [list(state) for state in diff]
+    if tda:
+        diff[0][:rate] = [R(x(STATE + 2 * cuts * STATE + i)) for i in range(rate)]
+    for n, i in enumerate(free):
+        diff[0][i] = R(x(symbolic + n))
+    if mask is not None:
+        keep = set(mask)
+        diff[-1] = [d if i in keep else None for i, d in enumerate(diff[-1])]
+    ######## Initialization ########
+    for i in range(STATE):
+        X[i] += diff[0][i] * U
+    Q = set()
+    for r in range(rounds):
+        X = addConst(X, start + r)
+        X = Sbox(X)
+        add_difference(Q, X, U, diff[2 * r + 1], 2 * r + 1)
+        if r == rounds - 1 and not final_matrix:
+            break
+        X = linearize(Q, X, U, a_vars[r], b_vars[r])
+        X = Matrix(X)
+        add_difference(Q, X, U, diff[2 * r + 2], 2 * r + 2)
+    return Q
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="ascon_model")
+    arg_parser.description = "Print the ANF model of an Ascon differential trail."
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--trail", type=str, required=True, help="trail file, see tools/trail.py")
+    arg_parser.add_argument("--variant", type=str, default="permutation", choices=sorted(VARIANTS),
+                            help="rate of the input difference, default permutation(all 320 bits)")
+    arg_parser.add_argument("--start-round", type=int, default=0, help="index of the first round constant, default 0")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="the trail ends after the last Matrix")
+    arg_parser.add_argument("--mask", type=str, default=None, help="bits of the last state to check, e.g. 192:320")
+    arg_parser.add_argument("--tda", action="store_true", help="the input difference of the rate is symbolic")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("ascon_model")
+    diff = read_trail(args.trail, STATE, LANE, msb_first=True)
+    mask = None if args.mask is None else parse_range(args.mask)
+    try:
+        Q = model(diff, args.rounds, args.start_round, args.final_matrix, mask, args.variant, args.tda)
+    except ImpossibleTrail as e:
+        logger.warning("Impossible: {}".format(e))
+        print("Impossible")
+        exit(0)
+    n = write_anf(Q, sys.stdout)
+    logger.info("finished, {} equations".format(n))
@@ -1,8 +1,10 @@
 import sys
-import math
+import argparse
+import numpy as np
 
 ROUNDS = 3
-# numvars
+LANE = 64
+# numvars, for lane width w the state has 25w bits, 1600 for w = 64
     # a_vars[0]      v 1    -  1600
     # a_vars[1]      v 1601 -  3200
     # a_vars[2]      v 3201 -  4800
@@ -15,8 +17,9 @@ ROUNDS = 3
     # b_vars[3]      v 14401 - 16000
     # b_vars[4]      v 16001 - 17600
     # b_vars[5]      v 17601 - 19200
-    
-# keccak_sbox 29 clauses  
+    # a_vars[k] starts at k*25w + 1, b_vars[k] at (2*ROUNDS + k)*25w + 1
+
+# keccak_sbox 29 clauses
 cnf_chi = [
     [4, -9, -10],
     [-4, 9, -10],
@@ -48,33 +51,65 @@ cnf_chi = [
     [-2, -4, -7, 8],
     [-1, 4, 6, -8, -10]
 ]
-row = [0]*10
-for r in range(ROUNDS): 
-    for y in range (5):
-        for z in range (64):   
-            # a_vars
-            #row = [2*r*1600+(z+320*y),2*r*1600+64+z+320*y,2*r*1600+128+z+320*y,2*r*1600+192+z+320*y,2*r*1600+256+z+320*y,(2*r+1)*1600+z+320*y,(2*r+1)*1600+64+z+320*y,(2*r+1)*1600+128+z+320*y,(2*r+1)*1600+192+z+320*y,(2*r+1)*1600+256+z+320*y]
-            # b_vars
-            row = [2*r*1600+9600+(z+320*y),2*r*1600+9600+64+z+320*y,2*r*1600+9600+128+z+320*y,2*r*1600+9600+192+z+320*y,2*r*1600+9600+256+z+320*y,(2*r+1)*1600+9600+z+320*y,(2*r+1)*1600+9600+64+z+320*y,(2*r+1)*1600+9600+128+z+320*y,(2*r+1)*1600+9600+192+z+320*y,(2*r+1)*1600+9600+256+z+320*y]
-            
-            for i in range (len(cnf_chi)):
-                CNF_clause= ""
-                for j in range(len(cnf_chi[i])):
-                    temp = int(cnf_chi[i][j])
-                    if temp > 0 :
-                        CNF_clause += str(row[ temp-1] + 1) + " "
-                    else:
-                        CNF_clause += str(-1 * row[abs(temp+1)]-1) + " "
-                CNF_clause += '0'
-                print(CNF_clause)
-                
 
-"""
-for i in range (len(cnf_chi)):
-    out= ""
-    for j in range(len(cnf_chi[i])):
-        out += str(cnf_chi[i][j]) + " "
-    out += '0' 
-    print('\n')
-    print(out)
-"""
\ No newline at end of file
+def chi_rows(rounds: int = ROUNDS, lane: int = LANE, kind: str = "b") -> np.ndarray:
+    """0-based variables of the chi inputs and outputs of every row
+
+    Args:
+        rounds (int, optional): number of rounds. Defaults to ROUNDS.
+        lane (int, optional): lane width w. Defaults to LANE.
+        kind (str, optional): "a" for a_vars, "b" for b_vars. Defaults to "b".
+
+    Returns:
+        np.ndarray: shape (rounds*5*lane, 10), row[0..4] are the inputs x = 0..4 and row[5..9] the outputs,
+            ordered by round, y and z
+    """
+    state = 25 * lane
+    base = 0 if kind == "a" else 2 * rounds * state
+    r = np.arange(rounds).reshape(rounds, 1, 1, 1)
+    y = np.arange(5).reshape(1, 5, 1, 1)
+    z = np.arange(lane).reshape(1, 1, lane, 1)
+    # input x of row (y, z) is 2r*state + x*w + 5w*y + z, the outputs follow in the next state
+    x = np.tile(np.arange(5), 2).reshape(1, 1, 1, 10)
+    side = np.repeat(np.arange(2), 5).reshape(1, 1, 1, 10)
+    row = base + (2 * r + side) * state + x * lane + 5 * lane * y + z
+    return row.reshape(-1, 10)
+
+def chi_clauses(rows: np.ndarray) -> np.ndarray:
+    """the literals of cnf_chi for every row in one broadcast
+
+    Args:
+        rows (np.ndarray): output of chi_rows
+
+    Returns:
+        np.ndarray: shape (len(rows), number of literals in cnf_chi), the 29 clauses of a row concatenated
+    """
+    template = np.array([t for clause in cnf_chi for t in clause])
+    # literal t of the template is variable row[|t| - 1] + 1 with the sign of t
+    return np.sign(template) * (rows[:, np.abs(template) - 1] + 1)
+
+def write_clauses(f, literals: np.ndarray) -> None:
+    """write the clauses in DIMACS, one block of 29 clauses per row of literals
+
+    Args:
+        f (file): output
+        literals (np.ndarray): output of chi_clauses
+    """
+    fmt = "\n".join(" ".join(["%d"] * len(clause)) + " 0" for clause in cnf_chi)
+    np.savetxt(f, literals, fmt=fmt)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="chicnf")
+    arg_parser.description = "Print the chi clauses of the direct keccak model in DIMACS."
+    arg_parser.add_argument("-r", "--rounds", type=int, default=ROUNDS, help="number of rounds")
+    arg_parser.add_argument("-w", "--lane", type=int, default=LANE, help="lane width")
+    arg_parser.add_argument("--vars", type=str, default="b", choices=["a", "b"], help="a_vars or b_vars")
+    arg_parser.add_argument("-o", "--output", type=str, default=None, help="output file, default stdout")
+    args = arg_parser.parse_args()
+
+    literals = chi_clauses(chi_rows(args.rounds, args.lane, args.vars))
+    if args.output:
+        with open(args.output, "w") as f:
+            write_clauses(f, literals)
+    else:
+        write_clauses(sys.stdout, literals)
@@ -1,25 +1,92 @@
-n=4
-# open file
-f1 = open("/home/n2107349e/SAT/keccak/sim_keccak_linear.cnf", "r")
-f2 = open("/home/n2107349e/SAT/keccak/firstmessage_chi.cnf", "r")
-f3 = open("/home/n2107349e/SAT/keccak/secondmessage_chi.cnf", "r")
-# file to write
-f4 = open("/home/n2107349e/SAT/keccak/keccak_bos.cnf", "w")
-# buf to write
-buf = ""
-# read file
-buf = f1.read()
-buf += f2.read()
-buf += f3.read()
-# find the end of the first line
-index_1st = buf.find("\n")
-# modify first line
-line_1st = buf[:index_1st + 1].split()
-line_1st[3] = str(int(line_1st[3]) + (n - 1) * 2 * 320 * 29)
-buf = " ".join(line_1st) + "\n" + buf[index_1st + 1:]
-f4.write(buf)
-# close
-f1.close()
-f2.close()
-f3.close()
-f4.close()
\ No newline at end of file
+import os
+import argparse
+
+# bytes read at a time, the merge never holds more than this of a fragment in memory
+BUFFER = 1 << 20
+# width of the header line reserved before the clauses are counted
+HEADER_WIDTH = 64
+
+def scan(text: str) -> tuple:
+    """drop the header and comment lines of complete lines of a cnf, count its clauses and variables
+
+    Args:
+        text (str): complete lines of a DIMACS file
+
+    Returns:
+        tuple: (clause lines, number of clauses, max variable)
+    """
+    if text.startswith(("p", "c")) or "\np" in text or "\nc" in text:
+        text = "".join(line for line in text.splitlines(True) if not line.startswith(("p", "c")))
+    # "x" lines are cryptominisat xor clauses, every clause ends with a 0 token
+    tokens = text.replace("x", " ").split()
+    if not tokens:
+        return text, 0, 0
+    values = list(map(int, tokens))
+    return text, values.count(0), max(max(values), -min(values))
+
+def header(nvars: int, nclauses: int) -> str:
+    """the "p cnf" line padded to HEADER_WIDTH
+
+    Args:
+        nvars (int): number of variables
+        nclauses (int): number of clauses
+
+    Returns:
+        str: header line with trailing spaces
+    """
+    line = "p cnf {} {}".format(nvars, nclauses)
+    return line.ljust(HEADER_WIDTH - 1) + "\n"
+
+def combine(inputs: list, output: str) -> tuple:
+    """stream cnf fragments into one cnf with a correct header
+
+    Args:
+        inputs (list): cnf files, with or without header
+        output (str): merged cnf
+
+    Returns:
+        tuple: (number of variables, number of clauses)
+    """
+    nvars = nclauses = 0
+    with open(output, "w") as out:
+        # reserve the header, it is overwritten once the counts are known
+        out.write(header(0, 0))
+        for path in inputs:
+            carry = ""
+            with open(path, "r") as f:
+                while True:
+                    chunk = f.read(BUFFER)
+                    if not chunk:
+                        break
+                    # only complete lines are scanned, the rest waits for the next chunk
+                    cut = chunk.rfind("\n") + 1
+                    if cut == 0:
+                        carry += chunk
+                        continue
+                    text, n, m = scan(carry + chunk[:cut])
+                    carry = chunk[cut:]
+                    out.write(text)
+                    nclauses += n
+                    nvars = max(nvars, m)
+            if carry:
+                # a fragment may end without a newline
+                text, n, m = scan(carry + "\n")
+                out.write(text)
+                nclauses += n
+                nvars = max(nvars, m)
+        out.seek(0)
+        out.write(header(nvars, nclauses))
+    return nvars, nclauses
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="combine_cnf")
+    arg_parser.description = "Merge cnf fragments, e.g. the linear part and the chi clauses of both messages."
+    arg_parser.add_argument("inputs", type=str, nargs="+", help="cnf fragments in order")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="merged cnf")
+    args = arg_parser.parse_args()
+
+    for path in args.inputs:
+        if os.path.abspath(path) == os.path.abspath(args.output):
+            arg_parser.error("the output must not be one of the inputs")
+    nvars, nclauses = combine(args.inputs, args.output)
+    print("p cnf {} {} written to {}".format(nvars, nclauses, args.output))
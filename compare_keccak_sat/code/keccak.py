@@ -1,15 +1,13 @@
 from __future__ import division
-from sage.all import *
-from copy import copy, deepcopy
-from sage.rings.polynomial.pbori.pbori import *
-from sage.rings.polynomial.pbori import *
-from random import randint
-from sage.sat.boolean_polynomials import solve as solve_sat
-from sage.sat.converters.polybori import CNFEncoder
-from sage.sat.solvers.dimacs import DIMACS
+import os
 import sys
+import argparse
 import logging
 
+# the dimacs writer of the direct models
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from cnfbuilder import CNFBuilder, Unsatisfiable
+
 # create logger
 logger = logging.getLogger("4rkeccak_1600")
 logger.setLevel(logging.DEBUG)
@@ -46,6 +44,10 @@ p1: 320-640
 p4: 1280-1600
 <<<: cycle left shift
 <<: non-cycle left shift
+
+the linear layer works on GF(2) affine forms stored as python ints instead of PolyBoRi polynomials:
+bit 0 of a form is the constant and bit v is DIMACS variable v(x(v-1) of the old ring), so + is ^.
+plain 0/1 states are forms without variables, round() and checkround() still evaluate keccak-f on them.
 """ 
 state = 1600
 lane_z = state // 25
@@ -57,29 +59,29 @@ def SinglePlane(X, dx, dz):
     return P
 
 def theta(X):
-    E1 = [R(0) for i in range(5 * lane_z)]
-    E2 = [R(0) for i in range(5 * lane_z)]
+    E1 = [0 for i in range(5 * lane_z)]
+    E2 = [0 for i in range(5 * lane_z)]
     P = []
     Y = []
     for i in range(5 * lane_z):
-        P.append(X[i] + X[i + 5 * lane_z] + X[i + 10*lane_z] + X[i + 15 * lane_z] + X[i + 20 * lane_z])
-    E1[0:320] = SinglePlane(P, 1, 0)
-    E2[0:320] = SinglePlane(P, -1, 1)
+        P.append(X[i] ^ X[i + 5 * lane_z] ^ X[i + 10*lane_z] ^ X[i + 15 * lane_z] ^ X[i + 20 * lane_z])
+    E1[0:5 * lane_z] = SinglePlane(P, 1, 0)
+    E2[0:5 * lane_z] = SinglePlane(P, -1, 1)
 
     for j in range(5 * lane_z):
-        Y.append(X[j] + E1[j] + E2[j])
+        Y.append(X[j] ^ E1[j] ^ E2[j])
         
     for j in range(5 * lane_z):
-        Y.append(X[j + 5 * lane_z] + E1[j] + E2[j])
+        Y.append(X[j + 5 * lane_z] ^ E1[j] ^ E2[j])
 
     for j in range(5 * lane_z):
-        Y.append(X[j + 10*lane_z] + E1[j] + E2[j])
+        Y.append(X[j + 10*lane_z] ^ E1[j] ^ E2[j])
 
     for j in range(5 * lane_z):
-        Y.append(X[j + 15 * lane_z] + E1[j] + E2[j])
+        Y.append(X[j + 15 * lane_z] ^ E1[j] ^ E2[j])
 
     for j in range(5 * lane_z):
-        Y.append(X[j + 20*lane_z] + E1[j] + E2[j])
+        Y.append(X[j + 20*lane_z] ^ E1[j] ^ E2[j])
     return Y
 
 def SingleLane(X, dz):
@@ -99,7 +101,7 @@ def rhoPi(X):
         for x in range(5):
             X[(5 * lane_z * y + lane_z * x):(5 * lane_z * y + lane_z * x + lane_z)] = SingleLane(X[(5 * lane_z * y + lane_z * x):(5 * lane_z * y + lane_z * x + lane_z)], r[x][y])
 
-    Y = [R(0) for i in range(state)]
+    Y = [0 for i in range(state)]
     for y in range(5):
         for x in range(5):
             for z in range(lane_z):
@@ -107,11 +109,12 @@ def rhoPi(X):
     return(Y)
 
 def SingleSbox(x0, x1, x2, x3, x4):
-    y0 = x0 + (1 + x1) * x2
-    y1 = x1 + (1 + x2) * x3
-    y2 = x2 + (1 + x3) * x4
-    y3 = x3 + (1 + x4) * x0
-    y4 = x4 + (1 + x0) * x1
+    # on 0/1 values only, chi is not linear
+    y0 = x0 ^ (1 ^ x1) & x2
+    y1 = x1 ^ (1 ^ x2) & x3
+    y2 = x2 ^ (1 ^ x3) & x4
+    y3 = x3 ^ (1 ^ x4) & x0
+    y4 = x4 ^ (1 ^ x0) & x1
     return y0, y1, y2, y3, y4
 
 
@@ -124,7 +127,7 @@ def sbox(A):
     Returns:
         list: state bits output
     """
-    B = [R(0) for i in range(state)]
+    B = [0 for i in range(state)]
     # 5 bits as a block, each block uses a 5-bits sbox
     for z in range(lane_z):
         for y in range(5):
@@ -158,7 +161,7 @@ def addConst ( X, r ):
         0x8000000080008008]
     for i in range(lane_z):
         if constant[r] >> i  & 0x1:
-            X[i] += 1
+            X[i] ^= 1
     return X
 
 def round(X,r):
@@ -178,14 +181,59 @@ def checkround(X):
             print(X[lane_z*i + j], end=' ')
     return X
 
+def form_vars(form):
+    """DIMACS variables of an affine form
+
+    Args:
+        form (int): bit 0 the constant, bit v variable v
+
+    Returns:
+        list: variables
+    """
+    variables = []
+    form &= ~1
+    while form:
+        # lowest set bit, a form has at most a few dozen of them
+        low = form & -form
+        variables.append(low.bit_length() - 1)
+        form ^= low
+    return variables
+
+def add_equation(builder, form):
+    """add form = 0 as a xor constraint
+
+    Args:
+        builder (CNFBuilder): the model
+        form (int): affine form
+    """
+    builder.add_xor(form_vars(form), form & 1)
+
+def state_forms(first):
+    """forms of a state of fresh variables
+
+    Args:
+        first (int): DIMACS variable of bit 0
+
+    Returns:
+        list: forms
+    """
+    return [1 << (first + i) for i in range(state)]
+
 
 if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="keccak")
+    arg_parser.description = "Write the linear layer of the direct Keccak model as xor constraints."
+    arg_parser.add_argument("--xor", type=str, default="native", choices=["native", "cnf"],
+                            help="native xor lines for cryptominisat, cnf for cadical")
+    arg_parser.add_argument("--xor-cut", type=int, default=5, help="max variables of a xor written as clauses")
+    arg_parser.add_argument("-o", "--output", type=str, default="keccak_linear", help="cnf file")
+    args = arg_parser.parse_args()
+
     ROUNDS = 4
     state = 1600
     lane_z = state // 25
-    R = declare_ring( [ Block( 'x', (4*ROUNDS-4)*state ),'u' ], globals() )
-    a_vars  = [[R(x(state*r + i)) for i in range(state)] for r in range(2*ROUNDS -2)]
-    b_vars  = [[R(x(state*(r + 2*ROUNDS -2) + i)) for i in range (state)] for r in range(2*ROUNDS -2)]      
+    a_vars  = [state_forms(state*r + 1) for r in range(2*ROUNDS -2)]
+    b_vars  = [state_forms(state*(r + 2*ROUNDS -2) + 1) for r in range(2*ROUNDS -2)]
     # numvars
     # a_vars[0]      v 1    -  1600
     # a_vars[1]      v 1601 -  3200
@@ -240,34 +288,36 @@ if __name__ == '__main__':
                     diff[3][64 * (i + 5 * j) + k] = 1
                 else:
                     diff[3][64 * (i + 5 * j) + k] = 0
-    Q = set()
-    ################################ Start Get ANFs ###################################################
-    r = 0
-    for i in range(state):
-        Q.add(a_vars[2*r][i] + b_vars[2*r][i] + diff[2*r][i])
-    for r in range(1,ROUNDS):
-        # ignore non-linear operation a/b_vars[even] & a/b_vars[odd]
-        X = a_vars[2*r-1].copy() 
-        Y = b_vars[2*r-1].copy()
-        #a/b_1 --> a/b_2
-        X = addConst(X, r)
-        X = theta(X)
-        X = rhoPi(X)
-        Y = addConst(Y, r)
-        Y = theta(Y)
-        Y = rhoPi(Y)
-        for i in range( state ):
-            Q.add(X[i] + Y[i] + diff[r][i]) 
-        # a/b_2
-        if r < ROUNDS -1 :
-            for i in range(state):
-                Q.add(X[i] + a_vars[2*r][i] ) 
-                Q.add(Y[i] + b_vars[2*r][i] )      
-    
-    solver = DIMACS(filename = "keccak_linear")
-    e = CNFEncoder(solver, R)
-    e(list(Q))
-    solver.write()
-    
-    
-    
\ No newline at end of file
+    # auxiliary variables of the cut xors come after v 19200
+    builder = CNFBuilder(args.xor, args.xor_cut)
+    builder.new_vars(2 * (2*ROUNDS - 2) * state)
+    ################################ Start Get xors ###################################################
+    try:
+        r = 0
+        for i in range(state):
+            add_equation(builder, a_vars[2*r][i] ^ b_vars[2*r][i] ^ diff[2*r][i])
+        for r in range(1,ROUNDS):
+            # ignore non-linear operation a/b_vars[even] & a/b_vars[odd]
+            X = a_vars[2*r-1].copy()
+            Y = b_vars[2*r-1].copy()
+            #a/b_1 --> a/b_2
+            X = addConst(X, r)
+            X = theta(X)
+            X = rhoPi(X)
+            Y = addConst(Y, r)
+            Y = theta(Y)
+            Y = rhoPi(Y)
+            if r < ROUNDS -1 :
+                # a/b_2, X + Y + diff is then a_2 + b_2 + diff, 2 variables instead of 22
+                for i in range(state):
+                    add_equation(builder, X[i] ^ a_vars[2*r][i])
+                    add_equation(builder, Y[i] ^ b_vars[2*r][i])
+                    add_equation(builder, a_vars[2*r][i] ^ b_vars[2*r][i] ^ diff[r][i])
+            else:
+                for i in range( state ):
+                    add_equation(builder, X[i] ^ Y[i] ^ diff[r][i])
+    except Unsatisfiable as e:
+        logger.warning("Impossible: {}".format(e))
+        exit(0)
+    nvars, nclauses = builder.write(args.output, ["keccak linear layers of {} rounds".format(ROUNDS)])
+    logger.info("wrote {} with {} variables and {} clauses".format(args.output, nvars, nclauses))
@@ -63,6 +63,9 @@ def hex2vector(n: int, length: int = 32) -> vector:
     res = vector(GF(2), res)
     return res
 
+# bits of s0,0 flipped in round r: 0x9e377900 ^ r, bit k is (n >> k) & 1 as in hex2vector
+ROUND_CONSTANTS = [[k for k in range(32) if ((0x9e377900 ^ r) >> k) & 1] for r in range(25)]
+
 class Gimli:
     """Gimli: a 384-bit permutation
     word: 32 bits
@@ -71,7 +74,7 @@ class Gimli:
                                                           |
                                             lowest byte at lowest significant
     But hex2vector() function does not convert to little endian, and function's output is [0, 0, 1, 0, 0, 0, 0, 0, ..., 0],
-    so that cycle_lshift() and noncycle_lshift() function is simpler
+    so that the rotations and shifts of non_linear() are simpler
     state: 384 bits = 3 * 4 words
     We use a list to denote a state/word and the element of the list is a bit
     Gimli uses si,j to denote each word, 0 <= i <= 2, 0 <= j <= 3
@@ -96,6 +99,7 @@ class Gimli:
     y = 4
     z = 32  # a word length
     state = x * y * z
+    round_consts = ROUND_CONSTANTS
     def __init__(self, R: Any) -> None:
         """initial a gimli permutation object
 
@@ -103,122 +107,25 @@ class Gimli:
             R (Any): the ring where the permutation is
         """
         # define gimli parameters
-        # convert 0x9e377900 to binary vector
-        self.const = hex2vector(0x9e377900, self.z)
         # indexes of each word
         self.index_start = [[i * self.z * self.y + j * self.z for j in range(self.y)] for i in range(self.x)]
         self.index_end = [[self.index_start[i][j] + self.z for j in range(self.y)] for i in range(self.x)]
         self.ring = R
+        # index tables of the column-parallel SP-box, position j * 32 + k of a row holds bit k of word j
+        row = self.y * self.z
+        # s0 <<< 24 and s1 <<< 9 of all four columns
+        self.rot24 = [j * self.z + (k - 24) % self.z for j in range(self.y) for k in range(self.z)]
+        self.rot9 = [row + j * self.z + (k - 9) % self.z for j in range(self.y) for k in range(self.z)]
+        # << offset: (position, source position) for the bits that are not shifted in as 0
+        self.shift = {offset: [(j * self.z + k, j * self.z + k - offset) for j in range(self.y) for k in range(offset, self.z)]
+                      for offset in (1, 2, 3)}
     
-    def cycle_lshift(self, word: list, offset: int) -> list:
-        """cycle left shift offset bits
-
-        Args:
-            word (list): the word(32 bits) to shift
-            offset (int): shift bits
-
-        Returns:
-            list: output word
-        """
-        # check word's length
-        if len(word) != self.z:
-            logger = get_logger()
-            logger.error("word length not equal to {}".format(self.z))
-            exit(1)
-        # cycle left shift
-        return word[self.z - offset:self.z] + word[0:self.z - offset]
-
-    def noncycle_lshift(self, word: list, offset: int) -> list:
-        """noncycle left shift offset bits
-
-        Args:
-            word (list): the word(32 bits) to shift
-            offset (int): shift bits
-
-        Returns:
-            list: output word
-        """
-        # check word's length
-        if len(word) != self.z:
-            logger = get_logger()
-            logger.error("word length not equal to {}".format(self.z))
-            exit(1)
-        # non-cycle left shift
-        word = [0] * offset + word[0:self.z - offset]
-        return word
-
-    def vector_and(self, word1: vector, word2: vector) -> list:
-        """compute word1 & word2(bitwise and)
-
-        Args:
-            word1 (vector): input word(32 bits)
-            word2 (vector): input word(32 bits)
-
-        Returns:
-            list: output word
-        """
-        # check word's length
-        if len(word1) != self.z or len(word2) != self.z:
-            logger = get_logger()
-            logger.error("word length not equal to {}".format(self.z))
-            exit(1)
-        # and computation: a & b
-        res = [word1[i] * word2[i] for i in range(self.z)]
-        return res
-
-    def vector_or(self, word1: vector, word2: vector) -> list:
-        """compute word1 | word2(bitwise or)
-
-        Args:
-            word1 (vector): input word(32 bits)
-            word2 (vector): input word(32 bits)
-
-        Returns:
-            list: output word
-        """
-        # check word's length
-        if len(word1) != self.z or len(word2) != self.z:
-            logger = get_logger()
-            logger.error("word length not equal to {}".format(self.z))
-            exit(1)
-        # or computation: (a & b) ^ (a ^ b)
-        res = [word1[i] * word2[i] + word1[i] + word2[i] for i in range(self.z)]
-        return res
-
-    def sp_box(self, word1: list, word2: list, word3: list) -> tuple:
-        """96-bit SP-box in non-linear layer, applied to each column
-
-        Args:
-            word1 (list): first word of input column
-            word2 (list): second word of input column
-            word3 (list): third word of input column
-
-        Returns:
-            tuple: 3 words of output column
-        """
-        # check word's length
-        if len(word1) != self.z or len(word2) != self.z or len(word3) != self.z:
-            logger = get_logger()
-            logger.error("word length not equal to {}".format(self.z))
-            exit(1)
-        # 3 steps
-        # first x <<< 24, y <<< 9
-        tmpx = vector(self.ring, self.cycle_lshift(word1, 24))
-        tmpy = vector(self.ring, self.cycle_lshift(word2, 9))
-        tmpz = vector(self.ring, word3)
-        # second and third step
-        y_and_z = self.vector_and(tmpy, tmpz)
-        x_or_z = self.vector_or(tmpx, tmpz)
-        x_and_y = self.vector_and(tmpx, tmpy)
-        resz = tmpx + vector(self.ring, self.noncycle_lshift(word3, 1)) + vector(self.ring, self.noncycle_lshift(y_and_z, 2))
-        resy = tmpy + tmpx + vector(self.ring, self.noncycle_lshift(x_or_z, 1))
-        resx = tmpz + tmpy + vector(self.ring, self.noncycle_lshift(x_and_y, 3))
-        return resx.list(), resy.list(), resz.list()
-
     def non_linear(self, X: list) -> list:
         """The non-linear layer of gimli, 
         containing 3 96-bit SP-box applied to each column, 
         and a column is 96 bits(3 words)
+        all four columns are computed at once on rows of 128 bits,
+        the rotations and shifts are the index tables of __init__
 
         Args:
             X (list): 384 bits input state
@@ -226,10 +133,29 @@ class Gimli:
         Returns:
             list: 384 bits output state
         """
-        for j in range(self.y):
-            # spbox a column(3 words)
-            X[self.index_start[0][j]:self.index_end[0][j]], X[self.index_start[1][j]:self.index_end[1][j]], X[self.index_start[2][j]:self.index_end[2][j]] = \
-                self.sp_box(X[self.index_start[0][j]:self.index_end[0][j]], X[self.index_start[1][j]:self.index_end[1][j]], X[self.index_start[2][j]:self.index_end[2][j]])
+        row = self.y * self.z
+        # python ints(e.g. check_round) are not reduced mod 2, convert them once
+        if any(type(v) is int for v in X):
+            X[:] = [self.ring(v) for v in X]
+        # first x <<< 24, y <<< 9
+        x = [X[i] for i in self.rot24]
+        y = [X[i] for i in self.rot9]
+        z = X[2 * row:3 * row]
+        # x & y, x | z, y & z in one pass
+        x_and_y = [a * b for a, b in zip(x, y)]
+        x_or_z = [a * c + a + c for a, c in zip(x, z)]
+        y_and_z = [b * c for b, c in zip(y, z)]
+        s0 = [c + b for b, c in zip(y, z)]
+        s1 = [b + a for a, b in zip(x, y)]
+        s2 = list(x)
+        for i, j in self.shift[3]:
+            s0[i] += x_and_y[j]
+        for i, j in self.shift[1]:
+            s1[i] += x_or_z[j]
+            s2[i] += z[j]
+        for i, j in self.shift[2]:
+            s2[i] += y_and_z[j]
+        X[:] = s0 + s1 + s2
         return X
 
     def linear_mixing(self, X: list, r: int) -> list:
@@ -270,14 +196,10 @@ class Gimli:
         """
         # every fourth round
         if r % 4 == 0:
-            # convert s0_0 to sage binary vector
-            s0_0 = vector(self.ring, X[self.index_start[0][0]:self.index_end[0][0]])
-            # convert r to sage binary vector
-            r = hex2vector(r, self.z)
-            # add const
-            s0_0 = s0_0 + self.const + r
-            # convert to list and return
-            X[self.index_start[0][0]:self.index_end[0][0]] = s0_0.list()
+            # flip the precomputed bits of s0,0 in place, s0,0 starts at bit 0
+            for k in self.round_consts[r]:
+                # python ints(the integer reference) stay 0/1
+                X[k] = X[k] ^ 1 if type(X[k]) is int else X[k] + 1
         return X
 
     def round(self, X: list, rounds: int) -> list:
@@ -366,8 +288,9 @@ def check_differential(rounds: int, MAX_ROUNDS: int = 6) -> Any:
     logger = get_logger("attack")
     logger.info("start attack")
     # check rounds value
+    # the trail of the paper below has MAX_ROUNDS + 1 states, longer attacks are specs of gimli_attack.py
     if rounds > MAX_ROUNDS:
-        logger.error("only check rounds <= {}!".format(MAX_ROUNDS))
+        logger.error("only check rounds <= {}, see gimli_attack.py for longer attacks!".format(MAX_ROUNDS))
         exit(1)
     # define ring variables
     # x = a * u + b
@@ -0,0 +1,206 @@
+"""Gimli attack models from a declarative spec instead of a script per attack
+
+6rattack.py and 8rattack.py differ only in the number of rounds, the round offset(24 - r or 24 - (r + 1)),
+the symbolic input difference, which words of which states are fixed or free(-1), and the equations
+X[s(i,1)] / u + X[s(i,3)] / u that 6rattack.py adds after each round for its free words(the ties of
+6rattack.json, without them the spec gives 5882 of the 6298 equations of the script).
+A spec(json) lists these, see 6rattack.json and 8rattack.json:
+{
+    "rounds": 6,                  number of rounds
+    "start": 0,                   round r of the model is round 24 - (start + r) of Gimli
+    "default": 0,                 difference of a bit not set by a constraint
+    "constraints": [              applied in order, a later constraint overrides an earlier one
+        {"states": [0], "words": ["s0,1", "s0,3"], "bits": "0:31", "symbolic": true},
+        {"states": [0], "words": ["s0,1", "s0,3"], "bits": "31", "fixed": 1},
+        {"states": [1], "words": ["s1,1", "s2,1"], "free": true},
+        {"states": [2], "words": ["s0,0"], "fixed": "0xc0400000"},
+        {"states": [1], "words": ["s1,1", "s2,1"], "tie": ["s1,3", "s2,3"]}
+    ]
+}
+state k is the difference after round k(state 0 the input), "bits" is "a:b"(b excluded), a bit, both
+separated by commas(parse_range of common.py) or a list and defaults to the whole word, bit k of a word
+is (n >> k) & 1 as in hex2vector. A fixed value is 0, 1 or a hex word, a symbolic bit is a new variable
+shared by the words of the constraint(the same bit of s0,1 and s0,3 above), and a tie adds the equations
+difference(word) = difference(tied word) for every bit.
+
+Example:
+    sage -python gimli_attack.py 8rattack.json > 8rgimli.anf
+"""
+import os
+import sys
+import json
+import argparse
+
+from sage.all import *
+from sage.rings.polynomial.pbori.pbori import *
+from sage.rings.polynomial.pbori import *
+
+from gimli import Gimli
+
+# the shared model steps
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools"))
+from anfengine import ImpossibleTrail, add_difference, linearize, write_anf
+from common import get_logger, parse_range
+
+def word_start(name: str) -> int:
+    """first state bit of a word
+
+    Args:
+        name (str): word si,j
+
+    Returns:
+        int: i * 128 + j * 32
+    """
+    i, j = name.strip().lstrip("s").split(",")
+    i, j = int(i), int(j)
+    if not (0 <= i < Gimli.x and 0 <= j < Gimli.y):
+        raise ValueError("no word {}".format(name))
+    return i * Gimli.y * Gimli.z + j * Gimli.z
+
+def parse_bits(bits) -> list:
+    """bits of a word
+
+    Args:
+        bits (Any): None(the whole word), a string of parse_range("a:b", "a", "a:b,c"), an int or a list of ints
+
+    Returns:
+        list: bits
+    """
+    if bits is None:
+        return list(range(Gimli.z))
+    if isinstance(bits, int):
+        return [bits]
+    if isinstance(bits, list):
+        return bits
+    return parse_range(bits)
+
+def fixed_bit(value, k: int) -> int:
+    """bit k of a fixed value
+
+    Args:
+        value (Any): 0, 1 or a hex word
+        k (int): bit of the word
+
+    Returns:
+        int: 0 or 1
+    """
+    if isinstance(value, str):
+        return (int(value, 16) >> k) & 1
+    return value
+
+def read_spec(spec: dict, R, offset: int) -> tuple:
+    """difference states and ties of a spec
+
+    Args:
+        spec (dict): the spec
+        R (Any): the ring of the model
+        offset (int): first variable of the symbolic differences
+
+    Raises:
+        ValueError: a constraint does not fit Gimli
+
+    Returns:
+        tuple: (states of 0, 1, None or a polynomial, ties: state -> list of (bit, tied bit))
+    """
+    rounds = spec["rounds"]
+    diff = [[spec.get("default", 0)] * Gimli.state for i in range(rounds + 1)]
+    ties = {}
+    symbolic = 0
+    for c in spec["constraints"]:
+        bits = parse_bits(c.get("bits"))
+        starts = [word_start(w) for w in c["words"]]
+        for s in c["states"]:
+            if not 0 <= s <= rounds:
+                raise ValueError("state {} of a {}-round model".format(s, rounds))
+        if "symbolic" in c:
+            # one new variable per bit, shared by the words
+            for k in bits:
+                v = R(x(offset + symbolic))
+                symbolic += 1
+                for s in c["states"]:
+                    for start in starts:
+                        diff[s][start + k] = v
+            continue
+        for s in c["states"]:
+            if "tie" in c:
+                tied = [word_start(w) for w in c["tie"]]
+                ties.setdefault(s, []).extend((a + k, b + k) for a, b in zip(starts, tied) for k in bits)
+                continue
+            for start in starts:
+                for k in bits:
+                    diff[s][start + k] = None if c.get("free") else fixed_bit(c["fixed"], k)
+    return diff, ties
+
+def count_symbolic(spec: dict) -> int:
+    """number of symbolic difference variables of a spec
+
+    Args:
+        spec (dict): the spec
+
+    Returns:
+        int: variables
+    """
+    return sum(len(parse_bits(c.get("bits"))) for c in spec["constraints"] if "symbolic" in c)
+
+def attack(spec: dict) -> set:
+    """the equations of a spec
+
+    Args:
+        spec (dict): the spec
+
+    Raises:
+        ValueError: the spec does not fit Gimli
+        ImpossibleTrail: a difference contradicts the propagated difference
+
+    Returns:
+        set: Q
+    """
+    rounds = spec["rounds"]
+    start = spec.get("start", 0)
+    if start < 0 or start + rounds > 24:
+        raise ValueError("Gimli has 24 rounds, not {} from {}".format(rounds, start))
+    offset = (2 * rounds + 1) * Gimli.state
+    R = declare_ring([Block('x', offset + count_symbolic(spec)), 'u'], globals())
+    U = R(u)
+    gimli = Gimli(R)
+    a_vars = [[R(x(Gimli.state * (2 * r + 1) + i)) for i in range(Gimli.state)] for r in range(rounds)]
+    b_vars = [[R(x(Gimli.state * (2 * r + 2) + i)) for i in range(Gimli.state)] for r in range(rounds)]
+    diff, ties = read_spec(spec, R, offset)
+    X = [R(x(i)) for i in range(Gimli.state)]
+    for i in range(Gimli.state):
+        if diff[0][i] is not None:
+            X[i] += diff[0][i] * U
+    Q = set()
+    for r in range(rounds):
+        current_round = 24 - (start + r)
+        X = gimli.non_linear(X)
+        X = gimli.linear_mixing(X, current_round)
+        X = gimli.round_const(X, current_round)
+        X = linearize(Q, X, U, a_vars[r], b_vars[r])
+        add_difference(Q, X, U, diff[r + 1], r + 1)
+        for a, b in ties.get(r + 1, []):
+            Q.add(X[a] / U + X[b] / U)
+    return Q
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="gimli_attack")
+    arg_parser.description = "Print the ANF model of a Gimli attack spec."
+    arg_parser.add_argument("spec", type=str, help="json spec, see 6rattack.json")
+    arg_parser.add_argument("-r", "--rounds", type=int, default=None, help="override the rounds of the spec")
+    arg_parser.add_argument("--start", type=int, default=None, help="override the round offset of the spec")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("gimli_attack")
+    with open(args.spec, "r") as f:
+        spec = json.load(f)
+    if args.rounds is not None:
+        spec["rounds"] = args.rounds
+    if args.start is not None:
+        spec["start"] = args.start
+    try:
+        Q = attack(spec)
+    except ImpossibleTrail as e:
+        logger.warning("Impossible: {}".format(e))
+        exit(0)
+    n = write_anf(Q, sys.stdout)
+    logger.info("end adding, {} equations".format(n))
@@ -0,0 +1,91 @@
+"""Shared steps of the indirect(ANF) models of Keccak/code, ascon/code and gimli/code
+
+every model script runs the same loop on the polynomials of a boolean ring(declare_ring of sage):
+a state bit is x = a * u + b, where u marks the difference between the two messages,
+    - the difference of a bit is x / u, a trail bit d adds the equation x / u + d to Q,
+      unless x / u is already a constant, which either agrees with d or makes the trail impossible,
+    - after a nonlinear layer every bit is cut into new variables a, b (the equations a + NVa, b + NVb)
+      so the degree of the next layer stays low.
+the functions only use +, * and / of the ring elements and do not import sage themselves.
+"""
+
+class ImpossibleTrail(Exception):
+    """a difference bit of the trail contradicts the propagated difference"""
+    def __init__(self, state: int, bit: int, expected: int, found: int) -> None:
+        """initial the exception
+
+        Args:
+            state (int): index of the trail state
+            bit (int): bit of the state
+            expected (int): difference of the trail
+            found (int): constant difference of the model
+        """
+        super().__init__("state {} bit {}: the trail has {}, the model {}".format(state, bit, expected, found))
+        self.state = state
+        self.bit = bit
+
+def add_difference(Q: set, X: list, u, diff: list, state: int = 0) -> int:
+    """add the difference equations of a trail state
+
+    Args:
+        Q (set): equations of the model
+        X (list): state polynomials
+        u (Any): the difference variable of the ring
+        diff (list): 0, 1, None(free) or a polynomial(symbolic difference) per bit
+        state (int, optional): index of the state, for the error message. Defaults to 0.
+
+    Raises:
+        ImpossibleTrail: a constant difference of the model contradicts the trail
+
+    Returns:
+        int: number of equations added
+    """
+    added = 0
+    for i, d in enumerate(diff):
+        if d is None:
+            continue
+        a = X[i] / u
+        if (a == 0 or a == 1) and (d == 0 or d == 1):
+            if a != d:
+                raise ImpossibleTrail(state, i, d, 1 - d)
+            continue
+        Q.add(a + d)
+        added += 1
+    return added
+
+def linearize(Q: set, X: list, u, a_vars: list, b_vars: list) -> list:
+    """cut every bit x = a * u + b into the new variables NVa, NVb
+
+    Args:
+        Q (set): equations of the model
+        X (list): state polynomials
+        u (Any): the difference variable of the ring
+        a_vars (list): new variables of the differences
+        b_vars (list): new variables of the values
+
+    Returns:
+        list: the state NVa * u + NVb
+    """
+    Y = []
+    for x, na, nb in zip(X, a_vars, b_vars):
+        a = x / u
+        b = x + a * u
+        Q.add(a + na)
+        Q.add(b + nb)
+        Y.append(na * u + nb)
+    return Y
+
+def write_anf(Q: set, out) -> int:
+    """write the equations, one polynomial per line, in a single write
+
+    Args:
+        Q (set): equations of the model
+        out (file): output, e.g. sys.stdout
+
+    Returns:
+        int: number of equations
+    """
+    lines = [str(q) for q in Q]
+    out.write("\n".join(lines) + "\n" if lines else "")
+    out.flush()
+    return len(lines)
@@ -0,0 +1,276 @@
+"""Approximate the number of solutions of a model projected onto chosen variables
+
+hashing-based counting in the style of ApproxMC: random xors over the projected variables split the
+solutions into 2^m cells, a bounded enumeration(blocking clauses on the same solver) counts one cell,
+and the smallest m whose cell holds fewer than THRESH solutions gives the estimate cell * 2^m. The hashes
+of an estimate are nested(cell m + 1 is part of cell m), so the cell shrinks with m and m is found as in
+LogSATSearch of ApproxMC: galloping from the m of the previous estimate of the worker, then a binary
+search between the last m with THRESH solutions and the first one with fewer. An estimate whose cell is
+empty failed and is replaced by another one, at most t times.
+The median of t independent estimates is within (1 + eps) of the count with probability 1 - delta:
+    THRESH = 1 + 9.84 * (1 + eps / (1 + eps)) * (1 + 1 / eps)^2
+    t      = ceil(17 * log2(3 / delta))
+the estimates run in worker processes, each loads the cnf once. The xors of a hash are native xors of cms
+(clauses for a PySAT backend) with a selector variable each: assuming the selector false turns the hash on,
+a selector left free satisfies the xor whatever the other variables are, so the solver is never rebuilt.
+
+for a model of a trail projected onto the input state X(n bits) the count is the number of right pairs
+and log2(count) - n is the measured log2 probability of the trail.
+
+Example:
+    python tools/approxcount.py 4rascon.cnf --project 1:321 --epsilon 0.8 --delta 0.2 --jobs 20
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from cnfbuilder import CNFBuilder, read_dimacs
+from common import WORKER, get_logger, parse_range, worker_pool
+from enumeration import bit
+from incremental import IncrementalSolver
+
+def thresh(epsilon: float) -> int:
+    """max solutions of a cell
+
+    Args:
+        epsilon (float): tolerance
+
+    Returns:
+        int: THRESH
+    """
+    return int(1 + 9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2)
+
+def iterations(delta: float) -> int:
+    """number of estimates for confidence 1 - delta
+
+    Args:
+        delta (float): error probability
+
+    Returns:
+        int: t
+    """
+    return int(math.ceil(17 * math.log2(3 / delta)))
+
+class Counter:
+    """one solver with hashes and bounded enumeration over selector variables"""
+    def __init__(self, cnf: str, project: list, backend: str = "cms") -> None:
+        """load the model
+
+        Args:
+            cnf (str): cnf file
+            project (list): variables of the projection
+            backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        """
+        self.solver = IncrementalSolver(backend)
+        model = read_dimacs(cnf, self.solver.xor)
+        self.solver.load(model)
+        self.nvars = model.nvars
+        self.project = project
+        # number of hashes of the previous estimate, where the next one starts
+        self.last = 0
+
+    def new_var(self) -> int:
+        """a variable unused by the model
+
+        Returns:
+            int: the variable
+        """
+        self.nvars += 1
+        return self.nvars
+
+    def add_hash(self, rng: random.Random) -> int:
+        """add a random xor over the projected variables, active while its selector is assumed false
+
+        Args:
+            rng (random.Random): random source
+
+        Returns:
+            int: the selector
+        """
+        selector = self.new_var()
+        variables = []
+        while not variables:
+            # an empty xor would fix the selector itself
+            variables = [v for v in self.project if rng.getrandbits(1)]
+        builder = CNFBuilder(self.solver.xor)
+        # the cut variables of a xor written as clauses continue after the ones in use
+        builder.nvars = self.nvars
+        builder.add_xor(variables + [selector], rng.getrandbits(1))
+        self.nvars = builder.nvars
+        self.solver.load(builder)
+        return selector
+
+    def bounded_count(self, assumptions: list, bound: int) -> int:
+        """count projected solutions up to bound, the blocking clauses are retired afterwards
+
+        Args:
+            assumptions (list): literals, e.g. the selectors of the active hashes
+            bound (int): stop at this many solutions
+
+        Returns:
+            int: solutions found, at most bound
+        """
+        # the blocking clauses of this count hold only while -active is assumed
+        active = self.new_var()
+        count = 0
+        while count < bound:
+            sat, model = self.solver.solve(assumptions + [-active])
+            if not sat:
+                break
+            count += 1
+            self.solver.add_clause([-v if bit(model, v) else v for v in self.project] + [active])
+        self.solver.add_clause([active])
+        return count
+
+    def cell(self, rng: random.Random, selectors: list, counts: dict, m: int, bound: int) -> bool:
+        """count the cell of the first m hashes of an estimate, the hashes are added when first needed
+
+        Args:
+            rng (random.Random): random source of the estimate
+            selectors (list): selectors of the hashes of the estimate
+            counts (dict): m -> solutions of the cell, counted so far
+            m (int): number of hashes
+            bound (int): THRESH
+
+        Returns:
+            bool: the cell has fewer than bound solutions
+        """
+        while len(selectors) < m:
+            selectors.append(self.add_hash(rng))
+        if m not in counts:
+            counts[m] = self.bounded_count([-s for s in selectors[:m]], bound)
+        return counts[m] < bound
+
+    def estimate(self, seed: int, bound: int) -> tuple:
+        """one estimate, the smallest number of hashes leaving fewer than bound solutions
+
+        Args:
+            seed (int): seed of the hashes
+            bound (int): THRESH
+
+        Returns:
+            tuple: (solutions of the cell, number of hashes), 0 solutions and some hashes for a failed estimate
+        """
+        rng = random.Random(seed)
+        selectors, counts = [], {}
+        n = len(self.project)
+        # lo has bound solutions(-1 stands for more than the model), hi fewer
+        start = min(self.last, n)
+        step = 1
+        if self.cell(rng, selectors, counts, start, bound):
+            lo, hi = start - 1, start
+            while lo >= 0 and self.cell(rng, selectors, counts, lo, bound):
+                hi, step = lo, 2 * step
+                lo = max(hi - step, -1)
+        else:
+            lo, hi = start, start + 1
+            while hi <= n and not self.cell(rng, selectors, counts, hi, bound):
+                lo, step = hi, 2 * step
+                hi = lo + step
+            if hi > n:
+                # even n hashes leave bound solutions, the last cell is the estimate
+                hi = n
+                if not self.cell(rng, selectors, counts, n, bound):
+                    self.last = n
+                    return counts[n], n
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.cell(rng, selectors, counts, mid, bound):
+                hi = mid
+            else:
+                lo = mid
+        # the hashes stay in the solver, a selector that is not assumed leaves its xor free
+        self.last = hi
+        return counts[hi], hi
+
+def load_counter(cnf: str, project: list, backend: str) -> dict:
+    """load the model once per worker process
+
+    Args:
+        cnf (str): cnf file
+        project (list): variables of the projection
+        backend (str): cms or a PySAT solver name
+
+    Returns:
+        dict: the state of the worker
+    """
+    return {"counter": Counter(cnf, project, backend)}
+
+def run_estimate(job: tuple) -> tuple:
+    """an estimate in a worker process
+
+    Args:
+        job (tuple): (seed, bound)
+
+    Returns:
+        tuple: (solutions of the cell, number of hashes)
+    """
+    return WORKER["counter"].estimate(*job)
+
+def approx_count(cnf: str, project: list, epsilon: float = 0.8, delta: float = 0.2, jobs: int = 0,
+                 backend: str = "cms", seed: int = 0) -> dict:
+    """(epsilon, delta) estimate of the projected solution count
+
+    Args:
+        cnf (str): cnf file
+        project (list): variables of the projection
+        epsilon (float, optional): tolerance. Defaults to 0.8.
+        delta (float, optional): error probability. Defaults to 0.2.
+        jobs (int, optional): worker processes, 0 means one per core. Defaults to 0.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        seed (int, optional): seed of the first estimate. Defaults to 0.
+
+    Returns:
+        dict: log2 of the count(None for no solution or when every estimate failed), exact when the count is
+            below THRESH, the estimates and the number of failed estimates
+    """
+    bound = thresh(epsilon)
+    t = iterations(delta)
+    cells = []
+    failed = 0
+    with worker_pool(jobs, t, load_counter, (cnf, project, backend)) as pool:
+        # failed estimates are replaced by new seeds, at most t of them
+        while len(cells) < t and failed < t:
+            batch = [(seed + len(cells) + failed + i, bound) for i in range(t - len(cells))]
+            for count, hashes in pool.map(run_estimate, batch):
+                if count or not hashes:
+                    cells.append((count, hashes))
+                else:
+                    failed += 1
+    result = {"epsilon": epsilon, "delta": delta, "thresh": bound, "estimates": cells, "failed": failed}
+    exact = [c for c, hashes in cells if hashes == 0]
+    if exact:
+        # a model with fewer than THRESH solutions is counted exactly
+        count = exact[0]
+        result.update({"exact": True, "count": count, "log2": math.log2(count) if count else None})
+        return result
+    logs = [math.log2(c) + m for c, m in cells]
+    result.update({"exact": False, "log2": statistics.median(logs) if logs else None})
+    return result
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="approxcount")
+    arg_parser.description = "Approximate the number of solutions of a cnf projected onto chosen variables."
+    arg_parser.add_argument("cnf", type=str, help="cnf file, xor lines are allowed")
+    arg_parser.add_argument("--project", type=str, required=True, help="variables of the projection, e.g. 1:321")
+    arg_parser.add_argument("--epsilon", type=float, default=0.8, help="tolerance, default 0.8")
+    arg_parser.add_argument("--delta", type=float, default=0.2, help="error probability, default 0.2")
+    arg_parser.add_argument("--jobs", type=int, default=0, help="worker processes, default one per core")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--seed", type=int, default=0, help="seed of the first estimate")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("approxcount")
+    project = parse_range(args.project)
+    start = time.time()
+    result = approx_count(args.cnf, project, args.epsilon, args.delta, args.jobs, args.backend, args.seed)
+    if result["log2"] is None and result["exact"]:
+        logger.info("no solution")
+    elif result["log2"] is None:
+        logger.warning("every estimate ended in an empty cell")
+    else:
+        logger.info("log2 count {:.2f}{}, log2 probability over the {} projected bits {:.2f}, in {:.2f}s".format(
+            result["log2"], " (exact)" if result["exact"] else "", len(project), result["log2"] - len(project),
+            time.time() - start))
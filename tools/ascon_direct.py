@@ -0,0 +1,162 @@
+"""Direct CNF model of an Ascon differential trail
+
+the model has the values of both messages instead of an ANF in x and u:
+    message a: variables, x(i) of the anf scripts is variable i + 1(the input state)
+    message b: a literal per bit, the literal of a negated when the difference is 1,
+               a fresh variable when the trail leaves the bit free(?)
+a round is addConst (negated literals), Sbox (clauses of sboxcnf.py for every column and message)
+and Matrix (xor constraints), the state layout is the one of the ascon scripts:
+row i of the state is bits 64i..64i+63 and column j of the Sbox is bits j, 64+j, ..., 256+j.
+
+the trail has 2*ROUNDS states like diff of the scripts:
+    diff[2r]     input of round r(after the Matrix of round r-1)
+    diff[2r+1]   output of the Sbox of round r
+and with --final-matrix one more state after the Matrix of the last round.
+
+Example:
+    python tools/ascon_direct.py -r 3 --trail 3rfinal.trail -o 3rfinal_direct.cnf
+"""
+import argparse
+
+from cnfbuilder import CNFBuilder, Unsatisfiable
+from common import get_logger
+from sboxcnf import SBOXES, sbox_cnf
+from trail import read_trail
+
+STATE = 320
+LANE = 64
+# rotations of SingleMatrix for each row
+MATRIX = [(19, 28), (61, 39), (1, 6), (10, 17), (7, 41)]
+CONSTANTS = [0xf0, 0xe1, 0xd2, 0xc3, 0xb4, 0xa5, 0x96, 0x87, 0x78, 0x69, 0x5a, 0x4b]
+# addConst xors the constant into bits 184..191, highest bit first
+CONST_BASE = 184
+
+def const_bits(r: int) -> list:
+    """state bits flipped by addConst(X, r)
+
+    Args:
+        r (int): round number
+
+    Returns:
+        list: bit indexes
+    """
+    return [CONST_BASE + i for i in range(8) if CONSTANTS[r] >> (7 - i) & 1]
+
+def matrix_inputs(i: int) -> tuple:
+    """the 3 bits of the Matrix input xored into bit i of the output
+
+    Args:
+        i (int): output bit
+
+    Returns:
+        tuple: input bits
+    """
+    row, k = divmod(i, LANE)
+    r0, r1 = MATRIX[row]
+    base = row * LANE
+    return base + k, base + (k + LANE - r0) % LANE, base + (k + LANE - r1) % LANE
+
+def add_const(state: list, r: int) -> list:
+    """addConst on literals
+
+    Args:
+        state (list): literals
+        r (int): round number
+
+    Returns:
+        list: literals
+    """
+    state = state[:]
+    for i in const_bits(r):
+        state[i] = -state[i]
+    return state
+
+def add_sbox(builder: CNFBuilder, template: list, state: list, out: list) -> None:
+    """Sbox clauses between two states of literals
+
+    Args:
+        builder (CNFBuilder): the model
+        template (list): clauses of the Sbox over 1..10
+        state (list): input literals
+        out (list): output literals
+    """
+    for j in range(LANE):
+        column = [j + LANE * k for k in range(5)]
+        builder.add_table(template, [state[i] for i in column] + [out[i] for i in column])
+
+def add_matrix(builder: CNFBuilder, state: list, out: list) -> None:
+    """Matrix xors between two states of literals
+
+    Args:
+        builder (CNFBuilder): the model
+        state (list): input literals
+        out (list): output literals
+    """
+    for i in range(STATE):
+        builder.add_xor([out[i]] + [state[k] for k in matrix_inputs(i)])
+
+def encode(builder: CNFBuilder, diff: list, rounds: int, final_matrix: bool = False, start: int = 0) -> tuple:
+    """add the model of a trail
+
+    Args:
+        builder (CNFBuilder): the model, variables 1..320 should still be free for the input
+        diff (list): 2*rounds states(+1 with final_matrix) of 0, 1 or None
+        rounds (int): number of rounds
+        final_matrix (bool, optional): the trail ends after the last Matrix. Defaults to False.
+        start (int, optional): round r adds the constant of round start + r. Defaults to 0.
+
+    Returns:
+        tuple: (states of message a, states of message b), literals in the order of diff
+
+    Raises:
+        Unsatisfiable: the trail contradicts a linear layer
+    """
+    if len(diff) != 2 * rounds + final_matrix:
+        raise ValueError("a {}-round trail has {} states, got {}".format(rounds, 2 * rounds + final_matrix, len(diff)))
+    if start < 0 or start + rounds > len(CONSTANTS):
+        raise ValueError("round constants {}..{} do not exist".format(start, start + rounds - 1))
+    template = sbox_cnf(*SBOXES["ascon"])
+    a = [builder.new_vars(STATE)]
+    b = [[builder.couple(l, d) for l, d in zip(a[0], diff[0])]]
+    for r in range(rounds):
+        # Sbox outputs of message a, message b follows the difference
+        out_a = builder.new_vars(STATE)
+        out_b = [builder.couple(l, d) for l, d in zip(out_a, diff[2 * r + 1])]
+        add_sbox(builder, template, add_const(a[-1], start + r), out_a)
+        add_sbox(builder, template, add_const(b[-1], start + r), out_b)
+        a.append(out_a)
+        b.append(out_b)
+        if r == rounds - 1 and not final_matrix:
+            break
+        next_a = builder.new_vars(STATE)
+        next_b = [builder.couple(l, d) for l, d in zip(next_a, diff[2 * r + 2])]
+        add_matrix(builder, out_a, next_a)
+        # with a known difference these xors are the ones of message a, a wrong bit makes them contradict
+        add_matrix(builder, out_b, next_b)
+        a.append(next_a)
+        b.append(next_b)
+    return a, b
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="ascon_direct")
+    arg_parser.description = "Write the direct CNF model of an Ascon differential trail."
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--trail", type=str, required=True, help="trail file, see trail.py")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="the trail ends after the last Matrix")
+    arg_parser.add_argument("--start-round", type=int, default=0, help="index of the first round constant, default 0")
+    arg_parser.add_argument("--xor", type=str, default="native", choices=["native", "cnf"],
+                            help="native xor lines for cryptominisat, cnf for cadical")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="cnf file")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("ascon_direct")
+    diff = read_trail(args.trail, STATE, LANE, msb_first=True)
+    builder = CNFBuilder(args.xor)
+    try:
+        encode(builder, diff, args.rounds, args.final_matrix, args.start_round)
+    except Unsatisfiable as e:
+        logger.warning("Impossible: {}".format(e))
+        exit(0)
+    nvars, nclauses = builder.write(args.output, ["ascon {} rounds, trail {}".format(args.rounds, args.trail),
+                                                  "variables 1..320 are the input state x(0)..x(319)"])
+    logger.info("wrote {} with {} variables and {} clauses".format(args.output, nvars, nclauses))
@@ -0,0 +1,197 @@
+"""Solve randomized copies of a model and report the average solving cost
+
+USER_GUIDE.md suggests solving at least 5 randomly generated, similarly hard problems to get
+an average time to solve. For every cnf this runner writes N randomized instances:
+    - variables are renamed by a random permutation (and optionally flipped),
+    - clauses and the literals inside them are shuffled,
+    - optionally k random variables of --fix-vars are fixed to random values, e.g. free message bits,
+solves them with at most --parallel solvers at a time, and reports mean, median and variance
+of the solving time and of the conflicts.
+
+Example:
+    python tools/benchmark.py 6rgimli.cnf -n 5 --solver cms --threads 4 --parallel 8 --fix-vars 1:385 --fix 16
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from common import get_logger, parse_range
+from dimacs import read_cnf, write_cnf
+from pipeline import BINARIES, CoreScheduler, run_process
+from solverlog import read_log
+
+def randomize(nvars: int, clauses: list, xors: list, rng: random.Random,
+              fix_vars: list = (), fix: int = 0, flip: bool = False) -> tuple:
+    """an equisatisfiable, randomly renamed and reordered copy of a cnf
+
+    Args:
+        nvars (int): number of variables
+        clauses (list): clauses
+        xors (list): cryptominisat xor clauses
+        rng (random.Random): random source
+        fix_vars (list, optional): candidates for fixing. Defaults to ().
+        fix (int, optional): how many candidates get a random unit clause. Defaults to 0.
+        flip (bool, optional): also flip the polarity of every variable at random. Defaults to False.
+
+    Returns:
+        tuple: (clauses, xors) of the new instance
+    """
+    # rename variable v to perm[v]
+    perm = list(range(1, nvars + 1))
+    rng.shuffle(perm)
+    perm = [0] + perm
+    sign = [1] + [rng.choice((1, -1)) if flip else 1 for _ in range(nvars)]
+    rename = lambda lit: perm[abs(lit)] * sign[abs(lit)] * (1 if lit > 0 else -1)
+    new_clauses = [[rename(l) for l in c] for c in clauses]
+    # fixed bits are added before shuffling so they land anywhere in the file
+    for v in rng.sample(list(fix_vars), min(fix, len(fix_vars))):
+        new_clauses.append([rename(v if rng.random() < 0.5 else -v)])
+    for c in new_clauses:
+        rng.shuffle(c)
+    rng.shuffle(new_clauses)
+    new_xors = []
+    for c in xors:
+        # negated literals and flipped variables invert the parity, carried by the first literal
+        lits = [perm[abs(l)] for l in c]
+        parity = (sum(l < 0 for l in c) + sum(sign[abs(l)] < 0 for l in c)) % 2 == 1
+        rng.shuffle(lits)
+        lits[0] = -lits[0] if parity else lits[0]
+        new_xors.append(lits)
+    rng.shuffle(new_xors)
+    return new_clauses, new_xors
+
+def make_instances(cnf: str, outdir: str, n: int, seed: int, fix_vars: list = (), fix: int = 0,
+                   flip: bool = False) -> list:
+    """write n randomized instances of cnf
+
+    Args:
+        cnf (str): source cnf
+        outdir (str): directory of the instances
+        n (int): number of instances
+        seed (int): base seed, instance i uses seed + i
+        fix_vars (list, optional): see randomize. Defaults to ().
+        fix (int, optional): see randomize. Defaults to 0.
+        flip (bool, optional): see randomize. Defaults to False.
+
+    Returns:
+        list: paths of the instances
+    """
+    nvars, clauses, xors = read_cnf(cnf)
+    base = os.path.splitext(os.path.basename(cnf))[0]
+    paths = []
+    for i in range(n):
+        path = os.path.join(outdir, "{}_r{}.cnf".format(base, i))
+        new_clauses, new_xors = randomize(nvars, clauses, xors, random.Random(seed + i), fix_vars, fix, flip)
+        write_cnf(path, nvars, new_clauses, new_xors)
+        paths.append(path)
+    return paths
+
+def solve_instance(path: str, solver: str, threads: int, binaries: dict, scheduler: CoreScheduler,
+                   timeout: float = None) -> dict:
+    """solve an instance once cores are free
+
+    Args:
+        path (str): cnf file
+        solver (str): cms or cadical
+        threads (int): cms threads
+        binaries (dict): paths of the solvers
+        scheduler (CoreScheduler): shared core scheduler
+        timeout (float, optional): wall time limit. Defaults to None.
+
+    Returns:
+        dict: run record with the statistics of the log
+    """
+    log = os.path.splitext(path)[0] + ("_cms{}.log".format(threads) if solver == "cms" else "_cadical.log")
+    if solver == "cms":
+        argv, cores = [binaries["cms"], path, "-t", str(threads)], threads
+    else:
+        argv, cores = [binaries["cadical"], path], 1
+    with scheduler.reserve(cores):
+        record = run_process(argv, log, timeout=timeout)
+    record.update({"instance": path, "log": log})
+    record.update(read_log(log))
+    return record
+
+def summarize(values: list) -> dict:
+    """mean, median and variance of the measured values
+
+    Args:
+        values (list): numbers, None entries are skipped
+
+    Returns:
+        dict: n, mean, median, variance, min and max
+    """
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"n": 0}
+    return {"n": len(values), "mean": statistics.mean(values), "median": statistics.median(values),
+            "variance": statistics.variance(values) if len(values) > 1 else 0.0,
+            "min": min(values), "max": max(values)}
+
+def run_benchmark(cnfs: list, args: argparse.Namespace) -> dict:
+    """make, solve and summarize the randomized instances of every cnf
+
+    Args:
+        cnfs (list): source cnf files
+        args (argparse.Namespace): command line options
+
+    Returns:
+        dict: per cnf runs and summary
+    """
+    logger = get_logger("benchmark")
+    fix_vars = parse_range(args.fix_vars) if args.fix_vars else []
+    jobs = []
+    for cnf in cnfs:
+        outdir = args.outdir or os.path.dirname(os.path.abspath(cnf))
+        os.makedirs(outdir, exist_ok=True)
+        for path in make_instances(cnf, outdir, args.n, args.seed, fix_vars, args.fix, args.flip):
+            jobs.append((cnf, path))
+        logger.info("wrote {} instances of {}".format(args.n, cnf))
+    scheduler = CoreScheduler(args.cores)
+    binaries = {"cms": args.cms, "cadical": args.cadical}
+    with ThreadPoolExecutor(max_workers=args.parallel or scheduler.cores) as pool:
+        records = list(pool.map(lambda job: solve_instance(job[1], args.solver, args.threads, binaries,
+                                                           scheduler, args.timeout), jobs))
+    report = {}
+    for cnf in cnfs:
+        runs = [r for (c, _), r in zip(jobs, records) if c == cnf]
+        report[cnf] = {"runs": runs,
+                       "wall": summarize([r["wall"] for r in runs]),
+                       "solver_time": summarize([r["time"] for r in runs]),
+                       "conflicts": summarize([r["conflicts"] for r in runs]),
+                       "status": sorted(set(r["status"] for r in runs))}
+    return report
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="benchmark")
+    arg_parser.description = "Solve randomized instances of cnf models and report time statistics."
+    arg_parser.add_argument("cnf", type=str, nargs="+", help="cnf files")
+    arg_parser.add_argument("-n", type=int, default=5, help="randomized instances per cnf")
+    arg_parser.add_argument("--seed", type=int, default=0, help="base random seed")
+    arg_parser.add_argument("--fix-vars", type=str, default=None, help="variables that may be fixed, e.g. 1:385")
+    arg_parser.add_argument("--fix", type=int, default=0, help="number of --fix-vars fixed to random values")
+    arg_parser.add_argument("--flip", action="store_true", help="also flip variable polarities")
+    arg_parser.add_argument("--outdir", type=str, default=None, help="instance directory, default next to the cnf")
+    arg_parser.add_argument("--solver", type=str, default="cms", choices=["cms", "cadical"])
+    arg_parser.add_argument("--threads", type=int, default=1, help="cms threads per instance")
+    arg_parser.add_argument("--cores", type=int, default=0, help="cores to use, default all")
+    arg_parser.add_argument("--parallel", type=int, default=0, help="max concurrent solvers, default one per core")
+    arg_parser.add_argument("--timeout", type=float, default=None, help="wall time limit per instance")
+    arg_parser.add_argument("--report", type=str, default="benchmark.json", help="json report")
+    for binary in ("cms", "cadical"):
+        arg_parser.add_argument("--" + binary, type=str, default=BINARIES[binary], help="path of " + binary)
+    args = arg_parser.parse_args()
+
+    logger = get_logger("benchmark")
+    report = run_benchmark(args.cnf, args)
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    for cnf, entry in report.items():
+        for key in ("solver_time", "conflicts"):
+            s = entry[key]
+            if s["n"]:
+                logger.info("{} {}: n={} mean={:.2f} median={:.2f} variance={:.2f}".format(
+                    cnf, key, s["n"], s["mean"], s["median"], s["variance"]))
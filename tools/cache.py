@@ -0,0 +1,191 @@
+"""Content-addressed cache of pipeline artifacts(anf, cnf, solver logs, solutions)
+
+an artifact is stored under the sha256 of everything that produced it: the command,
+the content of its input files(model script, trail file, upstream anf/cnf) and the options.
+Renaming a trail or moving a result directory does not change the key, editing a script does.
+
+layout:
+    ROOT/objects/ab/abcdef.../0, 1.. cached output files in the order of the stage outputs
+    ROOT/objects/ab/abcdef.../.meta  json record of the run that produced the files
+    ROOT/objects/ab/abcdef.../.used  touched on every hit, its mtime is the LRU clock
+
+the cache is trimmed to --cache-size by removing the least recently used entries.
+
+Example:
+    python tools/cache.py stats
+    python tools/cache.py evict --cache-size 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from common import get_logger
+
+DEFAULT_ROOT = os.environ.get("ALGSAT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "algsat"))
+# default size limit in GB
+DEFAULT_SIZE = float(os.environ.get("ALGSAT_CACHE_SIZE", 20))
+
+class ArtifactCache:
+    """a directory of artifacts keyed by the hash of their inputs"""
+    def __init__(self, root: str = DEFAULT_ROOT, max_gb: float = DEFAULT_SIZE) -> None:
+        """initial a cache
+
+        Args:
+            root (str, optional): cache directory. Defaults to $ALGSAT_CACHE or ~/.cache/algsat.
+            max_gb (float, optional): size limit in GB. Defaults to $ALGSAT_CACHE_SIZE or 20.
+        """
+        self.root = root
+        self.max_bytes = int(max_gb * (1 << 30))
+        self.objects = os.path.join(root, "objects")
+        self.lock = threading.Lock()
+        os.makedirs(self.objects, exist_ok=True)
+
+    @staticmethod
+    def key(description) -> str:
+        """the key of a json-serializable description of the inputs
+
+        Args:
+            description (Any): command, input digests, options...
+
+        Returns:
+            str: hex key
+        """
+        text = json.dumps(description, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def entry(self, key: str) -> str:
+        """directory of a key
+
+        Args:
+            key (str): hex key
+
+        Returns:
+            str: entry directory
+        """
+        return os.path.join(self.objects, key[:2], key)
+
+    def get(self, key: str, outputs: list) -> dict:
+        """copy the cached artifacts of key to outputs
+
+        Args:
+            key (str): hex key
+            outputs (list): destination paths, matched to the cached files by position
+
+        Returns:
+            dict: the metadata stored with the entry on a hit, None on a miss
+        """
+        entry = self.entry(key)
+        # files are named by position, the key does not depend on the output names
+        names = [str(i) for i in range(len(outputs))]
+        if not all(os.path.isfile(os.path.join(entry, n)) for n in names):
+            return None
+        for name, path in zip(names, outputs):
+            # copy, never link: a later run truncates its outputs in place and would corrupt the entry
+            shutil.copyfile(os.path.join(entry, name), path)
+        self.touch(entry)
+        try:
+            with open(os.path.join(entry, ".meta"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, key: str, outputs: list, meta: dict = None) -> None:
+        """store outputs under key and trim the cache
+
+        Args:
+            key (str): hex key
+            outputs (list): files to store
+            meta (dict, optional): json metadata kept with the entry, e.g. the run record. Defaults to None.
+        """
+        entry = self.entry(key)
+        if os.path.isdir(entry):
+            self.touch(entry)
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        # fill a temporary directory first so a reader never sees a half-written entry
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry))
+        for i, path in enumerate(outputs):
+            shutil.copyfile(path, os.path.join(tmp, str(i)))
+        with open(os.path.join(tmp, ".meta"), "w") as f:
+            json.dump(meta or {}, f)
+        self.touch(tmp)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # another pipeline stored the same key meanwhile
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    @staticmethod
+    def touch(entry: str) -> None:
+        """mark an entry as used now
+
+        Args:
+            entry (str): entry directory
+        """
+        with open(os.path.join(entry, ".used"), "w"):
+            pass
+
+    def entries(self) -> list:
+        """all entries with their size and last use
+
+        Returns:
+            list: (last use, size in bytes, entry directory), oldest first
+        """
+        result = []
+        for prefix in os.listdir(self.objects):
+            for key in os.listdir(os.path.join(self.objects, prefix)):
+                if key.startswith(".tmp-"):
+                    continue
+                entry = os.path.join(self.objects, prefix, key)
+                try:
+                    used = os.path.getmtime(os.path.join(entry, ".used"))
+                    size = sum(os.path.getsize(os.path.join(entry, n)) for n in os.listdir(entry))
+                except OSError:
+                    continue
+                result.append((used, size, entry))
+        result.sort()
+        return result
+
+    def evict(self, max_bytes: int = None) -> int:
+        """remove least recently used entries until the cache fits
+
+        Args:
+            max_bytes (int, optional): size limit, defaults to the limit of the cache. Defaults to None.
+
+        Returns:
+            int: number of removed entries
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        with self.lock:
+            entries = self.entries()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, entry in entries:
+                if total <= limit:
+                    break
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                removed += 1
+        return removed
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="cache")
+    arg_parser.description = "Inspect or trim the AlgSAT artifact cache."
+    arg_parser.add_argument("command", choices=["stats", "evict", "clear"])
+    arg_parser.add_argument("--cache-dir", type=str, default=DEFAULT_ROOT, help="cache directory")
+    arg_parser.add_argument("--cache-size", type=float, default=DEFAULT_SIZE, help="size limit in GB")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("cache")
+    cache = ArtifactCache(args.cache_dir, args.cache_size)
+    if args.command == "evict":
+        logger.info("removed {} entries".format(cache.evict()))
+    elif args.command == "clear":
+        logger.info("removed {} entries".format(cache.evict(0)))
+    entries = cache.entries()
+    logger.info("{} entries, {:.3f} GB in {}".format(len(entries), sum(e[1] for e in entries) / (1 << 30), cache.root))
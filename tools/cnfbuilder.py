@@ -0,0 +1,251 @@
+"""Build DIMACS models directly, without going through an ANF
+
+variables are numbered from 1 in the order they are created, so a model can put the variables
+it wants to read back(e.g. the input state, x(i) of the anf models) first.
+a literal is a signed variable, constants and bit permutations of a cipher need no variables:
+a constant 1 is a negated literal and a permuted bit is the same literal at another position.
+
+xor constraints are written as cryptominisat "x" lines(xor="native") or as clauses(xor="cnf"),
+long xors are cut into pieces of at most xor_cut variables joined by auxiliary variables.
+a difference bit can also stay a variable of the model(DiffVar), one model then serves every trail
+of a cipher and round count and a trail is fixed by solver assumptions(see incremental.py).
+"""
+
+class Unsatisfiable(Exception):
+    """a constraint is false for every assignment, e.g. a trail bit contradicting a linear layer"""
+
+class DiffVar(int):
+    """a difference bit left as a variable of the model, the int value is the variable"""
+
+class CNFBuilder:
+    """collect clauses and xor constraints, then write a header-correct DIMACS file"""
+    def __init__(self, xor: str = "native", xor_cut: int = 5) -> None:
+        """initial an empty model
+
+        Args:
+            xor (str, optional): "native" for cryptominisat xor lines, "cnf" for clauses. Defaults to "native".
+            xor_cut (int, optional): max variables of a xor written as clauses. Defaults to 5.
+        """
+        if xor not in ("native", "cnf"):
+            raise ValueError("xor must be native or cnf")
+        self.xor = xor
+        self.xor_cut = max(3, xor_cut)
+        self.nvars = 0
+        self.clauses = []
+        self.xors = []
+        # canonical xors seen so far, (variables) -> parity
+        self.xor_seen = {}
+
+    def new_var(self) -> int:
+        """a fresh variable
+
+        Returns:
+            int: the variable
+        """
+        self.nvars += 1
+        return self.nvars
+
+    def new_vars(self, n: int) -> list:
+        """n fresh variables
+
+        Args:
+            n (int): number of variables
+
+        Returns:
+            list: the variables
+        """
+        start = self.nvars + 1
+        self.nvars += n
+        return list(range(start, start + n))
+
+    def add_clause(self, lits: list) -> None:
+        """add a clause, duplicate literals are removed and tautologies dropped
+
+        Args:
+            lits (list): literals
+        """
+        clause = []
+        seen = set()
+        for lit in lits:
+            if -lit in seen:
+                return
+            if lit not in seen:
+                seen.add(lit)
+                clause.append(lit)
+        if not clause:
+            raise Unsatisfiable("empty clause")
+        self.clauses.append(clause)
+
+    def add_table(self, template: list, lits: list) -> None:
+        """instantiate clauses over variables 1..k(e.g. from sboxcnf.py) with the given literals
+
+        Args:
+            template (list): clauses over 1..len(lits)
+            lits (list): literal of template variable i + 1 at position i
+        """
+        for clause in template:
+            self.add_clause([lits[t - 1] if t > 0 else -lits[-t - 1] for t in clause])
+
+    def add_xor(self, lits: list, parity: int = 0) -> None:
+        """add lits[0] + lits[1] + ... = parity over GF(2)
+
+        negations move into the parity and a variable that appears twice cancels,
+        a xor that is already in the model is skipped.
+
+        Args:
+            lits (list): literals
+            parity (int, optional): right-hand side. Defaults to 0.
+
+        Raises:
+            Unsatisfiable: the xor reduces to 0 = 1 or contradicts an earlier xor over the same variables
+        """
+        variables = set()
+        for lit in lits:
+            parity ^= lit < 0
+            variables ^= {abs(lit)}
+        variables = tuple(sorted(variables))
+        if not variables:
+            if parity:
+                raise Unsatisfiable("xor reduces to 0 = 1")
+            return
+        if variables in self.xor_seen:
+            if self.xor_seen[variables] != parity:
+                raise Unsatisfiable("xor over {} contradicts an earlier one".format(variables))
+            return
+        self.xor_seen[variables] = parity
+        if len(variables) == 1:
+            self.clauses.append([variables[0] if parity else -variables[0]])
+        elif self.xor == "native":
+            # "x1 2 3 0" means 1 + 2 + 3 = 1, a negated first variable flips it
+            self.xors.append([variables[0] if parity else -variables[0]] + list(variables[1:]))
+        else:
+            self.xor_clauses(list(variables), parity)
+
+    def xor_clauses(self, variables: list, parity: int) -> None:
+        """write a xor as clauses, cutting it with auxiliary variables
+
+        Args:
+            variables (list): distinct variables
+            parity (int): right-hand side
+        """
+        while len(variables) > self.xor_cut:
+            # t = v0 + ... + v(k-2), the rest continues with t
+            t = self.new_var()
+            head = variables[:self.xor_cut - 1]
+            self.xor_clauses(head + [t], 0)
+            variables = [t] + variables[self.xor_cut - 1:]
+        n = len(variables)
+        for k in range(1 << n):
+            # forbid every assignment k with the wrong parity
+            if bin(k).count("1") % 2 != parity:
+                self.clauses.append([-v if k >> i & 1 else v for i, v in enumerate(variables)])
+
+    def totalizer(self, lits: list, bound: int) -> list:
+        """a totalizer counting true literals, cut at bound(Bailleux and Boufkhad, k-bounded)
+
+        out[k] is implied by "at least k + 1 of lits are true", so the unit or assumption -out[k]
+        bounds the sum by k, every bound up to len(out) - 1 can be asked on the same model.
+        a literal may appear several times to give it a weight.
+
+        Args:
+            lits (list): literals to count
+            bound (int): outputs kept, at most len(lits)
+
+        Returns:
+            list: output literals out[0..bound-1]
+        """
+        if len(lits) <= 1:
+            return list(lits[:bound])
+        half = len(lits) // 2
+        left = self.totalizer(lits[:half], bound)
+        right = self.totalizer(lits[half:], bound)
+        out = self.new_vars(min(len(lits), bound))
+        for i in range(len(left) + 1):
+            for j in range(len(right) + 1):
+                if i + j == 0:
+                    continue
+                # i true on the left and j on the right make at least i + j true
+                clause = [out[min(i + j, len(out)) - 1]]
+                if i:
+                    clause.append(-left[i - 1])
+                if j:
+                    clause.append(-right[j - 1])
+                self.add_clause(clause)
+        return out
+
+    def couple(self, lit: int, diff) -> int:
+        """the literal of the second message bit, given the first message bit and their difference
+
+        Args:
+            lit (int): literal of the first message
+            diff (Any): 0 or 1 for a known difference, None for a free bit, DiffVar for a symbolic one
+
+        Returns:
+            int: the literal of the second message, a fresh variable for a free or symbolic bit
+        """
+        if diff is None:
+            return self.new_var()
+        if isinstance(diff, DiffVar):
+            # b = a + d, d is decided by the assumptions of a trail
+            b = self.new_var()
+            self.add_xor([lit, b, diff])
+            return b
+        return -lit if diff else lit
+
+    def diff_states(self, nstates: int, nbits: int) -> list:
+        """states of symbolic difference bits, to encode a model for any trail
+
+        Args:
+            nstates (int): states of the trail
+            nbits (int): bits of a state
+
+        Returns:
+            list: states of DiffVar
+        """
+        return [[DiffVar(v) for v in self.new_vars(nbits)] for _ in range(nstates)]
+
+    def write(self, path: str, comments: list = ()) -> tuple:
+        """write the model
+
+        Args:
+            path (str): output file
+            comments (list, optional): lines written as "c" comments after the header. Defaults to ().
+
+        Returns:
+            tuple: (number of variables, number of clauses)
+        """
+        nclauses = len(self.clauses) + len(self.xors)
+        with open(path, "w") as f:
+            f.write("p cnf {} {}\n".format(self.nvars, nclauses))
+            for line in comments:
+                f.write("c {}\n".format(line))
+            f.writelines(" ".join(map(str, c)) + " 0\n" for c in self.clauses)
+            f.writelines("x" + " ".join(map(str, c)) + " 0\n" for c in self.xors)
+        return self.nvars, nclauses
+
+def read_dimacs(path: str, xor: str = "native") -> CNFBuilder:
+    """read a DIMACS file, with cryptominisat xor lines, into a builder
+
+    Args:
+        path (str): cnf file
+        xor (str, optional): xor mode of the builder, "cnf" cuts the xor lines into clauses. Defaults to "native".
+
+    Returns:
+        CNFBuilder: the model, nvars at least the one of the header
+    """
+    builder = CNFBuilder(xor)
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("p"):
+                builder.nvars = max(builder.nvars, int(line.split()[2]))
+                continue
+            if not line.strip() or line.startswith("c"):
+                continue
+            if line.startswith("x"):
+                # "x1 -2 3 0" means 1 + 2 + 3 = 1 with the negation folded into the right-hand side
+                builder.add_xor([int(v) for v in line[1:].split()[:-1]], 1)
+            else:
+                lits = [int(v) for v in line.split()[:-1]]
+                builder.clauses.append(lits)
+                builder.nvars = max([builder.nvars] + [abs(l) for l in lits])
+    return builder
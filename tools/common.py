@@ -0,0 +1,108 @@
+import hashlib
+import logging
+import os
+from multiprocessing import Pool
+
+def get_logger(msg: str = "example") -> logging.Logger:
+    """get a format logger
+
+    Args:
+        msg (str, optional): description of the logger. Defaults to "example".
+
+    Returns:
+        logging.Logger: the format logger
+    """
+    # create logger, set message
+    logger = logging.getLogger(msg)
+    # clear existed handler
+    logger.handlers.clear()
+    # set level
+    logger.setLevel(logging.DEBUG)
+    # create console handler and set level to debug
+    ch = logging.StreamHandler()
+    # set level
+    ch.setLevel(logging.DEBUG)
+    # create formatter, "c:" keeps the lines as comments when mixed into anf/cnf output
+    formatter = logging.Formatter("c: %(asctime)s - %(name)s - %(levelname)s - %(filename)s[line:%(lineno)d]: %(message)s")
+    # add formatter to ch
+    ch.setFormatter(formatter)
+    # add ch to logger
+    logger.addHandler(ch)
+    return logger
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file, read in fixed-size chunks
+
+    Args:
+        path (str): the file to hash
+        chunk_size (int, optional): read size in bytes. Defaults to 1 MB.
+
+    Returns:
+        str: hex digest
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+def parse_range(text: str) -> list:
+    """numbers of a comma separated list of numbers and ranges a:b(b excluded)
+
+    Args:
+        text (str): e.g. "1:321,641" or "192:320"
+
+    Returns:
+        list: numbers in the given order
+    """
+    numbers = []
+    for part in text.split(","):
+        if ":" in part:
+            start, end = part.split(":")
+            numbers += range(int(start), int(end))
+        elif part.strip():
+            numbers.append(int(part))
+    return numbers
+
+def cpu_count() -> int:
+    """the number of cores this process may use
+
+    Returns:
+        int: usable cores, at least 1
+    """
+    # respect taskset/cgroup affinity when the platform exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+# the state of a worker process of worker_pool, built once by its setup function
+WORKER = {}
+
+def init_worker(setup, args: tuple) -> None:
+    """build the state of a worker process
+
+    Args:
+        setup (Callable): returns the dict that goes into WORKER
+        args (tuple): arguments of setup
+    """
+    WORKER.update(setup(*args))
+
+def worker_pool(jobs: int = 0, work: int = 0, setup=None, args: tuple = ()) -> Pool:
+    """a process pool whose workers build their state(e.g. a loaded solver) once
+
+    Args:
+        jobs (int, optional): worker processes, 0 means one per core. Defaults to 0.
+        work (int, optional): number of jobs, no more workers are started, 0 for no cap. Defaults to 0.
+        setup (Callable, optional): run once per worker, returns the dict that goes into WORKER. Defaults to None.
+        args (tuple, optional): arguments of setup. Defaults to ().
+
+    Returns:
+        Pool: the pool, to be used in a with statement
+    """
+    workers = jobs or min(work or cpu_count(), cpu_count())
+    if setup is None:
+        return Pool(workers)
+    return Pool(workers, initializer=init_worker, initargs=(setup, args))
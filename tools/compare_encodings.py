@@ -0,0 +1,202 @@
+"""Build the indirect and the direct encoding of the same trails and compare them
+
+for every instance of the corpus each encoding is built, its cnf is measured and solved by every
+solver config under every seed. An encoding is either
+    "anf": a model script printing an ANF(the indirect models of Keccak/code, ascon/code, gimli/code),
+           converted by bosphorus, the bosphorus time is recorded
+    "cnf": a command writing {cnf} itself(the direct models, e.g. ascon_direct.py)
+the stages go through the artifact cache of pipeline.py, so an unchanged encoder is not rebuilt
+or solved again and its earlier measurements are reported, --no-cache measures everything anew.
+
+corpus file(json):
+{
+    "workdir": "compare",
+    "solvers": ["cms:threads=4", "cadical"],
+    "seeds": [0, 1, 2],
+    "timeout": 3600,
+    "instances": [
+        {
+            "name": "3rfinal",
+            "encodings": {
+                "indirect": {"anf": ["sage", "-python", "ascon/code/Ascon128_3rfinal.py"]},
+                "direct": {"cnf": ["python", "tools/ascon_direct.py", "-r", "3", "--trail", "3rfinal.trail",
+                                   "--xor", "cnf", "-o", "{cnf}"], "inputs": ["3rfinal.trail"]}
+            }
+        }
+    ]
+}
+"seeds" apply to the solvers without a seed of their own, "cms:seed=3" runs only with seed 3.
+cadical does not read the xor lines of cryptominisat, give the direct generators --xor cnf when it is in "solvers".
+
+Example:
+    python tools/compare_encodings.py corpus.json --report compare.json --cores 40
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import summarize
+from cache import ArtifactCache, DEFAULT_ROOT, DEFAULT_SIZE
+from common import get_logger
+from dimacs import read_header
+from pipeline import BINARIES, SOLVER_CODES, CoreScheduler, Stage, fill, run_stage
+from portfolio import SolverConfig
+from resultsdb import format_table
+from solverlog import read_log
+
+def model_stages(name: str, encoding: dict, workdir: str, binaries: dict) -> tuple:
+    """the stages that build the cnf of an encoding
+
+    Args:
+        name (str): file name prefix, instance_encoding
+        encoding (dict): "anf" or "cnf" command and optional "inputs"
+        workdir (str): directory of the files
+        binaries (dict): paths of bosphorus, cms and cadical
+
+    Returns:
+        tuple: (stages, cnf path)
+    """
+    path = lambda suffix: os.path.join(workdir, name + suffix)
+    files = {"name": name, "anf": path(".anf"), "cnf": path(".cnf")}
+    kind = "anf" if "anf" in encoding else "cnf"
+    argv = fill(encoding[kind], files)
+    inputs = [a for a in argv if os.path.isfile(a)] + encoding.get("inputs", [])
+    if kind == "cnf":
+        return [Stage("generate", argv, inputs, [files["cnf"]], stdout=path("_generate.log"))], files["cnf"]
+    stages = [Stage("generate", argv, inputs, [files["anf"]], stdout=files["anf"]),
+              Stage("convert", [binaries["bosphorus"], "--anfread", files["anf"], "--anfwrite", path("_out.anf"),
+                                "--cnfwrite", files["cnf"]] + encoding.get("bosphorus_args", []),
+                    [files["anf"]], [files["cnf"], path("_out.anf")], stdout=path("_bosphorus.log"))]
+    return stages, files["cnf"]
+
+def stage_wall(record: dict) -> float:
+    """wall time of a stage record, the original run for a cached or reused stage
+
+    Args:
+        record (dict): run_stage record
+
+    Returns:
+        float: seconds, None if unknown
+    """
+    return record.get("wall", record.get("original", {}).get("wall"))
+
+def run_encoding(name: str, encoding: dict, corpus: dict, binaries: dict, scheduler: CoreScheduler,
+                 cache: ArtifactCache) -> dict:
+    """build one encoding and solve it with every config and seed
+
+    Args:
+        name (str): instance_encoding
+        encoding (dict): the encoding of the corpus
+        corpus (dict): the corpus, for workdir, solvers, seeds and timeout
+        binaries (dict): paths of bosphorus, cms and cadical
+        scheduler (CoreScheduler): shared core scheduler
+        cache (ArtifactCache): artifact cache or None
+
+    Returns:
+        dict: sizes, build times and solver runs
+    """
+    logger = get_logger("compare_encodings")
+    workdir = corpus.get("workdir", ".")
+    os.makedirs(workdir, exist_ok=True)
+    stages, cnf = model_stages(name, encoding, workdir, binaries)
+    result = {"name": name, "build": {}, "runs": []}
+    for stage in stages:
+        record = run_stage(stage, scheduler, cache)
+        result["build"][stage.name] = stage_wall(record)
+        if record["status"] == "failed":
+            logger.error("{} {} failed".format(name, stage.name))
+            result["status"] = "failed"
+            return result
+    result["vars"], result["clauses"] = read_header(cnf)
+    for text in corpus.get("solvers", ["cms"]):
+        # a config with a seed of its own(cms:seed=3) runs only with it
+        own = SolverConfig.parse(text).seed
+        for seed in [own] if own is not None else corpus.get("seeds", [None]):
+            config = SolverConfig.parse(text)
+            config.seed = seed
+            log = os.path.join(workdir, "{}_{}.log".format(name, config.label))
+            stage = Stage("solve", config.argv(cnf, binaries), [cnf], [log], stdout=log, threads=config.threads,
+                          ok_codes=SOLVER_CODES, timeout=corpus.get("timeout"))
+            record = run_stage(stage, scheduler, cache)
+            run = {"config": text, "seed": seed, "log": log, "wall": stage_wall(record), "status": record["status"]}
+            if os.path.exists(log):
+                run.update(read_log(log))
+            result["runs"].append(run)
+            logger.info("{} {} seed {}: {} {}s".format(name, text, seed, run.get("status"), run.get("time")))
+    result["status"] = "ok"
+    return result
+
+def compare(corpus: dict, binaries: dict, cores: int = 0, parallel: int = 0, cache: ArtifactCache = None) -> list:
+    """run every encoding of every instance
+
+    Args:
+        corpus (dict): the corpus
+        binaries (dict): paths of bosphorus, cms and cadical
+        cores (int, optional): cores to share, 0 means all. Defaults to 0.
+        parallel (int, optional): max encodings at a time, 0 means one per core. Defaults to 0.
+        cache (ArtifactCache, optional): artifact cache, None disables it. Defaults to None.
+
+    Returns:
+        list: results of the encodings with their instance and encoding name
+    """
+    jobs = [(inst["name"], enc, spec) for inst in corpus["instances"] for enc, spec in inst["encodings"].items()]
+    scheduler = CoreScheduler(cores)
+    with ThreadPoolExecutor(max_workers=parallel or scheduler.cores) as pool:
+        results = list(pool.map(lambda job: run_encoding("{}_{}".format(job[0], job[1]), job[2], corpus, binaries,
+                                                         scheduler, cache), jobs))
+    for (inst, enc, _), result in zip(jobs, results):
+        result.update({"instance": inst, "encoding": enc})
+    return results
+
+def table(results: list, corpus: dict) -> str:
+    """comparison table, one row per instance and encoding, median solver time and conflicts per config
+
+    Args:
+        results (list): output of compare
+        corpus (dict): the corpus
+
+    Returns:
+        str: the table
+    """
+    configs = corpus.get("solvers", ["cms"])
+    header = ["instance", "encoding", "vars", "clauses", "generate", "bosphorus"]
+    for c in configs:
+        header += ["{} time".format(c), "{} conflicts".format(c)]
+    rows = []
+    for r in results:
+        build = [r["build"].get(stage) for stage in ("generate", "convert")]
+        row = [r["instance"], r["encoding"], r.get("vars"), r.get("clauses")]
+        row += ["{:.2f}".format(t) if t is not None else None for t in build]
+        for c in configs:
+            runs = [run for run in r["runs"] if run["config"] == c]
+            times = summarize([run.get("time") for run in runs])
+            conflicts = summarize([run.get("conflicts") for run in runs])
+            row.append("{:.2f}".format(times["median"]) if times["n"] else None)
+            row.append(int(conflicts["median"]) if conflicts["n"] else None)
+        rows.append(row)
+    return format_table(header, rows)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="compare_encodings")
+    arg_parser.description = "Compare the direct and the indirect encoding of a corpus of trails."
+    arg_parser.add_argument("corpus", type=str, help="corpus json")
+    arg_parser.add_argument("--cores", type=int, default=0, help="cores to use, default all")
+    arg_parser.add_argument("--parallel", type=int, default=0, help="max encodings at a time, default one per core")
+    arg_parser.add_argument("--report", type=str, default=None, help="json report, default CORPUS_report.json")
+    arg_parser.add_argument("--cache-dir", type=str, default=DEFAULT_ROOT, help="artifact cache directory")
+    arg_parser.add_argument("--cache-size", type=float, default=DEFAULT_SIZE, help="artifact cache size limit in GB")
+    arg_parser.add_argument("--no-cache", action="store_true", help="build and solve everything again")
+    for binary in BINARIES:
+        arg_parser.add_argument("--" + binary, type=str, default=BINARIES[binary], help="path of " + binary)
+    args = arg_parser.parse_args()
+
+    with open(args.corpus, "r") as f:
+        corpus = json.load(f)
+    binaries = {b: getattr(args, b) for b in BINARIES}
+    cache = None if args.no_cache else ArtifactCache(args.cache_dir, args.cache_size)
+    results = compare(corpus, binaries, args.cores, args.parallel, cache)
+    report = args.report or os.path.splitext(args.corpus)[0] + "_report.json"
+    with open(report, "w") as f:
+        json.dump(results, f, indent=2)
+    print(table(results, corpus))
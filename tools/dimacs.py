@@ -0,0 +1,163 @@
+"""DIMACS and solution-file helpers
+
+solver output(CryptoMiniSat, CaDiCaL):
+    s SATISFIABLE
+    v 1 -2 3 ... 0
+    variables are numbered from 1
+
+bosphorus solution file(--solvewrite):
+    Solution SAT
+    v -0 -1 2 ...
+    variables are numbered from 0, i.e. x(i) of the anf, "-i" means x(i) = 0
+
+bosphorus keeps x(i) of the anf as variable i + 1 of the cnf it writes,
+so a solver model over the cnf is converted to a solution file by shifting the index by one.
+"""
+
+SAT = "SAT"
+UNSAT = "UNSAT"
+UNKNOWN = "UNKNOWN"
+
+def read_header(path: str) -> tuple:
+    """read the "p cnf" header of a DIMACS file
+
+    Args:
+        path (str): cnf file
+
+    Returns:
+        tuple: (number of variables, number of clauses), (0, 0) if there is no header
+    """
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("p"):
+                fields = line.split()
+                return int(fields[2]), int(fields[3])
+            # the header must come before the first clause
+            if line.strip() and not line.startswith("c"):
+                break
+    return 0, 0
+
+def parse_solver_output(lines) -> tuple:
+    """collect the status and the model printed by a SAT solver
+
+    Args:
+        lines (iterable): lines of the solver log
+
+    Returns:
+        tuple: (status, literals), literals are signed 1-based ints without the final 0
+    """
+    status = UNKNOWN
+    literals = []
+    for line in lines:
+        if line.startswith("s "):
+            word = line.split()[1]
+            if word in ("SATISFIABLE", "ANF-SATISFIABLE"):
+                status = SAT
+            elif word in ("UNSATISFIABLE", "ANF-UNSATISFIABLE"):
+                status = UNSAT
+        elif line.startswith("v "):
+            literals.extend(int(v) for v in line.split()[1:] if v != "0")
+    return status, literals
+
+def read_solver_log(path: str) -> tuple:
+    """status and model of a solver log file
+
+    Args:
+        path (str): solver log
+
+    Returns:
+        tuple: (status, literals)
+    """
+    with open(path, "r", errors="replace") as f:
+        return parse_solver_output(f)
+
+def write_solution(path: str, status: str, literals: list) -> None:
+    """write a model in the bosphorus solution format
+
+    Args:
+        path (str): output file
+        status (str): SAT, UNSAT or UNKNOWN
+        literals (list): signed 1-based literals of the cnf
+    """
+    with open(path, "w") as f:
+        f.write("Solution {}\n".format(status))
+        if status == SAT:
+            tokens = []
+            for lit in literals:
+                # cnf variable v is x(v - 1) of the anf
+                tokens.append(("" if lit > 0 else "-") + str(abs(lit) - 1))
+            f.write("v " + " ".join(tokens) + " \n")
+
+def read_solution(path: str) -> tuple:
+    """read a bosphorus solution file
+
+    Args:
+        path (str): solution file
+
+    Returns:
+        tuple: (status, values), values[i] is the 0/1 value of x(i), missing variables are 0
+    """
+    status = UNKNOWN
+    assigned = {}
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("Solution"):
+                status = line.split()[1]
+            elif line.startswith("v "):
+                for token in line.split()[1:]:
+                    # "-0" is a valid token, so the sign is read from the text
+                    assigned[int(token.lstrip("-"))] = 0 if token.startswith("-") else 1
+    values = [0] * (max(assigned) + 1 if assigned else 0)
+    for i, v in assigned.items():
+        values[i] = v
+    return status, values
+
+def read_cnf(path: str) -> tuple:
+    """read a whole DIMACS file, "x" lines are cryptominisat xor clauses
+
+    Args:
+        path (str): cnf file
+
+    Returns:
+        tuple: (number of variables, clauses, xor clauses), a clause is a list of literals
+    """
+    nvars = 0
+    clauses = []
+    xors = []
+    current = []
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip() or line.startswith("c"):
+                continue
+            if line.startswith("p"):
+                nvars = int(line.split()[2])
+                continue
+            target = clauses
+            if line.startswith("x"):
+                target = xors
+                line = line[1:]
+            for token in line.split():
+                lit = int(token)
+                if lit == 0:
+                    target.append(current)
+                    current = []
+                else:
+                    current.append(lit)
+                    nvars = max(nvars, abs(lit))
+    return nvars, clauses, xors
+
+def write_cnf(path: str, nvars: int, clauses: list, xors: list = ()) -> None:
+    """write a DIMACS file
+
+    Args:
+        path (str): output file
+        nvars (int): number of variables
+        clauses (list): clauses
+        xors (list, optional): xor clauses, written as "x" lines. Defaults to ().
+    """
+    with open(path, "w") as f:
+        f.write("p cnf {} {}\n".format(nvars, len(clauses) + len(xors)))
+        for c in clauses:
+            f.write(" ".join(map(str, c)) + " 0\n")
+        for c in xors:
+            f.write("x" + " ".join(map(str, c)) + " 0\n")
@@ -0,0 +1,90 @@
+"""Enumerate the solutions of a model projected onto chosen variables
+
+the cnf is loaded once into an in-process solver(IncrementalSolver of incremental.py), after every
+solution a blocking clause over the projected variables forbids their current values and the same
+solver is called again, so learned clauses are kept and the cnf is read only once.
+Every solution is appended to the output as soon as it is found, one line of 0/1 per solution
+in the order of --project, and the enumeration stops when the solutions are exhausted, at --limit
+or at --timeout(wall seconds, the rest of it is the limit of the next call, which cms counts in CPU seconds).
+
+variables are the ones of the cnf: x(i) of an anf converted by bosphorus is variable i + 1,
+e.g. the input state of a 320-bit model is --project 1:321(ranges a:b exclude b, see parse_range of common.py).
+
+Example:
+    python tools/enumeration.py 6rattack.cnf --project 1:321 --limit 100000 --timeout 3600 -o 6rattack_pairs.txt
+"""
+import argparse
+import time
+
+from cnfbuilder import read_dimacs
+from common import get_logger, parse_range
+from incremental import IncrementalSolver
+
+def bit(model, v: int) -> int:
+    """value of a variable in a model, 0 for a variable the solver has not seen
+
+    Args:
+        model (Any): model[v] is the value of variable v
+        v (int): variable
+
+    Returns:
+        int: 0 or 1
+    """
+    return int(bool(model[v])) if v < len(model) else 0
+
+def enumerate_solutions(solver: IncrementalSolver, project: list, out, limit: int = 0, timeout: float = None,
+                        assumptions: list = ()) -> tuple:
+    """enumerate projected solutions with blocking clauses
+
+    Args:
+        solver (IncrementalSolver): solver holding the model
+        project (list): variables of the projection
+        out (file): solutions are written here, one line each
+        limit (int, optional): stop after this many solutions, 0 for no limit. Defaults to 0.
+        timeout (float, optional): stop after this many wall seconds, None for no limit. Defaults to None.
+        assumptions (list, optional): literals assumed in every call. Defaults to ().
+
+    Returns:
+        tuple: (number of solutions, True when every solution was found)
+    """
+    start = time.time()
+    count = 0
+    while not limit or count < limit:
+        # every call gets the rest of the timeout
+        remaining = None if timeout is None else timeout - (time.time() - start)
+        if remaining is not None and remaining <= 0:
+            return count, False
+        sat, model = solver.solve(list(assumptions), remaining)
+        if sat is None:
+            return count, False
+        if not sat:
+            return count, True
+        values = [bit(model, v) for v in project]
+        out.write("".join(map(str, values)) + "\n")
+        out.flush()
+        count += 1
+        # the next solution differs in at least one projected variable
+        solver.add_clause([-v if b else v for v, b in zip(project, values)])
+    return count, False
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="enumeration")
+    arg_parser.description = "Enumerate the solutions of a cnf projected onto chosen variables."
+    arg_parser.add_argument("cnf", type=str, help="cnf file, xor lines are allowed")
+    arg_parser.add_argument("--project", type=str, required=True, help="variables of the projection, e.g. 1:321")
+    arg_parser.add_argument("--limit", type=int, default=0, help="max solutions, default all")
+    arg_parser.add_argument("--timeout", type=float, default=None, help="max wall seconds, default no limit")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--threads", type=int, default=1, help="threads of cms")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="solutions file")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("enumeration")
+    solver = IncrementalSolver(args.backend, args.threads, args.timeout)
+    solver.load(read_dimacs(args.cnf, solver.xor))
+    project = parse_range(args.project)
+    start = time.time()
+    with open(args.output, "w") as f:
+        count, complete = enumerate_solutions(solver, project, f, args.limit, args.timeout)
+    logger.info("{} {} solutions over {} variables in {:.2f}s".format(
+        "all" if complete else "stopped after", count, len(project), time.time() - start))
@@ -0,0 +1,216 @@
+"""Direct CNF model of a Gimli differential trail
+
+the model has the values of both messages instead of an ANF in x and u:
+    message a: variables, x(i) of the anf scripts is variable i + 1(the input state)
+    message b: a literal per bit, the literal of a negated when the difference is 1,
+               a fresh variable when the trail leaves the bit free(?)
+the state layout is the one of gimli.py, word s(i,j) is bits i*128 + j*32 .. +31 and bit k of a word is 2^k.
+round r uses the round number 24 - (start + r) of the scripts(start 0 unless given):
+    non_linear     new variables for the SP-box outputs, clauses of the bit slices of sboxcnf.py
+                   (plain xors for the low bits where the shifted terms are 0)
+    linear_mixing  the swaps only move literals
+    round_const    negated literals of s(0,0)
+the trail has ROUNDS + 1 states like diff of gimli.py, diff[r] is the difference before round r.
+
+Example:
+    python tools/gimli_direct.py -r 6 --trail 6rgimli.trail -o 6rgimli_direct.cnf
+"""
+import argparse
+
+from cnfbuilder import CNFBuilder, Unsatisfiable
+from common import get_logger
+from sboxcnf import SBOXES, sbox_cnf
+from trail import read_trail
+
+X, Y, Z = 3, 4, 32
+STATE = X * Y * Z
+
+def index(i: int, j: int, k: int = 0) -> int:
+    """state bit k of word s(i,j)
+
+    Args:
+        i (int): row
+        j (int): column
+        k (int, optional): bit of the word. Defaults to 0.
+
+    Returns:
+        int: bit index
+    """
+    return i * Y * Z + j * Z + k
+
+def rotate(word: list, offset: int) -> list:
+    """word <<< offset, as the rotations of Gimli.non_linear in gimli.py
+
+    Args:
+        word (list): 32 literals
+        offset (int): shift
+
+    Returns:
+        list: 32 literals
+    """
+    return word[Z - offset:] + word[:Z - offset]
+
+def mixing(state: list, r: int) -> list:
+    """linear_mixing on a list of literals or differences
+
+    Args:
+        state (list): state
+        r (int): round number of the scripts(24 - round)
+
+    Returns:
+        list: state
+    """
+    state = state[:]
+    if r % 4 == 0:
+        swaps = [(0, 1), (2, 3)]
+    elif r % 4 == 2:
+        swaps = [(0, 2), (1, 3)]
+    else:
+        swaps = []
+    for j0, j1 in swaps:
+        w0, w1 = slice(index(0, j0), index(0, j0 + 1)), slice(index(0, j1), index(0, j1 + 1))
+        state[w0], state[w1] = state[w1], state[w0]
+    return state
+
+def const_bits(r: int) -> list:
+    """bits of s(0,0) flipped by round_const
+
+    Args:
+        r (int): round number of the scripts
+
+    Returns:
+        list: bit indexes
+    """
+    if r % 4:
+        return []
+    c = 0x9e377900 ^ r
+    return [index(0, 0, k) for k in range(Z) if c >> k & 1]
+
+def add_sp_box(builder: CNFBuilder, templates: dict, column: list, out: list) -> None:
+    """SP-box constraints between the literals of a column and of its output
+
+    Args:
+        builder (CNFBuilder): the model
+        templates (dict): clauses of the bit slices x, y, z
+        column (list): 96 literals, words x, y, z
+        out (list): 96 output literals, words x, y, z
+    """
+    x = rotate(column[:Z], 24)
+    y = rotate(column[Z:2 * Z], 9)
+    z = column[2 * Z:]
+    ox, oy, oz = out[:Z], out[Z:2 * Z], out[2 * Z:]
+    for k in range(Z):
+        # x = z + y + ((x & y) << 3)
+        if k >= 3:
+            builder.add_table(templates["x"], [z[k], y[k], x[k - 3], y[k - 3], ox[k]])
+        else:
+            builder.add_xor([ox[k], z[k], y[k]])
+        # y = y + x + ((x | z) << 1)
+        if k >= 1:
+            builder.add_table(templates["y"], [y[k], x[k], x[k - 1], z[k - 1], oy[k]])
+        else:
+            builder.add_xor([oy[k], y[k], x[k]])
+        # z = x + (z << 1) + ((y & z) << 2)
+        if k >= 2:
+            builder.add_table(templates["z"], [x[k], z[k - 1], y[k - 2], z[k - 2], oz[k]])
+        elif k == 1:
+            builder.add_xor([oz[k], x[k], z[k - 1]])
+        else:
+            builder.add_xor([oz[k], x[k]])
+
+def sp_outputs(builder: CNFBuilder, column: list) -> list:
+    """output literals of the SP-box of a column for message a, bit 0 of z is x <<< 24 itself
+
+    Args:
+        builder (CNFBuilder): the model
+        column (list): 96 input literals
+
+    Returns:
+        list: 96 output literals
+    """
+    out = builder.new_vars(2 * Z + Z - 1)
+    # z[0] = (x <<< 24)[0] = x[8], no variable needed
+    return out[:2 * Z] + [column[8]] + out[2 * Z:]
+
+def non_linear(builder: CNFBuilder, templates: dict, state_a: list, state_b: list, diff: list) -> tuple:
+    """the SP-boxes of all columns for both messages
+
+    Args:
+        builder (CNFBuilder): the model
+        templates (dict): clauses of the bit slices
+        state_a (list): literals of message a
+        state_b (list): literals of message b
+        diff (list): difference of the SP-box outputs
+
+    Returns:
+        tuple: (output literals of a, output literals of b)
+    """
+    out_a, out_b = [0] * STATE, [0] * STATE
+    for j in range(Y):
+        bits = [index(i, j, k) for i in range(X) for k in range(Z)]
+        column_a = [state_a[p] for p in bits]
+        column_b = [state_b[p] for p in bits]
+        new_a = sp_outputs(builder, column_a)
+        new_b = [builder.couple(l, diff[p]) for l, p in zip(new_a, bits)]
+        add_sp_box(builder, templates, column_a, new_a)
+        add_sp_box(builder, templates, column_b, new_b)
+        for p, la, lb in zip(bits, new_a, new_b):
+            out_a[p], out_b[p] = la, lb
+    return out_a, out_b
+
+def encode(builder: CNFBuilder, diff: list, rounds: int, start: int = 0) -> tuple:
+    """add the model of a trail
+
+    Args:
+        builder (CNFBuilder): the model, variables 1..384 should still be free for the input
+        diff (list): rounds + 1 states of 0, 1 or None
+        rounds (int): number of rounds
+        start (int, optional): round r is round 24 - (start + r) of the scripts. Defaults to 0.
+
+    Returns:
+        tuple: (states of message a, states of message b), literals before every round and at the end
+
+    Raises:
+        Unsatisfiable: the trail contradicts a linear part of the SP-box
+    """
+    if len(diff) != rounds + 1:
+        raise ValueError("a {}-round trail has {} states, got {}".format(rounds, rounds + 1, len(diff)))
+    if start < 0 or start + rounds > 24:
+        raise ValueError("Gimli has 24 rounds, not {} from {}".format(rounds, start))
+    templates = {w: sbox_cnf(*SBOXES["gimli_" + w]) for w in "xyz"}
+    a = [builder.new_vars(STATE)]
+    b = [[builder.couple(l, d) for l, d in zip(a[0], diff[0])]]
+    for r in range(rounds):
+        n = 24 - (start + r)
+        # the swaps only permute differences, undo them to get the difference of the SP-box outputs
+        out_a, out_b = non_linear(builder, templates, a[-1], b[-1], mixing(diff[r + 1], n))
+        state_a, state_b = mixing(out_a, n), mixing(out_b, n)
+        for p in const_bits(n):
+            state_a[p], state_b[p] = -state_a[p], -state_b[p]
+        a.append(state_a)
+        b.append(state_b)
+    return a, b
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="gimli_direct")
+    arg_parser.description = "Write the direct CNF model of a Gimli differential trail."
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--trail", type=str, required=True, help="trail file, see trail.py")
+    arg_parser.add_argument("--start", type=int, default=0, help="round offset as in gimli_attack.py, default 0")
+    arg_parser.add_argument("--xor", type=str, default="native", choices=["native", "cnf"],
+                            help="native xor lines for cryptominisat, cnf for cadical")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="cnf file")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("gimli_direct")
+    diff = read_trail(args.trail, STATE, Z, msb_first=False)
+    builder = CNFBuilder(args.xor)
+    try:
+        encode(builder, diff, args.rounds, args.start)
+    except Unsatisfiable as e:
+        logger.warning("Impossible: {}".format(e))
+        exit(0)
+    comment = "gimli {} rounds from {}, trail {}".format(args.rounds, args.start, args.trail)
+    nvars, nclauses = builder.write(args.output, [comment,
+                                                  "variables 1..384 are the input state x(0)..x(383)"])
+    logger.info("wrote {} with {} variables and {} clauses".format(args.output, nvars, nclauses))
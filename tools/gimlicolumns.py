@@ -0,0 +1,185 @@
+"""Filter impossible Gimli trails column by column before the full model
+
+linear_mixing only runs in the rounds with r % 4 == 0 or 2 and only swaps words of row 0, so between two
+mixings the four 96-bit columns go through their SP-boxes independently. The rounds of a trail are cut into
+segments that end at a mixing(or at the last round), and a (column, segment) pair is a small direct model of
+its own(the SP-box clauses of gimli_direct.py for one column):
+    check   every (column, segment) model is solved in a worker process, one UNSAT model makes the whole
+            trail impossible, usually in a fraction of the time of the 384-bit model
+    full    when every column model is SAT the 384-bit model of gimli_direct.py decides the trail
+the check only proves impossibility: the columns of a segment are solved with free inputs, so SAT columns do
+not give a pair of the whole trail.
+
+Example:
+    python tools/gimlicolumns.py --trail 6rgimli.trail -r 6 --jobs 8 --report 6rgimli_columns.json
+"""
+import argparse
+import json
+import time
+
+from cnfbuilder import CNFBuilder, Unsatisfiable
+from common import get_logger, worker_pool
+from gimli_direct import STATE, X, Y, Z, add_sp_box, encode, index, mixing, sp_outputs
+from incremental import IncrementalSolver, STATUS, values
+from sboxcnf import SBOXES, sbox_cnf
+from trail import read_trail
+
+def segments(rounds: int, start: int = 0) -> list:
+    """rounds between two mixings
+
+    Args:
+        rounds (int): number of rounds
+        start (int, optional): round r is round 24 - (start + r) of the scripts. Defaults to 0.
+
+    Returns:
+        list: (first round, last round), the last round ends with a mixing or the trail
+    """
+    result = []
+    first = 0
+    for r in range(rounds):
+        if (24 - (start + r)) % 4 in (0, 2) or r == rounds - 1:
+            result.append((first, r))
+            first = r + 1
+    return result
+
+def column_bits(j: int) -> list:
+    """state bits of column j, words s(0,j), s(1,j), s(2,j)
+
+    Args:
+        j (int): column
+
+    Returns:
+        list: 96 bit indexes
+    """
+    return [index(i, j, k) for i in range(X) for k in range(Z)]
+
+def encode_column(builder: CNFBuilder, diff: list, j: int, segment: tuple, start: int = 0) -> tuple:
+    """the direct model of one column over one segment
+
+    Args:
+        builder (CNFBuilder): the model
+        diff (list): states of the trail
+        j (int): column
+        segment (tuple): (first round, last round)
+        start (int, optional): round offset. Defaults to 0.
+
+    Returns:
+        tuple: (96 input literals of message a, 96 output literals of message a after the last SP-box,
+                the same of message b)
+    """
+    templates = {w: sbox_cnf(*SBOXES["gimli_" + w]) for w in "xyz"}
+    bits = column_bits(j)
+    first, last = segment
+    a_in = builder.new_vars(X * Z)
+    b_in = [builder.couple(l, diff[first][p]) for l, p in zip(a_in, bits)]
+    a, b = a_in, b_in
+    for r in range(first, last + 1):
+        # the difference of the SP-box outputs, before the swaps of the round
+        out_diff = mixing(diff[r + 1], 24 - (start + r))
+        new_a = sp_outputs(builder, a)
+        new_b = [builder.couple(l, out_diff[p]) for l, p in zip(new_a, bits)]
+        add_sp_box(builder, templates, a, new_a)
+        add_sp_box(builder, templates, b, new_b)
+        a, b = new_a, new_b
+    return a_in, a, b_in, b
+
+def check_column(job: tuple) -> dict:
+    """solve one (column, segment) model in a worker process
+
+    Args:
+        job (tuple): (diff, column, segment, start, backend, time limit)
+
+    Returns:
+        dict: column, segment, status and time
+    """
+    diff, j, segment, start, backend, time_limit = job
+    begin = time.time()
+    solver = IncrementalSolver(backend, 1, time_limit)
+    builder = CNFBuilder(solver.xor)
+    try:
+        encode_column(builder, diff, j, segment, start)
+        solver.load(builder)
+        sat, _ = solver.solve([])
+    except Unsatisfiable:
+        sat = False
+    return {"column": j, "segment": list(segment), "status": STATUS[sat], "time": time.time() - begin}
+
+def check_columns(diff: list, rounds: int, start: int = 0, jobs: int = 0, backend: str = "cms",
+                  time_limit: float = None) -> list:
+    """solve every (column, segment) model in parallel
+
+    Args:
+        diff (list): states of the trail
+        rounds (int): number of rounds
+        start (int, optional): round offset. Defaults to 0.
+        jobs (int, optional): worker processes, 0 means one per core. Defaults to 0.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        time_limit (float, optional): seconds of a model(CPU seconds with cms), None for no limit. Defaults to None.
+
+    Returns:
+        list: results of check_column
+    """
+    work = [(diff, j, s, start, backend, time_limit) for s in segments(rounds, start) for j in range(Y)]
+    with worker_pool(jobs, len(work)) as pool:
+        return pool.map(check_column, work)
+
+def verify_full(diff: list, rounds: int, start: int = 0, backend: str = "cms") -> dict:
+    """solve the 384-bit model of gimli_direct.py
+
+    Args:
+        diff (list): states of the trail
+        rounds (int): number of rounds
+        start (int, optional): round offset. Defaults to 0.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+
+    Returns:
+        dict: status, time and for SAT the input pair as bit strings
+    """
+    begin = time.time()
+    solver = IncrementalSolver(backend)
+    builder = CNFBuilder(solver.xor)
+    try:
+        a, b = encode(builder, diff, rounds, start)
+    except Unsatisfiable:
+        return {"status": STATUS[False], "time": time.time() - begin}
+    solver.load(builder)
+    sat, model = solver.solve([])
+    result = {"status": STATUS[sat], "time": time.time() - begin}
+    if sat:
+        result["a"], result["b"] = values(model, a[0]), values(model, b[0])
+    return result
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="gimlicolumns")
+    arg_parser.description = "Filter impossible Gimli trails column by column, then solve the full model."
+    arg_parser.add_argument("--trail", type=str, required=True, help="trail file, see trail.py")
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--start", type=int, default=0, help="round offset as in gimli_attack.py, default 0")
+    arg_parser.add_argument("--jobs", type=int, default=0, help="worker processes of the check, default one per core")
+    arg_parser.add_argument("--time-limit", type=float, default=None,
+                            help="seconds of a column model, CPU seconds with cms")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--report", type=str, default=None, help="json file of the results")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("gimlicolumns")
+    diff = read_trail(args.trail, STATE, Z, msb_first=False)
+    if len(diff) != args.rounds + 1:
+        raise ValueError("a {}-round trail has {} states, got {}".format(args.rounds, args.rounds + 1, len(diff)))
+    start = time.time()
+    checks = check_columns(diff, args.rounds, args.start, args.jobs, args.backend, args.time_limit)
+    logger.info("{} column models checked in {:.2f}s".format(len(checks), time.time() - start))
+    report = {"trail": args.trail, "columns": checks}
+    unsat = [c for c in checks if c["status"] == "UNSAT"]
+    if unsat:
+        logger.info("Impossible: column {} of rounds {}-{}".format(unsat[0]["column"], *unsat[0]["segment"]))
+        report.update({"status": "UNSAT", "method": "columns"})
+    else:
+        report.update(verify_full(diff, args.rounds, args.start, args.backend))
+        report["method"] = "full"
+        logger.info("{} by the full model".format(report["status"]))
+    report["time"] = time.time() - start
+    logger.info("finished in {:.2f}s".format(report["time"]))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
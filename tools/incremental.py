@@ -0,0 +1,229 @@
+"""Verify many trails of the same cipher and round count with one incremental solver
+
+the direct model(ascon_direct.py, gimli_direct.py) is built once with every difference bit
+as a variable(DiffVar of cnfbuilder.py) and loaded into an in-process solver,
+each trail is then a solve call under the assumptions d = 0 / d = 1 of its known bits,
+a free bit(?) gets no assumption. Learned clauses are kept from one trail to the next.
+
+backends:
+    cms          pycryptosat, the xors of the model stay native xors
+    NAME         a PySAT solver, e.g. cadical153, glucose4, the xors are written as clauses
+both are optional dependencies, only the chosen one has to be installed. A time limit is in CPU seconds
+with cms(time_limit of pycryptosat) and in wall seconds with PySAT(an interrupt from a timer thread).
+
+Example:
+    python tools/incremental.py ascon -r 3 trails/*.trail --report 3rascon.json
+"""
+import argparse
+import json
+import threading
+import time
+
+import ascon_direct
+import gimli_direct
+from cnfbuilder import CNFBuilder
+from common import get_logger
+from trail import read_trail
+
+# cipher -> (model module, state bits, hex word, bit order of the hex words)
+CIPHERS = {
+    "ascon": (ascon_direct, ascon_direct.STATE, ascon_direct.LANE, True),
+    "gimli": (gimli_direct, gimli_direct.STATE, gimli_direct.Z, False),
+}
+
+# solve result -> status of the reports, None is a solve call stopped at its time limit
+STATUS = {True: "SAT", False: "UNSAT", None: "UNKNOWN"}
+
+class IncrementalSolver:
+    """an in-process solver that keeps its learned clauses between solve calls"""
+    def __init__(self, backend: str = "cms", threads: int = 1, time_limit: float = None) -> None:
+        """initial the solver
+
+        Args:
+            backend (str, optional): cms or the name of a PySAT solver. Defaults to "cms".
+            threads (int, optional): threads of cms. Defaults to 1.
+            time_limit (float, optional): seconds of a solve call(CPU seconds with cms, wall seconds with PySAT),
+                None for no limit. Defaults to None.
+
+        Raises:
+            ImportError: the bindings of the backend are not installed
+        """
+        self.backend = backend
+        self.time_limit = time_limit
+        if backend == "cms":
+            import pycryptosat
+            if time_limit is None:
+                self.solver = pycryptosat.Solver(threads=threads)
+            else:
+                self.solver = pycryptosat.Solver(threads=threads, time_limit=time_limit)
+        else:
+            from pysat.solvers import Solver
+            self.solver = Solver(name=backend)
+
+    @property
+    def xor(self) -> str:
+        """the xor mode of CNFBuilder this backend reads
+
+        Returns:
+            str: native or cnf
+        """
+        return "native" if self.backend == "cms" else "cnf"
+
+    def add_clause(self, clause: list) -> None:
+        """add a clause, e.g. a blocking clause between two solve calls
+
+        Args:
+            clause (list): literals
+        """
+        self.solver.add_clause(clause)
+
+    def load(self, builder: CNFBuilder) -> None:
+        """add the clauses and xors of a model
+
+        Args:
+            builder (CNFBuilder): the model, built with xor=self.xor
+        """
+        for clause in builder.clauses:
+            self.solver.add_clause(clause)
+        for x in builder.xors:
+            # a negated first variable means parity 0, see CNFBuilder.add_xor
+            self.solver.add_xor_clause([abs(v) for v in x], x[0] > 0)
+
+    def solve(self, assumptions: list, time_limit: float = None) -> tuple:
+        """solve under assumptions
+
+        Args:
+            assumptions (list): literals
+            time_limit (float, optional): seconds of this call when shorter than the limit of the solver, e.g. the
+                rest of an overall timeout, CPU seconds with cms. Defaults to None.
+
+        Returns:
+            tuple: (True, model), (False, None) or (None, None) at the time limit, model[v] is the value of variable v
+        """
+        if time_limit is None or (self.time_limit is not None and self.time_limit < time_limit):
+            time_limit = self.time_limit
+        if self.backend == "cms":
+            top = max((abs(l) for l in assumptions), default=0)
+            if top > self.solver.nb_vars():
+                # cms rejects assumptions on variables it has not seen, a tautology declares them
+                self.solver.add_clause([top, -top])
+            if time_limit is None:
+                sat, solution = self.solver.solve(assumptions)
+            else:
+                sat, solution = self.solver.solve(assumptions, time_limit=time_limit)
+            return (True, solution) if sat else (sat, None)
+        if time_limit is None:
+            sat = self.solver.solve(assumptions=assumptions)
+        else:
+            timer = threading.Timer(time_limit, self.solver.interrupt)
+            timer.start()
+            sat = self.solver.solve_limited(assumptions=assumptions, expect_interrupt=True)
+            timer.cancel()
+            self.solver.clear_interrupt()
+        if not sat:
+            return sat, None
+        model = [None] * (self.solver.nof_vars() + 1)
+        for lit in self.solver.get_model():
+            model[abs(lit)] = lit > 0
+        return True, model
+
+def build(cipher: str, rounds: int, xor: str, final_matrix: bool = False, start: int = 0) -> tuple:
+    """the model of a cipher and round count for every trail
+
+    Args:
+        cipher (str): ascon or gimli
+        rounds (int): number of rounds
+        xor (str): xor mode of the builder
+        final_matrix (bool, optional): ascon trails end after the last Matrix. Defaults to False.
+        start (int, optional): first round constant(ascon) or round offset(gimli). Defaults to 0.
+
+    Returns:
+        tuple: (builder, symbolic trail, states of message a, states of message b)
+    """
+    module, nbits = CIPHERS[cipher][:2]
+    builder = CNFBuilder(xor)
+    if cipher == "ascon":
+        diff = builder.diff_states(2 * rounds + final_matrix, nbits)
+        a, b = module.encode(builder, diff, rounds, final_matrix, start)
+    else:
+        diff = builder.diff_states(rounds + 1, nbits)
+        a, b = module.encode(builder, diff, rounds, start)
+    return builder, diff, a, b
+
+def trail_assumptions(symbolic: list, trail: list) -> list:
+    """assumptions fixing the symbolic difference bits to a trail
+
+    Args:
+        symbolic (list): states of DiffVar
+        trail (list): states of 0, 1 or None
+
+    Returns:
+        list: literals
+    """
+    if len(trail) != len(symbolic):
+        raise ValueError("the model has {} states, the trail {}".format(len(symbolic), len(trail)))
+    return [d if t else -d for ds, ts in zip(symbolic, trail) for d, t in zip(ds, ts) if t is not None]
+
+def values(model: list, lits: list) -> str:
+    """bits of literals in a model
+
+    Args:
+        model (list): model[v] is the value of variable v
+        lits (list): literals
+
+    Returns:
+        str: one 0/1 character per literal
+    """
+    return "".join(str(int(bool(model[abs(l)]) ^ (l < 0))) for l in lits)
+
+def verify(solver: IncrementalSolver, symbolic: list, a: list, b: list, trail: list) -> dict:
+    """verify one trail
+
+    Args:
+        solver (IncrementalSolver): solver holding the model
+        symbolic (list): states of DiffVar
+        a (list): states of message a
+        b (list): states of message b
+        trail (list): states of 0, 1 or None
+
+    Returns:
+        dict: status, time and for SAT the input pair as bit strings
+    """
+    start = time.time()
+    sat, model = solver.solve(trail_assumptions(symbolic, trail))
+    result = {"status": STATUS[sat], "time": time.time() - start}
+    if sat:
+        result["a"], result["b"] = values(model, a[0]), values(model, b[0])
+    return result
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="incremental")
+    arg_parser.description = "Verify trails of one cipher and round count with a single incremental solver."
+    arg_parser.add_argument("cipher", type=str, choices=sorted(CIPHERS), help="cipher of the trails")
+    arg_parser.add_argument("trails", type=str, nargs="+", help="trail files, see trail.py")
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="ascon trails end after the last Matrix")
+    arg_parser.add_argument("--start", type=int, default=0,
+                            help="first round constant(ascon) or round offset(gimli), default 0")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--threads", type=int, default=1, help="threads of cms")
+    arg_parser.add_argument("--report", type=str, default=None, help="json file of the results")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("incremental")
+    solver = IncrementalSolver(args.backend, args.threads)
+    start = time.time()
+    builder, symbolic, a, b = build(args.cipher, args.rounds, solver.xor, args.final_matrix, args.start)
+    solver.load(builder)
+    logger.info("model of {} variables and {} clauses loaded in {:.2f}s".format(
+        builder.nvars, len(builder.clauses) + len(builder.xors), time.time() - start))
+    _, nbits, word, msb_first = CIPHERS[args.cipher]
+    results = []
+    for path in args.trails:
+        result = verify(solver, symbolic, a, b, read_trail(path, nbits, word, msb_first))
+        result["trail"] = path
+        results.append(result)
+        logger.info("{}: {} in {:.2f}s".format(path, result["status"], result["time"]))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,437 @@
+"""Run the AlgSAT verification steps of USER_GUIDE.md as one pipeline
+
+stages of a pipeline named NAME (all files live in the pipeline's workdir):
+    generate: the model script, stdout -> NAME.anf
+    convert:  bosphorus --anfread NAME.anf --anfwrite NAME_out.anf --cnfwrite NAME.cnf
+    solve:    cryptominisat5 / cadical on NAME.cnf, stdout -> NAME_cms{threads}.log / NAME_cadical.log
+    decode:   solver model -> NAME_solution (bosphorus solution format)
+    check:    optional checker command, stdout -> NAME_solution_verify.log
+
+every stage runs as a subprocess, its wall time, cpu time and peak rss are recorded,
+and the results of a pipeline are written to NAME_pipeline.json.
+A stage is skipped when its outputs exist and its command and input files are unchanged,
+or when the artifact cache(cache.py) holds outputs produced from the same inputs.
+
+job file(json):
+{
+    "pipelines": [
+        {
+            "name": "4rkeccak1600",
+            "workdir": "Keccak/result",
+            "generate": ["python", "-u", "Keccak/code/keccak.py", "-f", "trails_1600.txt"],
+            "inputs": ["Keccak/code/read_trails.py"],
+            "solver": "cms",
+            "threads": 20,
+            "timeout": 86400,
+            "check": ["python", "Keccak/code/keccakcheck.py", "{solution}"]
+        }
+    ]
+}
+"{anf}", "{cnf}", "{log}", "{solution}", "{name}" and "{threads}" in commands are replaced by the stage files.
+"solver" is cms, cadical or portfolio; a portfolio races the configs listed in "portfolio"
+(see portfolio.py, default ["cms:threads=THREADS", "cadical"]) with "seeds" seeds each.
+
+Example:
+    python tools/pipeline.py run jobs.json --bosphorus /path/to/bosphorus/build/bosphorus --cores 40
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from cache import ArtifactCache, DEFAULT_ROOT, DEFAULT_SIZE
+from common import cpu_count, file_digest, get_logger
+from dimacs import read_solver_log, write_solution
+
+# default binaries, can be overridden by the environment or the command line
+BINARIES = {
+    "bosphorus": os.environ.get("ALGSAT_BOSPHORUS", "bosphorus"),
+    "cms": os.environ.get("ALGSAT_CMS", "cryptominisat5"),
+    "cadical": os.environ.get("ALGSAT_CADICAL", "cadical"),
+}
+
+# exit codes of SAT solvers: 10 satisfiable, 20 unsatisfiable
+SOLVER_CODES = (0, 10, 20)
+
+class CoreScheduler:
+    """hand out cores to stages so that the running stages never oversubscribe the machine"""
+    def __init__(self, cores: int = 0) -> None:
+        """initial a scheduler
+
+        Args:
+            cores (int, optional): cores to share, 0 means all usable cores. Defaults to 0.
+        """
+        self.cores = cores if cores > 0 else cpu_count()
+        self.free = self.cores
+        self.cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, n: int):
+        """block until n cores are free and hold them while the context is open
+
+        Args:
+            n (int): cores wanted, clamped to [1, cores]
+        """
+        n = min(max(1, n), self.cores)
+        with self.cond:
+            self.cond.wait_for(lambda: self.free >= n)
+            self.free -= n
+        try:
+            yield n
+        finally:
+            with self.cond:
+                self.free += n
+                self.cond.notify_all()
+
+class Stage:
+    """a subprocess step of a pipeline"""
+    def __init__(self, name: str, argv: list, inputs: list, outputs: list,
+                 stdout: str = None, threads: int = 1, ok_codes: tuple = (0,), timeout: float = None) -> None:
+        """initial a stage
+
+        Args:
+            name (str): stage name
+            argv (list): command to run
+            inputs (list): files the outputs depend on
+            outputs (list): files the stage produces
+            stdout (str, optional): file that receives stdout and stderr. Defaults to None.
+            threads (int, optional): cores the stage uses. Defaults to 1.
+            ok_codes (tuple, optional): exit codes meaning success. Defaults to (0,).
+            timeout (float, optional): wall time limit in seconds. Defaults to None.
+        """
+        self.name = name
+        self.argv = [str(a) for a in argv]
+        self.inputs = inputs
+        self.outputs = outputs
+        self.stdout = stdout
+        self.threads = threads
+        self.ok_codes = ok_codes
+        self.timeout = timeout
+
+    def digests(self) -> dict:
+        """sha256 of the input files, computed once per stage
+
+        Returns:
+            dict: path -> digest
+        """
+        if not hasattr(self, "_digests"):
+            self._digests = {p: file_digest(p) for p in self.inputs if os.path.isfile(p)}
+        return self._digests
+
+    def fingerprint(self) -> dict:
+        """the command and the content of the inputs, a changed fingerprint forces a rerun
+
+        Returns:
+            dict: fingerprint of the stage
+        """
+        return {"argv": self.argv, "inputs": self.digests()}
+
+    def cache_key(self) -> str:
+        """content address of the outputs
+
+        input paths in the command are replaced by their digests and output paths by their position,
+        so the same model in another directory or under another name maps to the same key
+
+        Returns:
+            str: hex key
+        """
+        digests = self.digests()
+        outputs = self.outputs + ([self.stdout] if self.stdout else [])
+        argv = []
+        for a in self.argv:
+            if a in digests:
+                argv.append("@" + digests[a])
+            elif a in outputs:
+                argv.append("@out{}".format(outputs.index(a)))
+            else:
+                argv.append(a)
+        return ArtifactCache.key({"stage": self.name, "argv": argv, "inputs": sorted(digests.values()),
+                                  "stdout": outputs.index(self.stdout) if self.stdout else None})
+
+    def stamp_path(self) -> str:
+        """file that stores the fingerprint of the last successful run
+
+        Returns:
+            str: path of the stamp file
+        """
+        head, tail = os.path.split(self.outputs[0])
+        return os.path.join(head, "." + tail + ".stamp")
+
+    def last_run(self) -> dict:
+        """the stamp of the last successful run if its outputs can be reused
+
+        Returns:
+            dict: record of the last run, None if the outputs are missing or the fingerprint changed
+        """
+        if not all(os.path.exists(p) for p in self.outputs):
+            return None
+        try:
+            with open(self.stamp_path(), "r") as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(stamp, dict) or stamp.get("fingerprint") != self.fingerprint():
+            return None
+        return stamp.get("record") or {}
+
+    def is_fresh(self) -> bool:
+        """whether the outputs of the last run can be reused
+
+        Returns:
+            bool: True if all outputs exist and the fingerprint is unchanged
+        """
+        return self.last_run() is not None
+
+    def mark_fresh(self, record: dict = None) -> None:
+        """record the fingerprint after a successful run
+
+        Args:
+            record (dict, optional): measurements of the run, reported when the outputs are reused. Defaults to None.
+        """
+        with open(self.stamp_path(), "w") as f:
+            json.dump({"fingerprint": self.fingerprint(), "record": record or {}}, f)
+
+def run_process(argv: list, stdout: str = None, cwd: str = None, timeout: float = None) -> dict:
+    """run a command and measure it
+
+    Args:
+        argv (list): command
+        stdout (str, optional): file for stdout and stderr, None discards them. Defaults to None.
+        cwd (str, optional): working directory. Defaults to None.
+        timeout (float, optional): kill the process after this many seconds. Defaults to None.
+
+    Returns:
+        dict: returncode, wall(s), cpu(s), max_rss_kb and timed_out
+    """
+    out = open(stdout, "w") if stdout else subprocess.DEVNULL
+    start = time.monotonic()
+    try:
+        proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=out, stderr=subprocess.STDOUT, cwd=cwd)
+        timed_out = threading.Event()
+        timer = None
+        if timeout:
+            def kill() -> None:
+                timed_out.set()
+                proc.kill()
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+        # wait4 returns the resource usage of exactly this child, which stays correct when stages run in parallel
+        _, status, usage = os.wait4(proc.pid, 0)
+        if timer:
+            timer.cancel()
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        if stdout:
+            out.close()
+    return {"returncode": proc.returncode,
+            "wall": time.monotonic() - start,
+            "cpu": usage.ru_utime + usage.ru_stime,
+            "max_rss_kb": usage.ru_maxrss,
+            "timed_out": timed_out.is_set()}
+
+def run_stage(stage: Stage, scheduler: CoreScheduler, cache: ArtifactCache = None, cwd: str = None) -> dict:
+    """run a stage unless its outputs are fresh or cached
+
+    Args:
+        stage (Stage): the stage
+        scheduler (CoreScheduler): cores are reserved here before the process starts
+        cache (ArtifactCache, optional): artifact cache, None disables it. Defaults to None.
+        cwd (str, optional): working directory of the process. Defaults to None.
+
+    Returns:
+        dict: the stage record for the json results
+    """
+    record = {"stage": stage.name, "argv": stage.argv, "outputs": stage.outputs}
+    last = stage.last_run()
+    if last is not None:
+        record["status"] = "reused"
+        # the measurements of the run that produced the outputs
+        record["original"] = last
+        return record
+    if cache is not None:
+        key = stage.cache_key()
+        record["key"] = key
+        meta = cache.get(key, stage.outputs)
+        if meta is not None:
+            record["status"] = "cached"
+            # the measurements of the run that produced the artifacts
+            record["original"] = meta
+            stage.mark_fresh(meta)
+            return record
+    with scheduler.reserve(stage.threads) as cores:
+        record["cores"] = cores
+        record.update(run_process(stage.argv, stage.stdout, cwd, stage.timeout))
+    ok = record["returncode"] in stage.ok_codes and not record["timed_out"]
+    record["status"] = "ok" if ok else "failed"
+    if ok:
+        stage.mark_fresh(record)
+        if cache is not None:
+            cache.put(key, stage.outputs, record)
+    return record
+
+def fill(argv: list, files: dict) -> list:
+    """replace the "{...}" placeholders of a command
+
+    Args:
+        argv (list): command with placeholders
+        files (dict): placeholder values
+
+    Returns:
+        list: the command
+    """
+    return [str(a).format(**files) for a in argv]
+
+def build_stages(spec: dict, binaries: dict) -> list:
+    """turn a pipeline spec into its stages
+
+    Args:
+        spec (dict): a pipeline of the job file
+        binaries (dict): paths of bosphorus, cms and cadical
+
+    Returns:
+        list: stages in execution order
+    """
+    name = spec["name"]
+    workdir = spec.get("workdir", ".")
+    threads = int(spec.get("threads", 1))
+    solver = spec.get("solver", "cms")
+    path = lambda suffix: os.path.join(workdir, name + suffix)
+    log_suffix = {"cms": "_cms{}.log".format(threads), "cadical": "_cadical.log", "portfolio": "_portfolio.log"}[solver]
+    files = {"name": name, "threads": threads, "anf": path(".anf"), "anf_out": path("_out.anf"),
+             "cnf": path(".cnf"), "log": path(log_suffix), "solution": path("_solution")}
+    stages = []
+    if "generate" in spec:
+        argv = fill(spec["generate"], files)
+        # the script files on the command line are inputs as well
+        inputs = [a for a in argv if os.path.isfile(a)] + spec.get("inputs", [])
+        stages.append(Stage("generate", argv, inputs, [files["anf"]], stdout=files["anf"]))
+    stages.append(Stage("convert",
+                        [binaries["bosphorus"], "--anfread", files["anf"], "--anfwrite", files["anf_out"],
+                         "--cnfwrite", files["cnf"]] + spec.get("bosphorus_args", []),
+                        [files["anf"]], [files["cnf"], files["anf_out"]], stdout=path("_bosphorus.log")))
+    if solver == "cms":
+        solve = Stage("solve", [binaries["cms"], files["cnf"], "-t", str(threads)] + spec.get("solver_args", []),
+                      [files["cnf"]], [files["log"]], stdout=files["log"], threads=threads)
+    elif solver == "cadical":
+        solve = Stage("solve", [binaries["cadical"], files["cnf"]] + spec.get("solver_args", []),
+                      [files["cnf"]], [files["log"]], stdout=files["log"])
+    else:
+        # race the configs of "portfolio", the winner's log is copied to files["log"]
+        from portfolio import SolverConfig, expand_seeds
+        configs = spec.get("portfolio", ["cms:threads={}".format(threads), "cadical"])
+        seeds = int(spec.get("seeds", 1))
+        argv = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "portfolio.py"), files["cnf"],
+                "--log", files["log"], "--seeds", str(seeds), "--cms", binaries["cms"], "--cadical", binaries["cadical"]]
+        for c in configs:
+            argv += ["--solver", c]
+        if spec.get("timeout"):
+            # the race stops its solvers itself, killing the race process would leave them running
+            argv += ["--timeout", str(spec["timeout"])]
+        cores = sum(c.threads for c in expand_seeds([SolverConfig.parse(c) for c in configs], seeds))
+        solve = Stage("solve", argv, [files["cnf"], argv[1]], [files["log"]], stdout=path("_portfolio.out"), threads=cores)
+    solve.ok_codes = SOLVER_CODES
+    if solver != "portfolio":
+        solve.timeout = spec.get("timeout")
+    stages.append(solve)
+    here = os.path.dirname(os.path.abspath(__file__))
+    decoder = [os.path.abspath(__file__), os.path.join(here, "dimacs.py")]
+    stages.append(Stage("decode", [sys.executable, decoder[0], "decode", files["log"], files["solution"]],
+                        [files["log"]] + decoder, [files["solution"]]))
+    if "check" in spec:
+        stages.append(Stage("check", fill(spec["check"], files), [files["solution"]],
+                            [path("_solution_verify.log")], stdout=path("_solution_verify.log")))
+    return stages
+
+def run_pipeline(spec: dict, binaries: dict, scheduler: CoreScheduler, cache: ArtifactCache = None) -> dict:
+    """run all stages of a pipeline, stop at the first failing stage
+
+    Args:
+        spec (dict): a pipeline of the job file
+        binaries (dict): paths of bosphorus, cms and cadical
+        scheduler (CoreScheduler): the shared core scheduler
+        cache (ArtifactCache, optional): artifact cache, None disables it. Defaults to None.
+
+    Returns:
+        dict: the pipeline results, also written to NAME_pipeline.json
+    """
+    logger = get_logger("pipeline")
+    result = {"name": spec["name"], "stages": [], "status": "ok"}
+    logger.info("start pipeline {}".format(spec["name"]))
+    for stage in build_stages(spec, binaries):
+        record = run_stage(stage, scheduler, cache)
+        result["stages"].append(record)
+        logger.info("{} {}: {}".format(spec["name"], stage.name, record["status"]))
+        if record["status"] == "failed":
+            result["status"] = "failed"
+            break
+    path = os.path.join(spec.get("workdir", "."), spec["name"] + "_pipeline.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+def run_jobs(specs: list, binaries: dict, cores: int = 0, parallel: int = 0, cache: ArtifactCache = None) -> list:
+    """run many pipelines concurrently
+
+    Args:
+        specs (list): pipeline specs
+        binaries (dict): paths of bosphorus, cms and cadical
+        cores (int, optional): cores to share, 0 means all. Defaults to 0.
+        parallel (int, optional): max running pipelines, 0 means one per core. Defaults to 0.
+        cache (ArtifactCache, optional): artifact cache, None disables it. Defaults to None.
+
+    Returns:
+        list: pipeline results in the order of specs
+    """
+    scheduler = CoreScheduler(cores)
+    with ThreadPoolExecutor(max_workers=parallel or scheduler.cores) as pool:
+        return list(pool.map(lambda spec: run_pipeline(spec, binaries, scheduler, cache), specs))
+
+def decode(log: str, solution: str) -> int:
+    """convert a solver log to a bosphorus solution file
+
+    Args:
+        log (str): solver log
+        solution (str): output solution file
+
+    Returns:
+        int: 0 if the log contains a definitive answer, 1 otherwise
+    """
+    status, literals = read_solver_log(log)
+    write_solution(solution, status, literals)
+    return 0 if status != "UNKNOWN" else 1
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="pipeline")
+    arg_parser.description = "Generate, convert, solve, decode and check AlgSAT models."
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run the pipelines of a job file")
+    run_parser.add_argument("jobs", type=str, help="json job file")
+    run_parser.add_argument("--cores", type=int, default=0, help="cores to use, default all")
+    run_parser.add_argument("--parallel", type=int, default=0, help="max concurrent pipelines, default one per core")
+    run_parser.add_argument("--results", type=str, default=None, help="write all pipeline results to this json file")
+    run_parser.add_argument("--cache-dir", type=str, default=DEFAULT_ROOT, help="artifact cache directory")
+    run_parser.add_argument("--cache-size", type=float, default=DEFAULT_SIZE, help="artifact cache size limit in GB")
+    run_parser.add_argument("--no-cache", action="store_true", help="do not use the artifact cache")
+    for binary in BINARIES:
+        run_parser.add_argument("--" + binary, type=str, default=BINARIES[binary], help="path of " + binary)
+    decode_parser = sub.add_parser("decode", help="convert a solver log to a solution file")
+    decode_parser.add_argument("log", type=str)
+    decode_parser.add_argument("solution", type=str)
+    args = arg_parser.parse_args()
+
+    if args.command == "decode":
+        sys.exit(decode(args.log, args.solution))
+    with open(args.jobs, "r") as f:
+        jobs = json.load(f)
+    binaries = {b: getattr(args, b) for b in BINARIES}
+    cache = None if args.no_cache else ArtifactCache(args.cache_dir, args.cache_size)
+    results = run_jobs(jobs["pipelines"], binaries, args.cores, args.parallel, cache)
+    if args.results:
+        with open(args.results, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(0 if all(r["status"] == "ok" for r in results) else 1)
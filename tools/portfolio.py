@@ -0,0 +1,208 @@
+"""Race several SAT solvers on the same cnf and keep the first definitive answer
+
+a solver config is written as NAME[:key=value,...], NAME is cms or cadical,
+keys are threads (cms only) and seed, e.g.
+    cms:threads=20
+    cadical:seed=3
+all configs start at once, the first one that exits with SATISFIABLE(10) or UNSATISFIABLE(20) wins,
+the others are killed. The log of the winner is copied to --log and the race is recorded in --record.
+
+Example:
+    python tools/portfolio.py 4rkeccak1600.cnf --solver cms:threads=16 --solver cadical --seeds 4 --log 4rkeccak1600_portfolio.log
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+
+from common import get_logger
+from pipeline import BINARIES
+
+# exit codes of a definitive answer
+STATUS = {10: "SAT", 20: "UNSAT"}
+
+class SolverConfig:
+    """one entrant of the portfolio"""
+    def __init__(self, solver: str, threads: int = 1, seed: int = None) -> None:
+        """initial a solver config
+
+        Args:
+            solver (str): cms or cadical
+            threads (int, optional): cms threads. Defaults to 1.
+            seed (int, optional): random seed, None keeps the solver default. Defaults to None.
+        """
+        if solver not in ("cms", "cadical"):
+            raise ValueError("unknown solver {}, use cms or cadical".format(solver))
+        self.solver = solver
+        self.threads = threads if solver == "cms" else 1
+        self.seed = seed
+
+    @classmethod
+    def parse(cls, text: str) -> "SolverConfig":
+        """parse NAME[:key=value,...]
+
+        Args:
+            text (str): config text
+
+        Returns:
+            SolverConfig: the config
+        """
+        name, _, options = text.partition(":")
+        kwargs = {}
+        for item in filter(None, options.split(",")):
+            key, _, value = item.partition("=")
+            if key not in ("threads", "seed"):
+                raise ValueError("unknown solver option {} in {}".format(key, text))
+            kwargs[key] = int(value)
+        return cls(name, **kwargs)
+
+    @property
+    def label(self) -> str:
+        """a readable name, also used in log file names
+
+        Returns:
+            str: label of the config
+        """
+        label = self.solver
+        if self.solver == "cms":
+            label += "_t{}".format(self.threads)
+        if self.seed is not None:
+            label += "_s{}".format(self.seed)
+        return label
+
+    def argv(self, cnf: str, binaries: dict) -> list:
+        """the command line of this config
+
+        Args:
+            cnf (str): cnf file
+            binaries (dict): paths of the solvers
+
+        Returns:
+            list: command
+        """
+        if self.solver == "cms":
+            argv = [binaries["cms"], cnf, "-t", str(self.threads)]
+            if self.seed is not None:
+                argv += ["--random", str(self.seed)]
+        else:
+            argv = [binaries["cadical"], cnf]
+            if self.seed is not None:
+                argv += ["--seed={}".format(self.seed)]
+        return argv
+
+def expand_seeds(configs: list, seeds: int) -> list:
+    """copy every config without a seed of its own once per seed
+
+    Args:
+        configs (list): SolverConfig list
+        seeds (int): number of seeds, 0 or 1 keeps the configs as they are
+
+    Returns:
+        list: configs, a config with a seed(cadical:seed=3) is kept as it is
+    """
+    if seeds <= 1:
+        return configs
+    return [SolverConfig(c.solver, c.threads, s) for c in configs
+            for s in ([c.seed] if c.seed is not None else range(seeds))]
+
+def kill(proc: subprocess.Popen) -> None:
+    """kill a solver and everything it started
+
+    Args:
+        proc (subprocess.Popen): the solver process
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def race(cnf: str, configs: list, binaries: dict, logdir: str, timeout: float = None, poll: float = 0.05) -> dict:
+    """run all configs on cnf, return when the first one gives a definitive answer
+
+    Args:
+        cnf (str): cnf file
+        configs (list): SolverConfig list
+        binaries (dict): paths of the solvers
+        logdir (str): directory of the per-config logs
+        timeout (float, optional): give up after this many seconds. Defaults to None.
+        poll (float, optional): polling interval in seconds. Defaults to 0.05.
+
+    Returns:
+        dict: the race record, "winner" is None if no config answered
+    """
+    base = os.path.splitext(os.path.basename(cnf))[0]
+    running = {}
+    entrants = []
+    start = time.monotonic()
+    for c in configs:
+        log = os.path.join(logdir, "{}_{}.log".format(base, c.label))
+        with open(log, "w") as out:
+            # a new session per solver so the whole process group can be killed
+            proc = subprocess.Popen(c.argv(cnf, binaries), stdin=subprocess.DEVNULL, stdout=out,
+                                    stderr=subprocess.STDOUT, start_new_session=True)
+        entry = {"config": c.label, "argv": proc.args, "log": log, "status": "running"}
+        entrants.append(entry)
+        running[proc.pid] = (proc, entry)
+    winner = None
+    try:
+        while running and winner is None:
+            for pid, (proc, entry) in list(running.items()):
+                done, status, usage = os.wait4(pid, os.WNOHANG)
+                if done == 0:
+                    continue
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                del running[pid]
+                entry.update({"returncode": proc.returncode, "wall": time.monotonic() - start,
+                              "cpu": usage.ru_utime + usage.ru_stime, "max_rss_kb": usage.ru_maxrss,
+                              "status": STATUS.get(proc.returncode, "failed")})
+                if proc.returncode in STATUS:
+                    winner = entry
+                    break
+            if winner is None and running:
+                if timeout is not None and time.monotonic() - start > timeout:
+                    break
+                time.sleep(poll)
+    finally:
+        # stop the losers, reap them so no zombie is left behind
+        for proc, entry in running.values():
+            kill(proc)
+            proc.wait()
+            entry["status"] = "killed"
+    return {"cnf": cnf, "wall": time.monotonic() - start,
+            "winner": winner["config"] if winner else None,
+            "status": winner["status"] if winner else "UNKNOWN",
+            "entrants": entrants}
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="portfolio")
+    arg_parser.description = "Race CryptoMiniSat and CaDiCaL configurations on a cnf."
+    arg_parser.add_argument("cnf", type=str, help="cnf file")
+    arg_parser.add_argument("-s", "--solver", action="append", default=None,
+                            help="solver config NAME[:threads=T,seed=S], repeatable, default cms and cadical")
+    arg_parser.add_argument("--seeds", type=int, default=1, help="run every config without a seed with this many seeds")
+    arg_parser.add_argument("--log", type=str, default=None, help="copy the winner's log to this file")
+    arg_parser.add_argument("--record", type=str, default=None,
+                            help="json file of the race, default CNF_portfolio.json")
+    arg_parser.add_argument("--timeout", type=float, default=None, help="wall time limit in seconds")
+    for binary in ("cms", "cadical"):
+        arg_parser.add_argument("--" + binary, type=str, default=BINARIES[binary], help="path of " + binary)
+    args = arg_parser.parse_args()
+
+    logger = get_logger("portfolio")
+    configs = expand_seeds([SolverConfig.parse(s) for s in (args.solver or ["cms", "cadical"])], args.seeds)
+    logdir = os.path.dirname(os.path.abspath(args.cnf))
+    logger.info("racing {} on {}".format(", ".join(c.label for c in configs), args.cnf))
+    record = race(args.cnf, configs, {"cms": args.cms, "cadical": args.cadical}, logdir, args.timeout)
+    logger.info("winner: {} ({}) after {:.2f}s".format(record["winner"], record["status"], record["wall"]))
+    with open(args.record or os.path.splitext(args.cnf)[0] + "_portfolio.json", "w") as f:
+        json.dump(record, f, indent=2)
+    if record["winner"] is None:
+        sys.exit(1)
+    if args.log:
+        winner_log = next(e["log"] for e in record["entrants"] if e["config"] == record["winner"])
+        shutil.copyfile(winner_log, args.log)
+    sys.exit(10 if record["status"] == "SAT" else 20)
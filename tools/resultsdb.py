@@ -0,0 +1,210 @@
+"""Load solver logs into a SQLite database and query them
+
+every log of the result trees that solverlog.py recognizes becomes one row of the table runs:
+    path         log file, relative to the loaded root
+    cipher       first directory of the path, e.g. gimli
+    experiment   directory of the log, e.g. gimli/result/6r
+    model        file name without the solver suffix, e.g. 6rgimli for 6rgimli_cms20.log
+    solver       cms, cadical or bosphorus
+    threads      from the _cms20/_t20 suffix, NULL if the name does not say
+    status, vars, clauses, time, conflicts, decisions, propagations   see solverlog.py
+a log is parsed again only when its size or modification time changed.
+
+Example:
+    python tools/resultsdb.py load . --db results.db
+    python tools/resultsdb.py show --db results.db --cipher gimli
+    python tools/resultsdb.py compare --db results.db --metric time
+    python tools/resultsdb.py sql --db results.db "SELECT model, max(time) FROM runs GROUP BY model"
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+from common import get_logger
+from solverlog import read_log
+
+COLUMNS = ["path", "cipher", "experiment", "model", "solver", "threads", "status",
+           "vars", "clauses", "time", "conflicts", "decisions", "propagations", "size", "mtime"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    path TEXT PRIMARY KEY,
+    cipher TEXT,
+    experiment TEXT,
+    model TEXT,
+    solver TEXT,
+    threads INTEGER,
+    status TEXT,
+    vars INTEGER,
+    clauses INTEGER,
+    time REAL,
+    conflicts INTEGER,
+    decisions INTEGER,
+    propagations INTEGER,
+    size INTEGER,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS runs_model ON runs (experiment, model);
+"""
+
+# 6rgimli_cms20, 4rkeccak800_cadical, 6rhash5_t20, 3rite_cms
+SUFFIX = re.compile(r"^(?P<model>.+?)_(?:cms(?P<cms>\d*)|cadical|t(?P<t>\d+))$")
+
+def connect(path: str) -> sqlite3.Connection:
+    """open a database and create the table if needed
+
+    Args:
+        path (str): database file
+
+    Returns:
+        sqlite3.Connection: connection, rows are sqlite3.Row
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def describe(relpath: str) -> dict:
+    """cipher, experiment, model and threads encoded in the path of a log
+
+    Args:
+        relpath (str): log path relative to the root
+
+    Returns:
+        dict: path columns of the row
+    """
+    parts = relpath.split(os.sep)
+    name = os.path.splitext(parts[-1])[0]
+    model, threads = name, None
+    match = SUFFIX.match(name)
+    if match:
+        model = match.group("model")
+        threads = match.group("cms") or match.group("t")
+        threads = int(threads) if threads else None
+    return {"path": relpath, "cipher": parts[0] if len(parts) > 1 else "",
+            "experiment": os.path.dirname(relpath), "model": model, "threads": threads}
+
+def load(conn: sqlite3.Connection, root: str) -> tuple:
+    """parse the logs below root into the database
+
+    Args:
+        conn (sqlite3.Connection): database
+        root (str): directory to scan
+
+    Returns:
+        tuple: (parsed logs, unchanged logs)
+    """
+    known = {row["path"]: (row["size"], row["mtime"]) for row in conn.execute("SELECT path, size, mtime FROM runs")}
+    parsed = unchanged = 0
+    insert = "INSERT OR REPLACE INTO runs ({}) VALUES ({})".format(", ".join(COLUMNS), ", ".join("?" * len(COLUMNS)))
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.endswith(".log"):
+                continue
+            path = os.path.join(dirpath, filename)
+            relpath = os.path.relpath(path, root)
+            st = os.stat(path)
+            if known.get(relpath) == (st.st_size, st.st_mtime):
+                unchanged += 1
+                continue
+            stats = read_log(path)
+            if stats["solver"] is None:
+                # verification output and other logs
+                continue
+            row = describe(relpath)
+            row.update(stats)
+            row.update({"size": st.st_size, "mtime": st.st_mtime})
+            conn.execute(insert, [row[c] for c in COLUMNS])
+            parsed += 1
+    conn.commit()
+    return parsed, unchanged
+
+def runs(conn: sqlite3.Connection, **filters) -> list:
+    """rows of the runs table, filtered by column values
+
+    Args:
+        conn (sqlite3.Connection): database
+        filters: column=value pairs, None values are ignored
+
+    Returns:
+        list: rows as dicts, ordered by experiment, model and solver
+    """
+    filters = {k: v for k, v in filters.items() if v is not None}
+    for key in filters:
+        if key not in COLUMNS:
+            raise ValueError("unknown column {}".format(key))
+    where = " AND ".join("{} = ?".format(k) for k in filters)
+    sql = "SELECT * FROM runs" + (" WHERE " + where if where else "") + " ORDER BY experiment, model, solver, threads"
+    return [dict(row) for row in conn.execute(sql, list(filters.values()))]
+
+def compare(conn: sqlite3.Connection, metric: str = "time") -> tuple:
+    """one row per model with the metric of every solver side by side
+
+    Args:
+        conn (sqlite3.Connection): database
+        metric (str, optional): column to compare. Defaults to "time".
+
+    Returns:
+        tuple: (solver labels, rows), a row is (experiment, model, {label: value})
+    """
+    if metric not in COLUMNS:
+        raise ValueError("unknown column {}".format(metric))
+    table = {}
+    labels = set()
+    for row in runs(conn):
+        label = row["solver"] + (str(row["threads"]) if row["threads"] else "")
+        labels.add(label)
+        table.setdefault((row["experiment"], row["model"]), {})[label] = row[metric]
+    return sorted(labels), [(e, m, values) for (e, m), values in sorted(table.items())]
+
+def format_table(header: list, rows: list) -> str:
+    """align rows into columns
+
+    Args:
+        header (list): column titles
+        rows (list): rows of values, None is shown as "-"
+
+    Returns:
+        str: the table
+    """
+    cells = [header] + [["-" if v is None else str(v) for v in row] for row in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(r, widths)) for r in cells)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="resultsdb")
+    arg_parser.description = "Collect solver logs into a SQLite database and compare runs."
+    arg_parser.add_argument("--db", type=str, default="results.db", help="database file")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    load_parser = sub.add_parser("load", help="parse the logs below the given directories")
+    load_parser.add_argument("root", type=str, nargs="+", help="directories to scan, e.g. the repository")
+    show_parser = sub.add_parser("show", help="list runs")
+    for column in ("cipher", "experiment", "model", "solver", "status"):
+        show_parser.add_argument("--" + column, type=str, default=None)
+    compare_parser = sub.add_parser("compare", help="compare the solvers of every model")
+    compare_parser.add_argument("--metric", type=str, default="time", choices=COLUMNS[7:13])
+    sql_parser = sub.add_parser("sql", help="run a query")
+    sql_parser.add_argument("query", type=str)
+    args = arg_parser.parse_args()
+
+    logger = get_logger("resultsdb")
+    conn = connect(args.db)
+    if args.command == "load":
+        for root in args.root:
+            parsed, unchanged = load(conn, root)
+            logger.info("{}: {} logs parsed, {} unchanged".format(root, parsed, unchanged))
+    elif args.command == "show":
+        columns = ["experiment", "model", "solver", "threads", "status", "vars", "clauses", "time", "conflicts"]
+        rows = runs(conn, cipher=args.cipher, experiment=args.experiment, model=args.model,
+                    solver=args.solver, status=args.status)
+        print(format_table(columns, [[r[c] for c in columns] for r in rows]))
+    elif args.command == "compare":
+        labels, rows = compare(conn, args.metric)
+        print(format_table(["experiment", "model"] + labels, [[e, m] + [v.get(l) for l in labels] for e, m, v in rows]))
+    else:
+        cursor = conn.execute(args.query)
+        header = [d[0] for d in cursor.description or []]
+        print(format_table(header, [list(row) for row in cursor]))
+    conn.close()
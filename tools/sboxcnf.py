@@ -0,0 +1,405 @@
+"""Derive a small CNF of an S-box from its table
+
+an S-box with n input and m output bits is given by its table, table[x] is the output of x.
+variable i + 1 of the CNF is input bit i, variable n + j + 1 is output bit j,
+bit i of x is input bit i(for ascon y_i of SingleSbox, for keccak x_i of a row).
+
+the relation of the S-box is the set of valid (input, output) points:
+    value relation:        {(x, S(x))}, used by the direct models(cnf_chi of chicnf.py)
+    differential relation: {(dx, dy) : DDT[dx][dy] > 0}, used by trail search(--ddt)
+    weighted differential relation: {(dx, dy, u)}, u are weight bits after the output(--weight),
+        u0 = (dx != 0) and u_k = (weight >= level k) over the distinct weights of the S-box,
+        the weight of a transition is the sum of the bits times their coefficients(weight_levels)
+every invalid point must be removed by a clause and no clause may remove a valid point,
+so a clause is the negation of a cube of invalid points. The cubes are the prime implicants of the
+invalid points(Quine-McCluskey, up to QM_LIMIT variables) or cubes grown from single points
+(an Espresso-style expansion, for larger S-boxes), a greedy set cover picks the clauses
+and a last pass drops clauses that became redundant.
+
+results are cached per S-box in $ALGSAT_CACHE/sboxcnf.
+
+Example:
+    python tools/sboxcnf.py ascon
+    python tools/sboxcnf.py keccak_chi --ddt
+    python tools/sboxcnf.py ascon --weight
+    python tools/sboxcnf.py --table 0,1,3,2 -n 2 -m 2
+"""
+import argparse
+import json
+import math
+import os
+import random
+
+from cache import ArtifactCache, DEFAULT_ROOT
+from common import get_logger
+
+# largest relation(n + m variables) minimized with Quine-McCluskey
+QM_LIMIT = 12
+# bumped when the minimization changes, so stale cache files are not used
+VERSION = 1
+CACHE_DIR = os.path.join(DEFAULT_ROOT, "sboxcnf")
+
+def keccak_chi_table() -> list:
+    """chi of a keccak row: b[x] = a[x] + (a[x+1] + 1) * a[x+2]
+
+    Returns:
+        list: 32 entries
+    """
+    table = []
+    for v in range(32):
+        a = [(v >> i) & 1 for i in range(5)]
+        b = [a[x] ^ ((a[(x + 1) % 5] ^ 1) & a[(x + 2) % 5]) for x in range(5)]
+        table.append(sum(b[i] << i for i in range(5)))
+    return table
+
+def ascon_table() -> list:
+    """SingleSbox of the ascon scripts
+
+    Returns:
+        list: 32 entries
+    """
+    table = []
+    for v in range(32):
+        y0, y1, y2, y3, y4 = [(v >> i) & 1 for i in range(5)]
+        x0 = y4 & y1 ^ y3 ^ y2 & y1 ^ y2 ^ y1 & y0 ^ y1 ^ y0
+        x1 = y4 ^ y3 & y2 ^ y3 & y1 ^ y3 ^ y2 & y1 ^ y2 ^ y1 ^ y0
+        x2 = y4 & y3 ^ y4 ^ y2 ^ y1 ^ 1
+        x3 = y4 & y0 ^ y4 ^ y3 & y0 ^ y3 ^ y2 ^ y1 ^ y0
+        x4 = y4 & y1 ^ y4 ^ y3 ^ y1 & y0 ^ y1
+        table.append(x0 | x1 << 1 | x2 << 2 | x3 << 3 | x4 << 4)
+    return table
+
+def gimli_table(word: str) -> list:
+    """one output bit of the gimli SP-box, x, y are the rotated words x <<< 24, y <<< 9
+
+    inputs are the bits the output bit j depends on:
+        x: (z[j], y[j], x[j-3], y[j-3]) -> z + y + (x & y << 3)
+        y: (y[j], x[j], x[j-1], z[j-1]) -> y + x + ((x | z) << 1)
+        z: (x[j], z[j-1], y[j-2], z[j-2]) -> x + (z << 1) + ((y & z) << 2)
+    for j below the shift the shifted terms are 0 and the bit is a plain xor.
+
+    Args:
+        word (str): x, y or z, the output word
+
+    Returns:
+        list: 16 entries
+    """
+    table = []
+    for v in range(16):
+        b0, b1, b2, b3 = [(v >> i) & 1 for i in range(4)]
+        if word == "x":
+            table.append(b0 ^ b1 ^ (b2 & b3))
+        elif word == "y":
+            table.append(b0 ^ b1 ^ (b2 | b3))
+        else:
+            table.append(b0 ^ b1 ^ (b2 & b3))
+    return table
+
+# name -> (table, input bits, output bits)
+SBOXES = {
+    "keccak_chi": (keccak_chi_table(), 5, 5),
+    "ascon": (ascon_table(), 5, 5),
+    "gimli_x": (gimli_table("x"), 4, 1),
+    "gimli_y": (gimli_table("y"), 4, 1),
+    "gimli_z": (gimli_table("z"), 4, 1),
+}
+
+def ddt_weights(table: list, n: int) -> dict:
+    """weights -log2(DDT[dx][dy] / 2^n) of the possible transitions
+
+    Args:
+        table (list): S-box table
+        n (int): input bits
+
+    Returns:
+        dict: (dx, dy) -> weight
+    """
+    counts = {}
+    for dx in range(1 << n):
+        for x in range(1 << n):
+            key = (dx, table[x] ^ table[x ^ dx])
+            counts[key] = counts.get(key, 0) + 1
+    return {key: n - math.log2(c) for key, c in counts.items()}
+
+def weight_levels(table: list, n: int) -> tuple:
+    """the distinct weights of the active transitions and the coefficients of the weight bits
+
+    Args:
+        table (list): S-box table
+        n (int): input bits
+
+    Returns:
+        tuple: (levels, coefficients), the weight is sum(coefficient * bit)
+
+    Raises:
+        ValueError: a weight is not an integer(a DDT entry is not a power of 2)
+    """
+    weights = ddt_weights(table, n)
+    levels = sorted({w for (dx, _), w in weights.items() if dx})
+    if any(w != int(w) for w in levels):
+        raise ValueError("the weights {} are not integers".format(levels))
+    levels = [int(w) for w in levels]
+    return levels, [levels[0]] + [levels[k] - levels[k - 1] for k in range(1, len(levels))]
+
+def valid_points(table: list, n: int, m: int, ddt: bool = False, weight: bool = False) -> list:
+    """the points of the relation, input in the low n bits and output in the next m bits
+
+    Args:
+        table (list): S-box table
+        n (int): input bits
+        m (int): output bits
+        ddt (bool, optional): differential instead of value relation. Defaults to False.
+        weight (bool, optional): differential relation with the weight bits above the output. Defaults to False.
+
+    Returns:
+        list: sorted points
+    """
+    if weight:
+        levels, _ = weight_levels(table, n)
+        points = []
+        for (dx, dy), w in ddt_weights(table, n).items():
+            u = sum(1 << k for k, level in enumerate(levels) if dx and w >= level)
+            points.append(dx | (dy << n) | (u << (n + m)))
+        return sorted(points)
+    if not ddt:
+        return sorted(x | (table[x] << n) for x in range(1 << n))
+    return sorted(dx | (dy << n) for dx, dy in ddt_weights(table, n))
+
+def prime_implicants(onset: list, nbits: int) -> list:
+    """Quine-McCluskey prime implicants of a function without don't cares
+
+    a cube is (value, mask), mask has a 1 for every fixed bit and value gives the fixed bits
+
+    Args:
+        onset (list): minterms of the function
+        nbits (int): number of variables
+
+    Returns:
+        list: prime cubes
+    """
+    full = (1 << nbits) - 1
+    current = {(v, full) for v in onset}
+    primes = set()
+    while current:
+        merged = set()
+        used = set()
+        # cubes can only merge with cubes fixing the same bits, group them by mask
+        groups = {}
+        for value, mask in current:
+            groups.setdefault(mask, set()).add(value)
+        for mask, values in groups.items():
+            for value in values:
+                for bit in range(nbits):
+                    b = 1 << bit
+                    if mask & b and not value & b and value | b in values:
+                        merged.add((value, mask & ~b))
+                        used.add((value, mask))
+                        used.add((value | b, mask))
+        primes |= current - used
+        current = merged
+    return sorted(primes)
+
+def expand_cubes(offset: list, onset: list, nbits: int, rng: random.Random, tries: int = 2) -> list:
+    """grow every minterm of onset into a maximal cube that avoids offset
+
+    Args:
+        offset (list): points the cubes must not contain
+        onset (list): minterms to expand
+        nbits (int): number of variables
+        rng (random.Random): random order of the bits after the first try
+        tries (int, optional): expansions per minterm. Defaults to 2.
+
+    Returns:
+        list: cubes
+    """
+    cubes = set()
+    # every minterm is expanded, also those inside found cubes: more candidates give a smaller cover
+    for point in onset:
+        for t in range(tries):
+            order = list(range(nbits))
+            if t:
+                rng.shuffle(order)
+            mask = (1 << nbits) - 1
+            for bit in order:
+                candidate = mask & ~(1 << bit)
+                # a bit is freed when the cube still misses every point of offset
+                if all((v & candidate) != (point & candidate) for v in offset):
+                    mask = candidate
+            cubes.add((point & mask, mask))
+    return sorted(cubes)
+
+def cube_points(cube: tuple, nbits: int) -> int:
+    """the points of a cube as a bitset over all 2^nbits points
+
+    Args:
+        cube (tuple): (value, mask)
+        nbits (int): number of variables
+
+    Returns:
+        int: bitset, bit p is set when point p is in the cube
+    """
+    value, mask = cube
+    free = [b for b in range(nbits) if not mask >> b & 1]
+    points = 0
+    for k in range(1 << len(free)):
+        p = value
+        for i, b in enumerate(free):
+            if k >> i & 1:
+                p |= 1 << b
+        points |= 1 << p
+    return points
+
+def greedy_cover(cubes: list, onset: list, nbits: int) -> list:
+    """pick cubes until all of onset is covered, largest gain first, then drop redundant cubes
+
+    Args:
+        cubes (list): candidate cubes
+        onset (list): minterms to cover
+        nbits (int): number of variables
+
+    Returns:
+        list: chosen cubes
+    """
+    target = 0
+    for p in onset:
+        target |= 1 << p
+    sets = [(cube, cube_points(cube, nbits) & target) for cube in cubes]
+    chosen = []
+    left = target
+    while left:
+        # ties go to the bigger cube, i.e. the shorter clause
+        cube, points = max(sets, key=lambda s: (bin(s[1] & left).count("1"), -bin(s[0][1]).count("1")))
+        if not points & left:
+            raise ValueError("the cubes do not cover the onset")
+        chosen.append((cube, points))
+        left &= ~points
+    # a cube chosen early can be covered by later ones
+    for i in range(len(chosen) - 1, -1, -1):
+        others = 0
+        for j, (_, points) in enumerate(chosen):
+            if j != i:
+                others |= points
+        if chosen[i][1] & ~others == 0:
+            chosen.pop(i)
+    return [cube for cube, _ in chosen]
+
+def cube_clause(cube: tuple, nbits: int) -> list:
+    """the clause that removes the points of a cube
+
+    Args:
+        cube (tuple): (value, mask)
+        nbits (int): number of variables
+
+    Returns:
+        list: literals over variables 1..nbits
+    """
+    value, mask = cube
+    return [-(b + 1) if value >> b & 1 else b + 1 for b in range(nbits) if mask >> b & 1]
+
+def minimize(valid: list, nbits: int, seed: int = 0) -> list:
+    """a small CNF whose solutions are exactly the valid points
+
+    Args:
+        valid (list): points of the relation
+        nbits (int): number of variables
+        seed (int, optional): random seed of the expansion. Defaults to 0.
+
+    Returns:
+        list: clauses, sorted by length
+    """
+    valid_set = set(valid)
+    invalid = [p for p in range(1 << nbits) if p not in valid_set]
+    if nbits <= QM_LIMIT:
+        cubes = prime_implicants(invalid, nbits)
+    else:
+        cubes = expand_cubes(valid, invalid, nbits, random.Random(seed))
+    clauses = [cube_clause(c, nbits) for c in greedy_cover(cubes, invalid, nbits)]
+    return sorted(clauses, key=lambda c: (len(c), [abs(l) for l in c]))
+
+def sbox_cnf(table: list, n: int, m: int, ddt: bool = False, cache_dir: str = CACHE_DIR, weight: bool = False) -> list:
+    """the CNF of an S-box, read from the cache when it was derived before
+
+    Args:
+        table (list): S-box table
+        n (int): input bits
+        m (int): output bits
+        ddt (bool, optional): differential instead of value relation. Defaults to False.
+        cache_dir (str, optional): cache directory, None disables the cache. Defaults to CACHE_DIR.
+        weight (bool, optional): weighted differential relation. Defaults to False.
+
+    Returns:
+        list: clauses over variables 1..n+m, and the weight bits after them with weight
+    """
+    description = {"table": list(table), "n": n, "m": m, "ddt": ddt, "version": VERSION}
+    if weight:
+        description["weight"] = True
+    key = ArtifactCache.key(description)
+    path = os.path.join(cache_dir, key + ".json") if cache_dir else None
+    if path and os.path.isfile(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    nbits = n + m + (len(weight_levels(table, n)[0]) if weight else 0)
+    clauses = minimize(valid_points(table, n, m, ddt, weight), nbits)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + ".tmp{}".format(os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(clauses, f)
+        os.replace(tmp, path)
+    return clauses
+
+def check(clauses: list, valid: list, nbits: int) -> bool:
+    """whether the solutions of the clauses are exactly the valid points
+
+    Args:
+        clauses (list): clauses over variables 1..nbits
+        valid (list): points of the relation
+        nbits (int): number of variables
+
+    Returns:
+        bool: True if the CNF is exact
+    """
+    solutions = []
+    for p in range(1 << nbits):
+        if all(any((p >> (abs(l) - 1) & 1) == (l > 0) for l in c) for c in clauses):
+            solutions.append(p)
+    return solutions == sorted(valid)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="sboxcnf")
+    arg_parser.description = "Print a small CNF of an S-box, variables 1..n are the inputs, n+1..n+m the outputs."
+    arg_parser.add_argument("sbox", type=str, nargs="?", choices=sorted(SBOXES), help="built-in S-box")
+    arg_parser.add_argument("--table", type=str, default=None, help="comma separated table, e.g. 0x4,0xb,...")
+    arg_parser.add_argument("-n", type=int, default=None, help="input bits of --table")
+    arg_parser.add_argument("-m", type=int, default=None, help="output bits of --table")
+    arg_parser.add_argument("--ddt", action="store_true", help="differential relation instead of value relation")
+    arg_parser.add_argument("--weight", action="store_true", help="differential relation with weight bits")
+    arg_parser.add_argument("--no-cache", action="store_true", help="derive again")
+    arg_parser.add_argument("--python", action="store_true", help="print a python list like cnf_chi")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("sboxcnf")
+    if args.table:
+        table = [int(t, 0) for t in args.table.split(",")]
+        n = args.n or (len(table) - 1).bit_length()
+        m = args.m or max(max(table).bit_length(), 1)
+    elif args.sbox:
+        table, n, m = SBOXES[args.sbox]
+    else:
+        arg_parser.error("give a built-in S-box or --table")
+    if len(table) != 1 << n:
+        arg_parser.error("the table needs 2^{} entries".format(n))
+    clauses = sbox_cnf(table, n, m, args.ddt, None if args.no_cache else CACHE_DIR, args.weight)
+    valid = valid_points(table, n, m, args.ddt, args.weight)
+    nbits = n + m
+    if args.weight:
+        levels, coefficients = weight_levels(table, n)
+        nbits += len(levels)
+        logger.info("weights {}, variables {}.. have coefficients {}".format(levels, n + m + 1, coefficients))
+    logger.info("{} clauses, {} valid points, exact: {}".format(len(clauses), len(valid), check(clauses, valid, nbits)))
+    if args.python:
+        print("[\n" + ",\n".join("    " + str(c) for c in clauses) + "\n]")
+    else:
+        print("p cnf {} {}".format(nbits, len(clauses)))
+        for c in clauses:
+            print(" ".join(map(str, c)) + " 0")
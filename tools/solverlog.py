@@ -0,0 +1,128 @@
+"""Read the statistics of CryptoMiniSat, CaDiCaL and Bosphorus logs
+
+the logs are read line by line, so a log of any size is parsed in constant memory.
+
+the statistics of each solver:
+    cms:       "c -- header says num vars/clauses", "c conflicts : 80611 (...)", "c Total time (this thread) : 9.74"
+    cadical:   "c found 'p cnf 5025 39908' header", "c conflicts: 2110323 ...",
+               "c total process time since initialization: 733.12 seconds"
+    bosphorus: "c Num total vars: 2880", "c Num equations: 3072", "s ANF-SATISFIABLE", "solve exec time is: 66.7s"
+for bosphorus vars and clauses are the variables and equations of the input anf.
+"""
+from dimacs import SAT, UNKNOWN, UNSAT
+
+# statistics lines of the form "c key : value" read for every solver
+COUNTERS = ("conflicts", "decisions", "propagations")
+
+def parse_count(text: str) -> int:
+    """parse a counter such as 80611, 9128K or 3M
+
+    Args:
+        text (str): counter text
+
+    Returns:
+        int: the value
+    """
+    scale = {"K": 10**3, "M": 10**6, "G": 10**9}
+    if text[-1] in scale:
+        return int(float(text[:-1]) * scale[text[-1]])
+    return int(float(text))
+
+def stat_value(line: str) -> str:
+    """the first field after ":" of a statistics line, e.g. "c conflicts : 80611 (9868.54 / sec)"
+
+    Args:
+        line (str): log line
+
+    Returns:
+        str: the value text
+    """
+    return line.split(":", 1)[1].split()[0]
+
+def stat_key(line: str) -> str:
+    """the key before ":" of a statistics line, e.g. "conflicts" for "c conflicts : 80611"
+
+    Args:
+        line (str): log line
+
+    Returns:
+        str: the key, "" if the line has no ":"
+    """
+    key, sep, _ = line[2:].partition(":")
+    return key.strip() if sep else ""
+
+def parse_log(lines) -> dict:
+    """statistics of a solver log
+
+    Args:
+        lines (iterable): lines of the log
+
+    Returns:
+        dict: solver, status, vars, clauses, time(s), conflicts, decisions and propagations,
+            None for values that are not in the log
+    """
+    stats = {"solver": None, "status": UNKNOWN, "vars": None, "clauses": None, "time": None}
+    stats.update({key: None for key in COUNTERS})
+    for line in lines:
+        if line.startswith("solve exec time is:"):
+            # written by the bosphorus runs after the solver exits
+            stats["time"] = float(stat_value(line).rstrip("s"))
+            continue
+        if not line.startswith(("c", "s")):
+            continue
+        if line.startswith("s "):
+            word = line.split()[1]
+            stats["status"] = SAT if word in ("SATISFIABLE", "ANF-SATISFIABLE") else \
+                UNSAT if word in ("UNSATISFIABLE", "ANF-UNSATISFIABLE") else UNKNOWN
+            continue
+        if stats["solver"] is None:
+            if "CryptoMiniSat version" in line:
+                stats["solver"] = "cms"
+            elif "CaDiCaL" in line:
+                stats["solver"] = "cadical"
+            elif "Bosphorus" in line:
+                stats["solver"] = "bosphorus"
+            continue
+        key = stat_key(line)
+        if stats["solver"] == "cms":
+            if line.startswith("c -- header says num vars"):
+                stats["vars"] = int(stat_value(line))
+            elif line.startswith("c -- header says num clauses"):
+                stats["clauses"] = int(stat_value(line))
+            elif line.startswith("c Total time (this thread)"):
+                stats["time"] = float(stat_value(line))
+            elif key in COUNTERS and stats[key] is None:
+                # the final search stats come first, later per-thread blocks repeat the keys
+                stats[key] = parse_count(stat_value(line))
+        elif stats["solver"] == "cadical":
+            if line.startswith("c found 'p cnf"):
+                fields = line.split()
+                stats["vars"], stats["clauses"] = int(fields[4]), int(fields[5].rstrip("'"))
+            elif line.startswith("c total process time since initialization"):
+                stats["time"] = float(stat_value(line))
+            elif key in COUNTERS:
+                stats[key] = parse_count(stat_value(line))
+        elif stats["solver"] == "bosphorus":
+            # the first "ANF stats" block describes the input, later blocks the simplified system
+            if key == "Num total vars" and stats["vars"] is None:
+                stats["vars"] = int(stat_value(line))
+            elif key == "Num equations" and stats["clauses"] is None:
+                stats["clauses"] = int(stat_value(line))
+    if stats["solver"] == "cadical" and stats["status"] != UNKNOWN:
+        # cadical does not print counters that stayed zero, e.g. after a "lucky" solve
+        for key in COUNTERS:
+            if stats[key] is None:
+                stats[key] = 0
+    return stats
+
+def read_log(path: str) -> dict:
+    """statistics of a solver log file
+
+    Args:
+        path (str): log file
+
+    Returns:
+        dict: see parse_log
+    """
+    with open(path, "r", errors="replace") as f:
+        return parse_log(f)
@@ -0,0 +1,151 @@
+"""Split a direct model into a trail-independent core and a per-trail delta
+
+the core is the direct model(ascon_direct.py, gimli_direct.py) with every difference bit as a variable,
+it depends only on (cipher, rounds, final matrix, xor mode) and is built once, then kept
+    - in CORE_DIR as NAME_core.cnf + NAME_core.json(variables of the differences and of the input pair)
+    - in the artifact cache(cache.py), keyed by the parameters and the digests of the model sources,
+the delta of a trail is one unit clause per known difference bit, and the cnf handed to the solver
+is the core followed by the delta with a corrected header.
+
+only the direct models can be split: bosphorus simplifies the ANF of the indirect models(Keccak/code,
+ascon/code, gimli/code) as a whole, the trail constants take part in its propagation and ElimLin,
+so there is no trail-independent part of its cnf to keep.
+
+Example:
+    python tools/splitmodel.py ascon -r 3 --trail 3rfinal.trail -o 3rfinal.cnf --core-dir cores
+"""
+import argparse
+import json
+import os
+import time
+
+from cache import ArtifactCache, DEFAULT_ROOT, DEFAULT_SIZE
+from common import file_digest, get_logger
+from incremental import CIPHERS, build, trail_assumptions
+from trail import read_trail
+
+# sources of the core, editing one of them builds a new core
+SOURCES = ["ascon_direct.py", "gimli_direct.py", "cnfbuilder.py", "sboxcnf.py", "incremental.py"]
+
+def core_key(cipher: str, rounds: int, final_matrix: bool, xor: str) -> str:
+    """cache key of a core
+
+    Args:
+        cipher (str): ascon or gimli
+        rounds (int): number of rounds
+        final_matrix (bool): ascon trails end after the last Matrix
+        xor (str): xor mode of the builder
+
+    Returns:
+        str: hex key
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources = {name: file_digest(os.path.join(here, name)) for name in SOURCES}
+    return ArtifactCache.key({"core": cipher, "rounds": rounds, "final_matrix": final_matrix, "xor": xor,
+                              "sources": sources})
+
+def core_files(core_dir: str, cipher: str, rounds: int, final_matrix: bool, xor: str) -> tuple:
+    """paths of a core in core_dir
+
+    Args:
+        core_dir (str): directory of the core files
+        cipher (str): ascon or gimli
+        rounds (int): number of rounds
+        final_matrix (bool): ascon trails end after the last Matrix
+        xor (str): xor mode of the builder
+
+    Returns:
+        tuple: (cnf, json)
+    """
+    name = "{}{}r{}_{}_core".format(cipher, rounds, "_final" if final_matrix else "", xor)
+    path = os.path.join(core_dir, name)
+    return path + ".cnf", path + ".json"
+
+def ensure_core(cipher: str, rounds: int, final_matrix: bool = False, xor: str = "native", core_dir: str = ".",
+                cache: ArtifactCache = None) -> tuple:
+    """the core of a cipher and round count, built only when neither core_dir nor the cache has it
+
+    Args:
+        cipher (str): ascon or gimli
+        rounds (int): number of rounds
+        final_matrix (bool, optional): ascon trails end after the last Matrix. Defaults to False.
+        xor (str, optional): xor mode of the builder. Defaults to "native".
+        core_dir (str, optional): directory of the core files. Defaults to ".".
+        cache (ArtifactCache, optional): artifact cache or None. Defaults to None.
+
+    Returns:
+        tuple: (cnf path, core metadata, where it came from: dir, cache or built)
+    """
+    key = core_key(cipher, rounds, final_matrix, xor)
+    os.makedirs(core_dir, exist_ok=True)
+    cnf, meta_path = core_files(core_dir, cipher, rounds, final_matrix, xor)
+    if os.path.isfile(cnf) and os.path.isfile(meta_path):
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("key") == key:
+            return cnf, meta, "dir"
+    if cache is not None and cache.get(key, [cnf, meta_path]) is not None:
+        with open(meta_path, "r") as f:
+            return cnf, json.load(f), "cache"
+    builder, symbolic, a, b = build(cipher, rounds, xor, final_matrix)
+    nvars, nclauses = builder.write(cnf, ["{} {} rounds core, the differences are variables, see {}".format(
+        cipher, rounds, os.path.basename(meta_path))])
+    meta = {"key": key, "cipher": cipher, "rounds": rounds, "final_matrix": final_matrix, "xor": xor,
+            "vars": nvars, "clauses": nclauses, "diff": symbolic, "a": a[0], "b": b[0]}
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    if cache is not None:
+        cache.put(key, [cnf, meta_path])
+    return cnf, meta, "built"
+
+def write_model(core: str, meta: dict, trail: list, path: str) -> tuple:
+    """the cnf of a trail: the core followed by the unit clauses of its difference bits
+
+    Args:
+        core (str): core cnf
+        meta (dict): core metadata
+        trail (list): states of 0, 1 or None
+        path (str): output cnf
+
+    Returns:
+        tuple: (number of variables, number of clauses)
+    """
+    units = trail_assumptions(meta["diff"], trail)
+    nclauses = meta["clauses"] + len(units)
+    with open(core, "r") as src, open(path, "w") as dst:
+        # the core starts with its own header, replace it
+        src.readline()
+        dst.write("p cnf {} {}\n".format(meta["vars"], nclauses))
+        while True:
+            chunk = src.read(1 << 20)
+            if not chunk:
+                break
+            dst.write(chunk)
+        dst.write("c delta: the differences of the trail\n")
+        dst.writelines("{} 0\n".format(u) for u in units)
+    return meta["vars"], nclauses
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="splitmodel")
+    arg_parser.description = "Write the cnf of a trail from a cached trail-independent core and a small delta."
+    arg_parser.add_argument("cipher", type=str, choices=sorted(CIPHERS), help="cipher of the trail")
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--trail", type=str, required=True, help="trail file, see trail.py")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="ascon trails end after the last Matrix")
+    arg_parser.add_argument("--xor", type=str, default="native", choices=["native", "cnf"],
+                            help="native xor lines for cryptominisat, cnf for cadical")
+    arg_parser.add_argument("--core-dir", type=str, default=".", help="directory of the core files")
+    arg_parser.add_argument("--cache-dir", type=str, default=DEFAULT_ROOT, help="artifact cache directory")
+    arg_parser.add_argument("--cache-size", type=float, default=DEFAULT_SIZE, help="artifact cache size limit in GB")
+    arg_parser.add_argument("--no-cache", action="store_true", help="do not use the artifact cache")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="cnf file")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("splitmodel")
+    cache = None if args.no_cache else ArtifactCache(args.cache_dir, args.cache_size)
+    start = time.time()
+    core, meta, origin = ensure_core(args.cipher, args.rounds, args.final_matrix, args.xor, args.core_dir, cache)
+    logger.info("core {} ({}) in {:.2f}s".format(core, origin, time.time() - start))
+    _, nbits, word, msb_first = CIPHERS[args.cipher]
+    nvars, nclauses = write_model(core, meta, read_trail(args.trail, nbits, word, msb_first), args.output)
+    logger.info("wrote {} with {} variables and {} clauses".format(args.output, nvars, nclauses))
@@ -0,0 +1,347 @@
+"""Staged solving of Ascon attacks, the solution of one model is injected into the next one
+
+4rite in ascon/result has the model of the whole trail(4rite) and of its last 2 rounds(last_2r): an
+iterative or multi-block attack is a chain of models, the state a stage ends with is the start of the
+next stage. Every stage is the direct model(ascon_direct.py) of a trail segment:
+    stage k     solutions of its model, the output states of message a and b are decoded
+    stage k+1   the input bits listed in "inject" are fixed to such an output by solver assumptions
+every worker process loads the models of all stages once. A job solves one stage under one injected
+state for up to --width new solutions(the ones found before are blocked by clauses that only the jobs
+of this state enable, a worker keeps them for its next job of the same state), each solution becomes a
+job of the next stage and the search stops at the first solution of the last stage(no new jobs, the ones
+running finish). At most --pool solutions of a stage are expanded, so a stage that rejects the states
+of the previous one does not make the search run forever. The search is UNSAT only when it was
+exhaustive, a solution left out by --pool or a solve call stopped by --time-limit makes it UNKNOWN.
+a solver asked again after a blocking clause returns a neighbour of its last solution, and neighbours
+mostly fail the next stage together. So every solve call first looks in a random cell: --cell input bits
+of message a that are not injected are assumed to random values(the seed of a job is --seed plus its
+number). An empty cell falls back to the solve call without these assumptions.
+
+stages of a trail cut at rounds(--split 2 of a 4-round trail gives the models of rounds 0-1 and 2-3,
+the first one ends after the Matrix of round 1), or a stage file(json) for a chain of different trails:
+{
+    "stages": [
+        {"trail": "block1.trail", "rounds": 2, "final_matrix": true},
+        {"trail": "block2.trail", "rounds": 2, "start": 0, "inject": "64:320"}
+    ]
+}
+"start" is the first round constant(default 0), "inject" the input bits taken from the previous stage
+("a:b" ranges and bits separated by commas, default all), e.g. the capacity when the rate of the next
+block is a new message. With every bit injected the input pair of the first stage is a right pair of
+the whole chain.
+
+Example:
+    python tools/staged.py --trail 4rite.trail -r 4 --split 2 --jobs 40 --report 4rite_staged.json
+    python tools/staged.py --stages blocks.json --width 8 --pool 1000
+    python tools/staged.py --trail 2rascon.trail -r 2 --split 1 --width 16 --pool 20000
+the last one is a 2-round trail of weight 16 whose round 1 has most of the weight, a few thousand solutions
+of stage 0 are expanded before one passes round 1.
+"""
+import argparse
+import heapq
+import json
+import queue
+import random
+import time
+
+from ascon_direct import CONSTANTS, LANE, STATE, encode
+from cnfbuilder import CNFBuilder, Unsatisfiable
+from common import WORKER, cpu_count, get_logger, parse_range, worker_pool
+from incremental import IncrementalSolver, STATUS, values
+from trail import format_state, read_trail
+
+def split_trail(diff: list, rounds: int, cuts: list, final_matrix: bool = False) -> list:
+    """stages of a trail cut before some rounds
+
+    Args:
+        diff (list): 2*rounds states(+1 with final_matrix) of 0, 1 or None
+        rounds (int): number of rounds
+        cuts (list): first round of every stage but the first one
+        final_matrix (bool, optional): the trail ends after the last Matrix. Defaults to False.
+
+    Raises:
+        ValueError: the cuts do not fit the trail
+
+    Returns:
+        list: stages, dicts of diff, rounds, start, final_matrix and inject
+    """
+    if len(diff) != 2 * rounds + final_matrix:
+        raise ValueError("a {}-round trail has {} states, got {}".format(rounds, 2 * rounds + final_matrix, len(diff)))
+    bounds = [0] + sorted(cuts) + [rounds]
+    if any(b <= a for a, b in zip(bounds, bounds[1:])):
+        raise ValueError("the cuts {} do not split {} rounds".format(cuts, rounds))
+    stages = []
+    for first, end in zip(bounds, bounds[1:]):
+        last = end == rounds
+        # a cut stage ends after the Matrix, its last state is the input of the next stage
+        states = diff[2 * first:] if last else diff[2 * first:2 * end + 1]
+        stages.append({"diff": states, "rounds": end - first, "start": first,
+                       "final_matrix": final_matrix if last else True, "inject": list(range(STATE))})
+    return stages
+
+def read_stages(path: str) -> list:
+    """stages of a stage file
+
+    Args:
+        path (str): json file
+
+    Returns:
+        list: stages, dicts of diff, rounds, start, final_matrix and inject
+    """
+    with open(path, "r") as f:
+        spec = json.load(f)
+    stages = []
+    for s in spec["stages"]:
+        stages.append({"diff": read_trail(s["trail"], STATE, LANE, msb_first=True), "rounds": s["rounds"],
+                       "start": s.get("start", 0), "final_matrix": s.get("final_matrix", False),
+                       "inject": parse_range(s.get("inject", "0:{}".format(STATE)))})
+    return stages
+
+def stage_model(stage: dict, xor: str) -> tuple:
+    """the model of a stage
+
+    Args:
+        stage (dict): a stage of split_trail or read_stages
+        xor (str): xor mode of the builder
+
+    Raises:
+        ValueError: the stage does not fit Ascon
+        Unsatisfiable: the trail of the stage contradicts a linear layer
+
+    Returns:
+        tuple: (builder, states of message a, states of message b)
+    """
+    if stage["start"] + stage["rounds"] > len(CONSTANTS):
+        raise ValueError("round constants {}..{} do not exist".format(stage["start"], stage["start"] + stage["rounds"] - 1))
+    builder = CNFBuilder(xor)
+    a, b = encode(builder, stage["diff"], stage["rounds"], stage["final_matrix"], stage["start"])
+    return builder, a, b
+
+def load_stages(stages: list, backend: str, time_limit: float) -> dict:
+    """load the models of all stages once per worker process
+
+    Args:
+        stages (list): stages of split_trail or read_stages
+        backend (str): cms or a PySAT solver name
+        time_limit (float): seconds of a solve call(CPU seconds with cms), None for no limit
+
+    Returns:
+        dict: the state of the worker
+    """
+    models = []
+    for stage in stages:
+        solver = IncrementalSolver(backend, 1, time_limit)
+        builder, a, b = stage_model(stage, solver.xor)
+        solver.load(builder)
+        # variables above the model select the blocking clauses of a node, node -> (selector, blocked outputs)
+        models.append({"solver": solver, "a": a, "b": b, "top": builder.nvars, "inject": stage["inject"],
+                       "nodes": {}})
+    return {"stages": models}
+
+def random_cell(free: list, size: int, rng: random.Random) -> list:
+    """random values of some input bits
+
+    Args:
+        free (list): input literals of message a to choose from
+        size (int): bits to fix
+        rng (random.Random): random source
+
+    Returns:
+        list: assumptions
+    """
+    return [l if rng.getrandbits(1) else -l for l in rng.sample(free, min(size, len(free)))]
+
+def block(model_k: dict, node: int, output: str) -> None:
+    """block an output pair for the jobs of a node, once per worker
+
+    Args:
+        model_k (dict): the model of the stage in the worker
+        node (int): node of the search
+        output (str): output values of message a and message b
+    """
+    select, blocked = model_k["nodes"][node]
+    if output in blocked:
+        return
+    blocked.add(output)
+    out = model_k["a"][-1] + model_k["b"][-1]
+    model_k["solver"].add_clause([-select] + [-l if bit == "1" else l for l, bit in zip(out, output)])
+
+def solve_stage(job: tuple) -> dict:
+    """new solutions of a stage under an injected state in a worker process
+
+    Args:
+        job (tuple): (node, stage, injected output (a, b) of the previous stage or None, outputs found before(output
+            a + output b), width, bits of a cell, seed)
+
+    Returns:
+        dict: node, stage, status of the last solve call, solutions (input a, input b, output a, output b) and time
+    """
+    node, k, injected, seen, width, cell_size, seed = job
+    model_k = WORKER["stages"][k]
+    solver, a, b = model_k["solver"], model_k["a"], model_k["b"]
+    assumptions = []
+    free = a[0]
+    if injected is not None:
+        for i in model_k["inject"]:
+            assumptions += [a[0][i] if injected[0][i] == "1" else -a[0][i],
+                            b[0][i] if injected[1][i] == "1" else -b[0][i]]
+        inject = set(model_k["inject"])
+        free = [l for i, l in enumerate(a[0]) if i not in inject]
+    rng = random.Random(seed)
+    start = time.time()
+    if node not in model_k["nodes"]:
+        model_k["top"] += 1
+        model_k["nodes"][node] = (model_k["top"], set())
+    select = model_k["nodes"][node][0]
+    for output in seen:
+        block(model_k, node, output)
+    solutions = []
+    sat = True
+    while len(solutions) < width:
+        cell = random_cell(free, cell_size, rng)
+        sat, model = solver.solve(assumptions + [select] + cell)
+        if not sat and cell:
+            # an empty cell says nothing about the rest of the solutions
+            sat, model = solver.solve(assumptions + [select])
+        if not sat:
+            break
+        solution = (values(model, a[0]), values(model, b[0]), values(model, a[-1]), values(model, b[-1]))
+        solutions.append(solution)
+        block(model_k, node, solution[2] + solution[3])
+    if not sat:
+        # the node gets no more jobs, its blocking clauses are never enabled again
+        solver.add_clause([-select])
+        del model_k["nodes"][node]
+    return {"node": node, "stage": k, "status": STATUS[sat], "solutions": solutions, "time": time.time() - start}
+
+def staged_search(stages: list, width: int = 4, pool_size: int = 64, jobs: int = 0, backend: str = "cms",
+                  time_limit: float = None, cell_size: int = 32, seed: int = 0, logger=None) -> dict:
+    """search a chain of stage solutions, stop at the first solution of the last stage
+
+    Args:
+        stages (list): stages of split_trail or read_stages
+        width (int, optional): solutions asked per job. Defaults to 4.
+        pool_size (int, optional): solutions of a stage expanded at most. Defaults to 64.
+        jobs (int, optional): worker processes, 0 means one per core. Defaults to 0.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        time_limit (float, optional): seconds of a solve call(CPU seconds with cms), None for no limit.
+            Defaults to None.
+        cell_size (int, optional): input bits fixed at random in a solve call, 0 for none. Defaults to 32.
+        seed (int, optional): seed of the cells, job i uses seed + i. Defaults to 0.
+        logger (Any, optional): progress logger. Defaults to None.
+
+    Returns:
+        dict: status(UNKNOWN when the search gave up), the solution of every stage for SAT and the jobs and
+            solutions of every stage
+    """
+    last = len(stages) - 1
+    # node: [stage, injected state, solution of every earlier stage, outputs found, outputs no job was sent yet]
+    nodes = [[0, None, [], set(), []]]
+    stats = [{"jobs": 0, "solutions": 0, "time": 0.0} for _ in stages]
+    done = queue.Queue()
+    # a solution was left out or a solve call stopped, the search is not exhaustive
+    gave_up = False
+    start = time.time()
+    workers = jobs or cpu_count()
+    # nodes waiting for a worker, later stages first, at most one job per worker is handed to the pool
+    waiting = [(0, 0)]
+    running = 0
+    sent = 0
+    found = None
+    with worker_pool(workers, 0, load_stages, (stages, backend, time_limit)) as pool:
+        while waiting or running:
+            while waiting and running < workers:
+                _, n = heapq.heappop(waiting)
+                k, injected, _, _, new = nodes[n]
+                stats[k]["jobs"] += 1
+                # a worker blocks the outputs it was sent or found itself, one that missed some may find them
+                # again, which only costs a duplicate
+                job = (n, k, injected, new, 1 if k == last else width, cell_size, seed + sent)
+                nodes[n][4] = []
+                pool.apply_async(solve_stage, (job,), callback=done.put, error_callback=done.put)
+                running += 1
+                sent += 1
+            result = done.get()
+            running -= 1
+            if isinstance(result, Exception):
+                raise result
+            if found is not None:
+                continue
+            k, _, chain, outputs, new = nodes[result["node"]]
+            stats[k]["time"] += result["time"]
+            gave_up |= result["status"] == "UNKNOWN"
+            for solution in result["solutions"]:
+                output = solution[2] + solution[3]
+                if output in outputs:
+                    continue
+                outputs.add(output)
+                new.append(output)
+                if k == last:
+                    # the jobs still running are waited for, a worker terminated while it sends its result
+                    # would keep the lock of the result queue and hang the pool
+                    found = chain + [solution]
+                    waiting = []
+                    break
+                if stats[k]["solutions"] < pool_size:
+                    stats[k]["solutions"] += 1
+                    nodes.append([k + 1, solution[2:], chain + [solution], set(), []])
+                    heapq.heappush(waiting, (-(k + 1), len(nodes) - 1))
+                else:
+                    gave_up = True
+            # the node may have more solutions
+            if found is None and result["status"] == "SAT":
+                if stats[k]["solutions"] < pool_size:
+                    heapq.heappush(waiting, (-k, result["node"]))
+                else:
+                    gave_up = True
+            if logger is not None:
+                logger.info("stage {}: {} jobs, {} solutions expanded".format(k, stats[k]["jobs"], stats[k]["solutions"]))
+    if found is not None:
+        return {"status": "SAT", "chain": found, "stages": stats, "time": time.time() - start}
+    return {"status": "UNKNOWN" if gave_up else "UNSAT", "chain": None, "stages": stats, "time": time.time() - start}
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="staged")
+    arg_parser.description = "Solve an Ascon attack as a chain of models, the solutions of a stage feed the next one."
+    arg_parser.add_argument("--trail", type=str, default=None, help="trail file cut by --split, see trail.py")
+    arg_parser.add_argument("-r", "--rounds", type=int, default=None, help="number of rounds of --trail")
+    arg_parser.add_argument("--split", type=str, default=None, help="first rounds of the later stages, e.g. 2 or 1,3")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="--trail ends after the last Matrix")
+    arg_parser.add_argument("--stages", type=str, default=None, help="stage file(json) instead of --trail")
+    arg_parser.add_argument("--width", type=int, default=4, help="solutions asked per job, default 4")
+    arg_parser.add_argument("--pool", type=int, default=64, help="solutions of a stage expanded at most, default 64")
+    arg_parser.add_argument("--jobs", type=int, default=0, help="worker processes, default one per core")
+    arg_parser.add_argument("--cell", type=int, default=32,
+                            help="input bits fixed at random in a solve call, 0 for none, default 32")
+    arg_parser.add_argument("--seed", type=int, default=0, help="seed of the random cells")
+    arg_parser.add_argument("--time-limit", type=float, default=None,
+                            help="seconds of a solve call, CPU seconds with cms")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--report", type=str, default=None, help="json file of the result")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("staged")
+    if args.stages is not None:
+        stages = read_stages(args.stages)
+    elif args.trail is not None and args.rounds is not None and args.split is not None:
+        diff = read_trail(args.trail, STATE, LANE, msb_first=True)
+        stages = split_trail(diff, args.rounds, [int(r) for r in args.split.split(",")], args.final_matrix)
+    else:
+        arg_parser.error("give --stages or --trail, -r and --split")
+    try:
+        for stage in stages:
+            stage_model(stage, "native")
+    except Unsatisfiable as e:
+        logger.warning("Impossible: {}".format(e))
+        print("Impossible")
+        exit(0)
+    result = staged_search(stages, args.width, args.pool, args.jobs, args.backend, args.time_limit, args.cell,
+                           args.seed, logger)
+    logger.info("{} in {:.2f}s".format(result["status"], result["time"]))
+    if result["chain"] is not None:
+        result["chain"] = [{"a": format_state([int(c) for c in s[0]], LANE, True),
+                            "b": format_state([int(c) for c in s[1]], LANE, True)} for s in result["chain"]]
+        logger.info("input pair of the first stage: {} / {}".format(result["chain"][0]["a"], result["chain"][0]["b"]))
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,161 @@
+"""Target difference algorithm of Ascon for a batch of target differences
+
+ascon/code/2rtda.py connects one output difference d1 with a symbolic input difference of the rate.
+Here the direct model(ascon_direct.py) is built once with every difference bit as a variable
+(build of incremental.py), and a target is a set of assumptions:
+    input   the bits of the rate are free, the capacity has no difference
+    middle  free
+    output  the target difference, the state after the Matrix of the last round as in 2rtda.py
+each worker process loads the model once and solves the targets handed to it, so several targets
+run at a time and the learned clauses of a worker are kept between its targets.
+
+a target file has one target per line, "#" starts a comment:
+    - 16 hex digits: row 0 of the output difference, the other rows have no difference(d1 of 2rtda.py)
+    - a full state in the format of trail.py, "?" leaves bits free
+the result is a table(tab separated): target, status, input difference of the rate, message a, message b and
+the wall time of the target. --time-limit is in CPU seconds with cms and in wall seconds with PySAT.
+
+Example:
+    python tools/tda.py targets.txt -r 2 --jobs 20 -o 2rtda_table.tsv
+"""
+import argparse
+import time
+
+from ascon_direct import LANE, STATE
+from common import WORKER, get_logger, worker_pool
+from incremental import IncrementalSolver, STATUS, build, trail_assumptions, values
+from trail import format_state, parse_state
+
+def read_targets(path: str) -> list:
+    """targets of a file
+
+    Args:
+        path (str): target file
+
+    Returns:
+        list: (text of the target, output state of 0, 1 or None)
+    """
+    targets = []
+    with open(path, "r") as f:
+        for n, line in enumerate(f, 1):
+            text = line.split("#", 1)[0].strip()
+            if not text:
+                continue
+            compact = text.replace(" ", "")
+            try:
+                if len(compact) == LANE // 4:
+                    state = parse_state(compact, LANE, LANE, True) + [0] * (STATE - LANE)
+                else:
+                    state = parse_state(text, STATE, LANE, True)
+            except ValueError as e:
+                raise ValueError("{} line {}: {}".format(path, n, e))
+            targets.append((text, state))
+    return targets
+
+def tda_trail(rounds: int, rate: int, target: list, final_matrix: bool = True) -> list:
+    """the trail of a target: free rate, free middle states, the target at the end
+
+    Args:
+        rounds (int): number of rounds
+        rate (int): bits of the input with a difference
+        target (list): output difference
+        final_matrix (bool, optional): the target is after the last Matrix. Defaults to True.
+
+    Returns:
+        list: states of 0, 1 or None
+    """
+    free = [None] * STATE
+    first = [None] * rate + [0] * (STATE - rate)
+    return [first] + [free] * (2 * rounds + final_matrix - 2) + [target]
+
+def load_model(rounds: int, final_matrix: bool, backend: str, time_limit: float) -> dict:
+    """build the model once per worker process
+
+    Args:
+        rounds (int): number of rounds
+        final_matrix (bool): the target is after the last Matrix
+        backend (str): cms or a PySAT solver name
+        time_limit (float): seconds of a target(CPU seconds with cms), None for no limit
+
+    Returns:
+        dict: the state of the worker
+    """
+    solver = IncrementalSolver(backend, 1, time_limit)
+    builder, symbolic, a, b = build("ascon", rounds, solver.xor, final_matrix)
+    # the input difference is not 0
+    builder.add_clause(list(symbolic[0]))
+    solver.load(builder)
+    return {"solver": solver, "symbolic": symbolic, "a": a, "b": b, "rounds": rounds, "final_matrix": final_matrix}
+
+def solve_target(job: tuple) -> dict:
+    """solve one target in a worker process
+
+    Args:
+        job (tuple): (index, target state, rate)
+
+    Returns:
+        dict: index, status, time and for SAT the input difference and the pair in hex
+    """
+    i, target, rate = job
+    trail = tda_trail(WORKER["rounds"], rate, target, WORKER["final_matrix"])
+    start = time.time()
+    sat, model = WORKER["solver"].solve(trail_assumptions(WORKER["symbolic"], trail))
+    result = {"index": i, "status": STATUS[sat], "time": time.time() - start}
+    if sat:
+        delta = [int(c) for c in values(model, WORKER["symbolic"][0][:rate])]
+        result["input"] = format_state(delta + [0] * (-rate % LANE), LANE, True)
+        result["a"] = format_state([int(c) for c in values(model, WORKER["a"][0])], LANE, True)
+        result["b"] = format_state([int(c) for c in values(model, WORKER["b"][0])], LANE, True)
+    return result
+
+def batch_tda(targets: list, rounds: int = 2, rate: int = LANE, final_matrix: bool = True, jobs: int = 0,
+              backend: str = "cms", time_limit: float = None):
+    """solve targets in parallel, results come in the order they finish
+
+    Args:
+        targets (list): output states
+        rounds (int, optional): number of rounds. Defaults to 2.
+        rate (int, optional): bits of the input with a difference. Defaults to 64.
+        final_matrix (bool, optional): the targets are after the last Matrix. Defaults to True.
+        jobs (int, optional): worker processes, 0 means one per core. Defaults to 0.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        time_limit (float, optional): seconds of a target(CPU seconds with cms), None for no limit. Defaults to None.
+
+    Yields:
+        dict: results of solve_target
+    """
+    work = [(i, t, rate) for i, t in enumerate(targets)]
+    if not work:
+        return
+    with worker_pool(jobs, len(work), load_model, (rounds, final_matrix, backend, time_limit)) as pool:
+        for result in pool.imap_unordered(solve_target, work):
+            yield result
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="tda")
+    arg_parser.description = "Connect a batch of Ascon output differences with an input difference of the rate."
+    arg_parser.add_argument("targets", type=str, help="target file, one output difference per line")
+    arg_parser.add_argument("-r", "--rounds", type=int, default=2, help="number of rounds, default 2")
+    arg_parser.add_argument("--rate", type=int, default=LANE, help="input bits with a difference, default 64")
+    arg_parser.add_argument("--sbox-output", action="store_true", help="the targets are after the last Sbox")
+    arg_parser.add_argument("--jobs", type=int, default=0, help="worker processes, default one per core")
+    arg_parser.add_argument("--time-limit", type=float, default=None, help="seconds of a target, CPU seconds with cms")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="table of the results")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("tda")
+    targets = read_targets(args.targets)
+    start = time.time()
+    found = 0
+    with open(args.output, "w") as f:
+        f.write("target\tstatus\tinput\ta\tb\twall_time\n")
+        for result in batch_tda([t for _, t in targets], args.rounds, args.rate, not args.sbox_output, args.jobs,
+                                args.backend, args.time_limit):
+            text = targets[result["index"]][0]
+            found += result["status"] == "SAT"
+            f.write("{}\t{}\t{}\t{}\t{}\t{:.2f}\n".format(text, result["status"], result.get("input", ""),
+                                                         result.get("a", ""), result.get("b", ""), result["time"]))
+            f.flush()
+            logger.info("{}: {} in {:.2f}s".format(text, result["status"], result["time"]))
+    logger.info("{} of {} targets connected in {:.2f}s".format(found, len(targets), time.time() - start))
@@ -0,0 +1,113 @@
+"""Read and write differential trails of the direct models
+
+a trail file has one state per line, "#" starts a comment, blank lines are skipped.
+a state is either
+    - a bit string of 0, 1 and ?, one character per state bit, or
+    - hex words, "-" is a zero nibble and "?" a nibble of free bits,
+spaces and "|" inside a line are ignored. A free bit(None) has no difference condition.
+
+the bit order of a hex word follows the scripts of each cipher:
+    ascon: 64-bit words, the first hex digit holds bits 0-3 of the word, bit 0 is its highest bit
+    gimli: 32-bit words, bit k of a word is (n >> k) & 1, as hex2vector of gimli.py
+"""
+FREE = None
+
+def parse_state(text: str, nbits: int, word: int, msb_first: bool) -> list:
+    """parse a state line
+
+    Args:
+        text (str): state text
+        nbits (int): bits of the state
+        word (int): bits of a word
+        msb_first (bool): the bit order of the hex words, see above
+
+    Returns:
+        list: 0, 1 or None per bit
+    """
+    compact = text.replace(" ", "").replace("|", "").replace("\t", "")
+    if len(compact) == nbits and set(compact) <= set("01?"):
+        return [FREE if c == "?" else int(c) for c in compact]
+    if len(compact) != nbits // 4:
+        raise ValueError("a state needs {} bits or {} hex digits, got {} characters".format(nbits, nbits // 4, len(compact)))
+    digits = word // 4
+    state = []
+    for w in range(nbits // word):
+        chunk = compact[w * digits:(w + 1) * digits]
+        bits = [FREE] * word
+        for h, c in enumerate(chunk):
+            if c == "?":
+                continue
+            value = 0 if c == "-" else int(c, 16)
+            for i in range(4):
+                if msb_first:
+                    bits[4 * h + i] = (value >> (3 - i)) & 1
+                else:
+                    bits[word - 4 * (h + 1) + i] = (value >> i) & 1
+        state += bits
+    return state
+
+def format_state(state: list, word: int, msb_first: bool) -> str:
+    """format a state as hex words, or as a bit string when a nibble is partly free
+
+    Args:
+        state (list): 0, 1 or None per bit
+        word (int): bits of a word
+        msb_first (bool): the bit order of the hex words
+
+    Returns:
+        str: state text
+    """
+    words = []
+    for w in range(len(state) // word):
+        bits = state[w * word:(w + 1) * word]
+        text = ""
+        for h in range(word // 4):
+            nibble = bits[4 * h:4 * h + 4] if msb_first else bits[word - 4 * (h + 1):word - 4 * h][::-1]
+            if all(b is FREE for b in nibble):
+                text += "?"
+            elif any(b is FREE for b in nibble):
+                return "".join("?" if b is FREE else str(b) for b in state)
+            else:
+                text += "{:x}".format(sum(b << (3 - i) for i, b in enumerate(nibble)))
+        words.append(text)
+    return " ".join(words)
+
+def read_trail(path: str, nbits: int, word: int, msb_first: bool) -> list:
+    """read the states of a trail file
+
+    Args:
+        path (str): trail file
+        nbits (int): bits of a state
+        word (int): bits of a word
+        msb_first (bool): the bit order of the hex words
+
+    Returns:
+        list: states
+    """
+    states = []
+    with open(path, "r") as f:
+        for n, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                states.append(parse_state(line, nbits, word, msb_first))
+            except ValueError as e:
+                raise ValueError("{} line {}: {}".format(path, n, e))
+    return states
+
+def write_trail(path: str, states: list, word: int, msb_first: bool, comments: list = ()) -> None:
+    """write a trail file
+
+    Args:
+        path (str): output file
+        states (list): states
+        word (int): bits of a word
+        msb_first (bool): the bit order of the hex words
+        comments (list, optional): lines written as comments first. Defaults to ().
+    """
+    with open(path, "w") as f:
+        for line in comments:
+            f.write("# {}\n".format(line))
+        for state in states:
+            f.write(format_state(state, word, msb_first) + "\n")
@@ -0,0 +1,154 @@
+"""Search differential trails of Ascon below a weight bound with a SAT solver
+
+every difference of the trail is a variable, in the layout of ascon_direct.py:
+    diff[2r]     input of round r(after the Matrix of round r-1)
+    diff[2r+1]   output of the Sbox of round r
+    diff[2R]     with --final-matrix, after the Matrix of the last round
+the Sbox of every column is the weighted differential relation of sboxcnf.py(--weight), the Matrix
+is xors(add_matrix of ascon_direct.py) and addConst does not change a difference.
+The weight bits of all Sboxes, repeated by their coefficients, feed a totalizer(CNFBuilder.totalizer),
+weight <= W is the assumption -out[W], and the input difference must not be 0.
+
+a trail found is written as a trail file(trail.py) that ascon_direct.py, incremental.py and splitmodel.py read,
+with --verify a right pair is searched at once in the value model of incremental.py. Every trail found is
+blocked, so the search goes on with the next one until --count trails or no trail is left.
+with --minimize every trail found tightens the bound instead: a trail of weight w is followed by the assumption
+-out[w - 1] on the same solver, so the learned clauses are kept, until UNSAT proves the last trail optimal.
+
+Example:
+    python tools/trailsearch.py -r 3 --weight 40 --count 10 --verify -o 3rascon
+    python tools/trailsearch.py -r 4 --weight 120 --minimize -o 4rascon
+"""
+import argparse
+import time
+
+from ascon_direct import LANE, STATE, add_matrix
+from cnfbuilder import CNFBuilder
+from common import get_logger
+from enumeration import bit
+from incremental import IncrementalSolver, build, verify
+from sboxcnf import SBOXES, sbox_cnf, weight_levels
+from trail import write_trail
+
+def encode_search(builder: CNFBuilder, rounds: int, final_matrix: bool = False) -> tuple:
+    """the differences of a trail and the literals of its weight
+
+    Args:
+        builder (CNFBuilder): the model
+        rounds (int): number of rounds
+        final_matrix (bool, optional): the trail ends after the last Matrix. Defaults to False.
+
+    Returns:
+        tuple: (states of difference variables, weight literals, one per unit of weight)
+    """
+    table, n, m = SBOXES["ascon"]
+    template = sbox_cnf(table, n, m, ddt=True, weight=True)
+    levels, coefficients = weight_levels(table, n)
+    diff = [builder.new_vars(STATE)]
+    weight = []
+    for r in range(rounds):
+        out = builder.new_vars(STATE)
+        for j in range(LANE):
+            column = [j + LANE * k for k in range(5)]
+            u = builder.new_vars(len(levels))
+            builder.add_table(template, [diff[-1][i] for i in column] + [out[i] for i in column] + u)
+            for lit, c in zip(u, coefficients):
+                weight += [lit] * c
+        diff.append(out)
+        if r == rounds - 1 and not final_matrix:
+            break
+        nxt = builder.new_vars(STATE)
+        add_matrix(builder, out, nxt)
+        diff.append(nxt)
+    # the trail starts with a difference
+    builder.add_clause(diff[0])
+    return diff, weight
+
+def read_trail_model(model, diff: list) -> list:
+    """the trail of a model
+
+    Args:
+        model (Any): model[v] is the value of variable v
+        diff (list): states of difference variables
+
+    Returns:
+        list: states of 0/1
+    """
+    return [[bit(model, v) for v in state] for state in diff]
+
+def search_trails(rounds: int, weight: int, count: int = 1, minimize: bool = False, final_matrix: bool = False,
+                  backend: str = "cms", threads: int = 1, logger=None):
+    """search trails below a weight bound, blocking every trail found or tightening the bound
+
+    Args:
+        rounds (int): number of rounds
+        weight (int): max weight of a trail
+        count (int, optional): trails to find without minimize. Defaults to 1.
+        minimize (bool, optional): tighten the bound after every trail until UNSAT. Defaults to False.
+        final_matrix (bool, optional): the trail ends after the last Matrix. Defaults to False.
+        backend (str, optional): cms or a PySAT solver name. Defaults to "cms".
+        threads (int, optional): threads of cms. Defaults to 1.
+        logger (Any, optional): logs why the search ended. Defaults to None.
+
+    Yields:
+        tuple: (states of 0/1, weight) of every trail, in the order they are found
+    """
+    solver = IncrementalSolver(backend, threads)
+    builder = CNFBuilder(solver.xor)
+    diff, lits = encode_search(builder, rounds, final_matrix)
+    out = builder.totalizer(lits, weight + 1)
+    solver.load(builder)
+    bound = [-out[weight]] if weight < len(out) else []
+    limit = weight
+    k = 0
+    while minimize or k < count:
+        sat, model = solver.solve(bound)
+        if not sat:
+            if logger is not None and minimize and k:
+                logger.info("no trail of weight <= {}, weight {} is optimal".format(limit, limit + 1))
+            elif logger is not None:
+                logger.info("no {}trail of weight <= {}".format("further " if k else "", limit))
+            return
+        w = sum(bit(model, lit) for lit in lits)
+        yield read_trail_model(model, diff), w
+        k += 1
+        if minimize:
+            if w == 0:
+                return
+            # weight <= w - 1 on the same totalizer
+            limit = w - 1
+            bound = [-out[limit]]
+        else:
+            # the next solve call finds another trail
+            solver.add_clause([-v if bit(model, v) else v for state in diff for v in state])
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(prog="trailsearch")
+    arg_parser.description = "Search Ascon differential trails below a weight bound."
+    arg_parser.add_argument("-r", "--rounds", type=int, required=True, help="number of rounds")
+    arg_parser.add_argument("--weight", type=int, required=True, help="max weight of a trail")
+    arg_parser.add_argument("--final-matrix", action="store_true", help="the trail ends after the last Matrix")
+    arg_parser.add_argument("--count", type=int, default=1, help="trails to find, default 1")
+    arg_parser.add_argument("--minimize", action="store_true", help="tighten the bound after every trail until UNSAT")
+    arg_parser.add_argument("--verify", action="store_true", help="search a right pair of every trail found")
+    arg_parser.add_argument("--backend", type=str, default="cms", help="cms or a PySAT solver name, default cms")
+    arg_parser.add_argument("--threads", type=int, default=1, help="threads of cms")
+    arg_parser.add_argument("-o", "--output", type=str, required=True, help="prefix of the trail files")
+    args = arg_parser.parse_args()
+
+    logger = get_logger("trailsearch")
+    if args.verify:
+        checker = IncrementalSolver(args.backend, args.threads)
+        values, symbolic, a, b = build("ascon", args.rounds, checker.xor, args.final_matrix)
+        checker.load(values)
+    start = time.time()
+    trails = search_trails(args.rounds, args.weight, args.count, args.minimize, args.final_matrix, args.backend,
+                           args.threads, logger)
+    for k, (trail, w) in enumerate(trails):
+        path = "{}_{}.trail".format(args.output, k)
+        write_trail(path, trail, LANE, True, ["ascon {} rounds, weight {}".format(args.rounds, w)])
+        logger.info("{}: weight {} in {:.2f}s".format(path, w, time.time() - start))
+        if args.verify:
+            result = verify(checker, symbolic, a, b, trail)
+            logger.info("{}: right pair {}".format(path, result["status"]))
+        start = time.time()